@@ -0,0 +1,218 @@
+"""Magasin d'assets adressé par contenu : QR codes et factures rangés dans un seul fichier SQLite (data/assets.db).
+
+Chaque contenu est stocké une fois, sous la clé SHA-256 de ses octets ; `equipement.qr_path` et `facture_path`
+contiennent des références "asset:<sha256>". Les lectures passent par le mmap de SQLite (PRAGMA mmap_size) et
+les gros fichiers peuvent être lus par morceaux (`open`). `collect_garbage` supprime les assets que plus aucune
+ligne ne référence ; `import_files` y range les anciens fichiers de data/qrcodes et data/factures.
+
+Usage : python assets.py {gc,import,stats} [--db database/inventaire.db] [--store data/assets.db]
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+STORE_PATH = "data/assets.db"
+REF = "asset:"
+LEGACY_DIRS = ("data/qrcodes", "data/factures")  # anciens dossiers : seuls leurs fichiers sont supprimés après import
+
+def ref(key):
+    return REF + key
+
+def key_of(value):
+    """Clé SHA-256 d'une référence "asset:...", ou None pour un chemin de fichier / une valeur vide."""
+    return value[len(REF):] if value and value.startswith(REF) else None
+
+class AssetStore:
+    """Contenus dédupliqués par SHA-256, utilisable depuis n'importe quel thread (une connexion par thread,
+    écritures sérialisées). Les pages libérées par les suppressions sont rendues au disque par `vacuum`."""
+
+    def __init__(self, path=STORE_PATH, mmap_mb=256):
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path; self.mmap = mmap_mb * 1024 * 1024; self.conns = {}; self.lock = threading.Lock()
+        c = self.conn()
+        c.execute("""CREATE TABLE IF NOT EXISTS assets (
+                cle TEXT PRIMARY KEY, type_mime TEXT NOT NULL, taille INTEGER NOT NULL, cree_le TEXT NOT NULL,
+                contenu BLOB NOT NULL)""")
+        # Nom -> clé : retrouver un contenu dérivé (ex. le QR d'une charge utile) sans le recalculer
+        c.execute("CREATE TABLE IF NOT EXISTS noms (nom TEXT PRIMARY KEY, cle TEXT NOT NULL)")
+        c.commit()
+
+    def conn(self):
+        c = self.conns.get(threading.get_ident())
+        if c is None:
+            c = self.conns[threading.get_ident()] = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            c.execute("PRAGMA auto_vacuum = INCREMENTAL")  # avant WAL : ne compte qu'à la création du fichier
+            c.execute("PRAGMA journal_mode = WAL"); c.execute("PRAGMA synchronous = NORMAL"); c.execute(f"PRAGMA mmap_size = {self.mmap}")
+        return c
+
+    def close(self):
+        for c in self.conns.values(): c.close()
+        self.conns.clear()
+
+    def put(self, data, mime="application/octet-stream", name=None):
+        """Range `data` (bytes) s'il n'y est pas déjà, sous le nom `name` s'il est donné (voir `find`) ; renvoie sa référence."""
+        key = hashlib.sha256(data).hexdigest(); new = not self.has(key)
+        if new or name:
+            with self.lock:
+                c = self.conn()
+                if new: c.execute("INSERT INTO assets (cle, type_mime, taille, cree_le, contenu) VALUES (?,?,?,?,?) ON CONFLICT (cle) DO NOTHING",
+                                  (key, mime, len(data), datetime.datetime.now().isoformat(timespec="seconds"), data))
+                if name: c.execute("INSERT OR REPLACE INTO noms (nom, cle) VALUES (?,?)", (name, key))
+                c.commit()
+        return ref(key)
+
+    def find(self, name):
+        """Référence de l'asset rangé sous `name`, ou None (jamais rangé, ou ramassé depuis)."""
+        row = self.conn().execute("SELECT a.cle FROM noms n JOIN assets a ON a.cle = n.cle WHERE n.nom=?", (name,)).fetchone()
+        return ref(row[0]) if row else None
+
+    def put_file(self, path):
+        with open(path, "rb") as f: data = f.read()
+        return self.put(data, mimetypes.guess_type(path)[0] or "application/octet-stream")
+
+    def has(self, key):
+        return self.conn().execute("SELECT 1 FROM assets WHERE cle=?", (key,)).fetchone() is not None
+
+    def info(self, value):
+        """(type MIME, taille) de l'asset référencé, ou None."""
+        return self.conn().execute("SELECT type_mime, taille FROM assets WHERE cle=?", (key_of(value),)).fetchone()
+
+    def get(self, value):
+        """(type MIME, contenu) de l'asset référencé, ou None."""
+        return self.conn().execute("SELECT type_mime, contenu FROM assets WHERE cle=?", (key_of(value),)).fetchone()
+
+    def open(self, value):
+        """Blob en lecture seule (read/seek par morceaux) pour les gros fichiers, ou None ; à fermer par l'appelant."""
+        row = self.conn().execute("SELECT rowid FROM assets WHERE cle=?", (key_of(value),)).fetchone()
+        return self.conn().blobopen("assets", "contenu", row[0], readonly=True) if row else None
+
+    def keys(self):
+        return {k for (k,) in self.conn().execute("SELECT cle FROM assets")}
+
+    def stats(self):
+        n, size = self.conn().execute("SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM assets").fetchone()
+        return {"assets": n, "octets": size, "fichier": os.path.getsize(self.path)}
+
+    def vacuum(self):
+        # executescript : le curseur de execute() n'avance le pragma que d'un pas (une seule page libérée)
+        with self.lock: self.conn().executescript("PRAGMA incremental_vacuum"); self.conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def in_dirs(path, dirs):
+    """Vrai si `path` (liens résolus) est dans l'un des dossiers `dirs`."""
+    real = os.path.realpath(path)
+    return any(os.path.commonpath([real, d]) == d for d in map(os.path.realpath, dirs))
+
+def legacy_qr(qr_dir):
+    """{id: chemin} des QR de l'ancien modèle (QR_<id>.png), dont le chemin n'était pas gardé en base."""
+    if not os.path.isdir(qr_dir): return {}
+    return {int(m[1]): os.path.join(qr_dir, name) for name in os.listdir(qr_dir) if (m := re.fullmatch(r"QR_(\d+)\.png", name))}
+
+# --- Tâches de fond (BackgroundJob : reçoivent progress= et cancelled=)
+def import_files(db_path, store_path=STORE_PATH, progress=None, cancelled=None, dirs=LEGACY_DIRS):
+    """Range dans le magasin les fichiers encore référencés par leur chemin (et les QR_<id>.png de l'ancien dossier
+    des QR), remplace les chemins par des références puis supprime les fichiers importés ou orphelins de ces dossiers
+    `dirs` ; un fichier choisi ailleurs par l'utilisateur n'est jamais supprimé. Un fichier introuvable garde son chemin.
+    Renvoie le nombre de fichiers importés."""
+    conn = sqlite3.connect(db_path, timeout=10); store = AssetStore(store_path); done = {}; stale = set()
+    try:
+        found = legacy_qr(dirs[0])
+        if found:
+            # Objet sans QR en base : son ancien fichier devient sa référence, importée ci-dessous ; les autres
+            # (objet supprimé, ou QR déjà rangé dans le magasin) ne servent plus
+            conn.executemany("UPDATE equipement SET qr_path=? WHERE id=? AND (qr_path IS NULL OR qr_path='')", [(p, i) for i, p in found.items()])
+            used = {v for (v,) in conn.execute("SELECT qr_path FROM equipement WHERE qr_path IN (SELECT value FROM json_each(?))",
+                                               (json.dumps(list(found.values())),))}
+            stale = set(found.values()) - used
+        rows = conn.execute("SELECT id, qr_path, facture_path FROM equipement WHERE qr_path NOT LIKE 'asset:%' OR facture_path NOT LIKE 'asset:%'").fetchall()
+        updates = {"qr_path": [], "facture_path": []}
+        for k, (i, *paths) in enumerate(rows):
+            if cancelled and cancelled(): break
+            for col, path in zip(updates, paths):
+                if not path or key_of(path) or not os.path.isfile(path): continue
+                if path not in done: done[path] = store.put_file(path)  # fichier partagé par plusieurs lignes : lu une fois
+                updates[col].append((done[path], i))
+            if progress and k % 500 == 0: progress(k, len(rows))
+        for col, params in updates.items(): conn.executemany(f"UPDATE equipement SET {col}=? WHERE id=?", params)
+        conn.commit()
+    finally: conn.close(); store.close()
+    for path in [*done, *stale]:
+        if not in_dirs(path, dirs): continue
+        try: os.remove(path)
+        except OSError: pass
+    return len(done)
+
+def collect_garbage(db_path, store_path=STORE_PATH, grace=3600, progress=None, cancelled=None):
+    """Supprime les assets que plus aucune ligne d'`equipement` ne référence, sauf ceux rangés depuis moins de `grace`
+    secondes (un QR rendu dont la référence n'est pas encore enregistrée). Renvoie (assets supprimés, octets libérés)."""
+    conn = sqlite3.connect(db_path, timeout=10); store = AssetStore(store_path)
+    try:
+        live = [key_of(v) for (v,) in conn.execute("SELECT qr_path FROM equipement WHERE qr_path LIKE 'asset:%' "
+                                                    "UNION SELECT facture_path FROM equipement WHERE facture_path LIKE 'asset:%'")]
+        cutoff = (datetime.datetime.now() - datetime.timedelta(seconds=grace)).isoformat(timespec="seconds")
+        where = "cree_le < ? AND cle NOT IN (SELECT value FROM json_each(?))"; params = (cutoff, json.dumps(live))
+        with store.lock:
+            c = store.conn(); n, size = c.execute(f"SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM assets WHERE {where}", params).fetchone()
+            if n: c.execute(f"DELETE FROM assets WHERE {where}", params); c.execute("DELETE FROM noms WHERE cle NOT IN (SELECT cle FROM assets)"); c.commit()
+        if n: store.vacuum()
+        return n, size
+    finally: conn.close(); store.close()
+
+def sweep(db_path, store_path=STORE_PATH, progress=None, cancelled=None):
+    """Import des anciens fichiers puis ramasse-miettes : {"importes": n, "supprimes": n, "octets": n}."""
+    imported = import_files(db_path, store_path, progress, cancelled)
+    removed, size = collect_garbage(db_path, store_path, progress=progress, cancelled=cancelled)
+    return {"importes": imported, "supprimes": removed, "octets": size}
+
+# --- Vignettes (interface)
+def render_thumbnail(data, mime, size):
+    """QImage dont le plus grand côté fait `size` px : images décodées directement, PDF par leur première page."""
+    from PyQt6.QtCore import Qt, QBuffer, QIODevice, QSize
+    from PyQt6.QtGui import QImage
+    if mime == "application/pdf":
+        from PyQt6.QtPdf import QPdfDocument  # importé au premier aperçu de facture PDF
+        buf = QBuffer(); buf.setData(data); buf.open(QIODevice.OpenModeFlag.ReadOnly)
+        doc = QPdfDocument(None); doc.load(buf)
+        if doc.pageCount() < 1: return None
+        page = doc.pagePointSize(0); scale = size / max(page.width(), page.height(), 1)
+        img = doc.render(0, QSize(max(1, round(page.width() * scale)), max(1, round(page.height() * scale)))); doc.close()
+        return None if img.isNull() else img
+    img = QImage.fromData(data)
+    if img.isNull(): return None
+    return img.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+
+class ThumbnailCache:
+    """Vignettes des factures récemment affichées (LRU bornée en octets) : une facture déjà vue n'est ni relue
+    dans le magasin ni décodée à nouveau. Clé : (référence, taille) ; le contenu d'une référence ne change jamais."""
+
+    def __init__(self, store, budget_mb=32):
+        self.store = store; self.budget = budget_mb * 1024 * 1024; self.items = OrderedDict(); self.used = 0
+        self.hits = self.misses = 0
+
+    def get(self, value, size=240):
+        k = (value, size); img = self.items.get(k)
+        if img is not None: self.items.move_to_end(k); self.hits += 1; return img
+        self.misses += 1; row = self.store.get(value)
+        img = render_thumbnail(row[1], row[0], size) if row else None
+        if img is None: return None
+        self.items[k] = img; self.used += img.sizeInBytes()
+        while self.used > self.budget and len(self.items) > 1: self.used -= self.items.popitem(last=False)[1].sizeInBytes()
+        return img
+
+    def clear(self):
+        self.items.clear(); self.used = 0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("action", choices=["gc", "import", "stats"]); ap.add_argument("--db", default="database/inventaire.db")
+    ap.add_argument("--store", default=STORE_PATH); ap.add_argument("--grace", type=int, default=3600, help="âge minimal (s) d'un asset supprimé")
+    args = ap.parse_args()
+    if args.action == "gc": print("%d assets supprimés, %d octets libérés" % collect_garbage(args.db, args.store, args.grace))
+    elif args.action == "import": print(f"{import_files(args.db, args.store)} fichiers importés")
+    store = AssetStore(args.store); print(store.stats()); store.close()
@@ -0,0 +1 @@
+"""Benchmarks ProStock : scripts autonomes, lancés avec `python -m benchmarks.<nom>`."""
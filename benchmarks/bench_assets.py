@@ -0,0 +1,84 @@
+"""Magasin d'assets (assets.py) face aux fichiers séparés de l'ancien data/qrcodes : écriture et lecture des QR,
+place occupée sur le disque, vignettes de factures (cache LRU) et ramasse-miettes après suppressions.
+
+Usage : python -m benchmarks.bench_assets [--items 2000] [--reads 5000]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QColor, QImage
+from PyQt6.QtWidgets import QApplication
+
+import assets
+import qr
+from database import Database
+
+
+def ms(times):
+    return f"médiane {statistics.median(times) * 1000:.3f} ms, max {max(times) * 1000:.2f} ms"
+
+
+def disk_usage(paths):
+    return sum(os.stat(p).st_blocks * 512 for p in paths)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--items", type=int, default=2000); ap.add_argument("--reads", type=int, default=5000)
+    args = ap.parse_args(); app = QApplication.instance() or QApplication([]); rnd = random.Random(1)
+    import qrcode, io
+    pngs = []
+    for i in range(args.items):
+        buf = io.BytesIO(); qrcode.make(qr.payload(i, f"SON-{i:06d}")).save(buf, format="PNG"); pngs.append(buf.getvalue())
+    print(f"{args.items} QR rendus ({sum(map(len, pngs)) / args.items:.0f} octets en moyenne)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Écriture : un fichier par QR (écriture temporaire puis renommage, comme l'ancien cache) / une ligne du magasin
+        qdir = os.path.join(tmp, "qrcodes"); os.makedirs(qdir); files, w_files = [], []
+        for i, data in enumerate(pngs):
+            path = os.path.join(qdir, f"{i:08d}.png"); t = time.perf_counter()
+            with open(path + ".tmp", "wb") as f: f.write(data)
+            os.replace(path + ".tmp", path); w_files.append(time.perf_counter() - t); files.append(path)
+        store = assets.AssetStore(os.path.join(tmp, "assets.db")); refs, w_store = [], []
+        for data in pngs:
+            t = time.perf_counter(); refs.append(store.put(data, "image/png")); w_store.append(time.perf_counter() - t)
+        store.vacuum(); size = os.path.getsize(store.path)
+        t = time.perf_counter(); [store.put(data, "image/png") for data in pngs[:500]]; dup = (time.perf_counter() - t) / 500
+        print(f"écriture   fichiers : {ms(w_files)} ; magasin : {ms(w_store)} ; contenu déjà présent : {dup * 1000:.3f} ms")
+        print(f"disque     fichiers : {disk_usage(files) / 1024:.0f} Ko ; magasin : {size / 1024:.0f} Ko "
+              f"(inchangé après réécriture : {os.path.getsize(store.path) == size})")
+
+        picks = [rnd.randrange(args.items) for _ in range(args.reads)]; r_files, r_store = [], []
+        for k in picks:
+            t = time.perf_counter()
+            with open(files[k], "rb") as f: f.read()
+            r_files.append(time.perf_counter() - t)
+            t = time.perf_counter(); store.get(refs[k]); r_store.append(time.perf_counter() - t)
+        print(f"lecture    fichiers : {ms(r_files)} ; magasin : {ms(r_store)}")
+
+        # Vignettes : facture scannée (JPEG 2480x3508, A4 à 300 dpi) ; premier affichage puis affichages suivants
+        img = QImage(2480, 3508, QImage.Format.Format_RGB32); img.fill(QColor("#f4f1ea")); path = os.path.join(tmp, "facture.jpg"); img.save(path, quality=85)
+        inv = store.put_file(path); thumbs = assets.ThumbnailCache(store)
+        t = time.perf_counter(); thumbs.get(inv); miss = time.perf_counter() - t; hits = []
+        for _ in range(200):
+            t = time.perf_counter(); thumbs.get(inv); hits.append(time.perf_counter() - t)
+        print(f"vignette   {os.path.getsize(path) / 1024:.0f} Ko : décodage {miss * 1000:.1f} ms ; en cache : {ms(hits)}")
+
+        # Ramasse-miettes : 10 % des objets supprimés
+        db = Database(os.path.join(tmp, "inventaire.db"))
+        db.conn.executemany("INSERT INTO equipement (nom, sn, qr_path) VALUES (?,?,?)", [(f"Objet {i}", f"SON-{i:06d}", r) for i, r in enumerate(refs)])
+        db.conn.execute("DELETE FROM equipement WHERE id % 10 = 0"); db.conn.commit(); db.close(); store.close()
+        t = time.perf_counter(); n, freed = assets.collect_garbage(os.path.join(tmp, "inventaire.db"), store.path, grace=-60)
+        print(f"ramasse-miettes : {n} assets supprimés ({freed / 1024:.0f} Ko) en {(time.perf_counter() - t) * 1000:.1f} ms ; "
+              f"fichier {size / 1024:.0f} -> {os.path.getsize(store.path) / 1024:.0f} Ko")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Réactivité de l'interface pendant les lectures : blocage maximal de la boucle d'événements Qt
+quand les mêmes requêtes (index de scan complet, recherche, dashboard) tournent dans le thread de l'interface
+ou sur le pool de lecture de Database.
+
+Usage : QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_async [nb_objets]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from PyQt6.QtCore import QCoreApplication, QTimer
+
+import scanner
+from database import Database
+
+
+def queries(db):
+    def full_index(conn): index = scanner.ScanIndex(); index.load(conn); return len(index.items)
+    return [full_index, lambda conn: db.page(0, Database.fts_query("micro 1"), 200, conn), db.dashboard_stats,
+            lambda conn: conn.execute("SELECT COUNT(*), SUM(prix) FROM equipement WHERE marque LIKE '%on%'").fetchone()]
+
+
+def measure(app, run):
+    """Plus long intervalle entre deux ticks d'un timer de 5 ms pendant `run(fini)`."""
+    gaps, last, done = [], [time.perf_counter()], []
+    def tick(): now = time.perf_counter(); gaps.append(now - last[0]); last[0] = now
+    timer = QTimer(); timer.timeout.connect(tick); timer.start(5)
+    t = time.perf_counter(); QTimer.singleShot(0, lambda: run(lambda: done.append(time.perf_counter() - t)))
+    while not done: app.processEvents(); time.sleep(0.001)
+    app.processEvents(); gaps.append(time.perf_counter() - last[0])
+    timer.stop(); return max(gaps) * 1000, done[0] * 1000
+
+
+def main(n=300_000):
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        db.cursor.executemany("INSERT INTO equipement (nom, marque, sn, categorie, prix) VALUES (?,?,?,?,?)",
+                              [(f"Micro HF {i}", "Sennheiser" if i % 2 else "Sony", f"SON-{i:07d}", "Son", 300) for i in range(n)])
+        db.conn.commit(); qs = queries(db)
+
+        def sync(finish):
+            for q in qs: q(db.conn)
+            finish()
+        def background(finish):
+            left = [len(qs)]
+            def one(_):
+                left[0] -= 1
+                if not left[0]: finish()
+            for q in qs: db.submit(q, on_done=one)
+        for name, run in (("thread de l'interface", sync), ("pool de lecture", background)):
+            block, total = measure(app, run)
+            print(f"{name:<22} blocage max de l'interface {block:7.1f} ms, résultats en {total:7.1f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300_000)
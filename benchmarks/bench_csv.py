@@ -0,0 +1,36 @@
+"""Débit de l'export CSV en flux et de l'import en masse (lignes/seconde).
+
+Usage : python -m benchmarks.bench_csv [nb_lignes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import csv_io
+from database import Database, sn_prefix
+
+
+def main(n=50_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "src.db"); db = Database(src); rnd = random.Random(7)
+        db.cursor.executemany("INSERT INTO equipement (nom, marque, sn, quantite, statut, categorie, prix) VALUES (?,?,?,?,?,?,?)",
+                              [(f"Objet {i}", rnd.choice(["Sony", "Canon", "Rode"]), f"SRC-{i:07d}" if i % 3 else None,
+                                rnd.randint(1, 4), "En stock", rnd.choice(["Son", "Photo", "Vidéo"]), 12.5) for i in range(n)])
+        db.conn.commit(); db.close()
+
+        path = os.path.join(tmp, "export.csv"); t = time.perf_counter()
+        count = csv_io.export_csv(src, path, headers=[c[0] for c in csv_io.COLUMNS]); dt = time.perf_counter() - t
+        print(f"export : {count} lignes en {dt:.2f} s -> {count / dt:,.0f} lignes/s")
+
+        dst = os.path.join(tmp, "dst.db"); Database(dst).close(); t = time.perf_counter()
+        res = csv_io.import_csv(dst, path, sn_prefix); dt = time.perf_counter() - t
+        print(f"import : {res['inserted']} lignes en {dt:.2f} s -> {res['inserted'] / dt:,.0f} lignes/s "
+              f"({res['duplicates']} doublons, {len(res['errors'])} erreurs)")
+        t = time.perf_counter(); res = csv_io.import_csv(dst, path, sn_prefix); dt = time.perf_counter() - t
+        print(f"réimport (tout en doublon) : {dt:.2f} s, {res['duplicates']} doublons")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
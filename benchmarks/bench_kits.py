@@ -0,0 +1,52 @@
+"""Sortie / retour de kits en masse sur un catalogue synthétique.
+
+Chaque kit regroupe des objets unitaires qui lui sont propres et une partie de lots partagés entre kits
+(câbles, piles...), ce qui force des scissions de lots à chaque sortie.
+
+Usage : python -m benchmarks.bench_kits [nb_kits] [objets_par_kit] [kits_par_sortie]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import kits
+from database import Database
+
+
+def main(n_kits=500, per_kit=20, batch=50):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db")); c = db.conn; rnd = random.Random(11)
+        n_lots = max(1, n_kits // 10)
+        c.executemany("INSERT INTO equipement (nom, sn, quantite, is_lot, categorie, prix) VALUES (?, ?, 1, 0, 'Son', 100)",
+                      [(f"Micro #{i}", f"SON-{i:07d}") for i in range(n_kits * (per_kit - 2))])
+        c.executemany("INSERT INTO equipement (nom, sn, quantite, is_lot, categorie, prix) VALUES (?, ?, 1000, 1, 'Câble', 2)",
+                      [(f"XLR 5 m #{i}", f"CAB-{i:05d}") for i in range(n_lots)])
+        c.executemany("INSERT INTO kits (nom_kit) VALUES (?)", [(f"Kit {k}",) for k in range(n_kits)])
+        unit, lots = [i for (i,) in c.execute("SELECT id FROM equipement WHERE is_lot=0")], [i for (i,) in c.execute("SELECT id FROM equipement WHERE is_lot=1")]
+        c.executemany("INSERT INTO kit_items (id_kit, id_equipement, quantite) VALUES (?, ?, ?)",
+                      [(k + 1, unit[k * (per_kit - 2) + j], None) for k in range(n_kits) for j in range(per_kit - 2)]
+                      + [(k + 1, i, rnd.randint(2, 8)) for k in range(n_kits) for i in rnd.sample(lots, min(2, n_lots))])
+        c.commit()
+
+        out_t, in_t = [], []
+        for start in range(0, n_kits, batch):
+            ids = list(range(start + 1, min(start + batch, n_kits) + 1))
+            t = time.perf_counter(); touched, conflicts = kits.checkout_kits(c, ids); out_t.append(time.perf_counter() - t)
+            assert not conflicts, conflicts[:3]
+            t = time.perf_counter(); kits.return_kits(c, ids); in_t.append(time.perf_counter() - t)
+        n_items = batch * per_kit
+        print(f"{n_kits} kits de {per_kit} objets, sorties par {batch} kits ({n_items} objets dont {2 * batch} parties de lots)")
+        print(f"  sortie : {sum(out_t) / len(out_t) * 1000:.1f} ms en moyenne, max {max(out_t) * 1000:.1f} ms")
+        print(f"  retour : {sum(in_t) / len(in_t) * 1000:.1f} ms en moyenne, max {max(in_t) * 1000:.1f} ms")
+
+        # Conflit : un objet du lot suivant déjà sorti -> rien n'est écrit
+        kits.checkout_kits(c, [1]); t = time.perf_counter(); _, conflicts = kits.checkout_kits(c, list(range(1, batch + 1)))
+        print(f"  détection de conflits : {(time.perf_counter() - t) * 1000:.1f} ms ({len(conflicts)} conflits)")
+        assert c.execute("SELECT COUNT(*) FROM equipement WHERE statut='Sorti' AND parent_id IS NULL").fetchone()[0] == per_kit - 2
+        db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
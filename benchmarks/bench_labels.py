@@ -0,0 +1,51 @@
+"""Débit de l'export de planches d'étiquettes (étiquettes/seconde).
+
+Compare l'ancien rendu (un PNG par QR + drawImage) à l'export vectoriel en flux,
+en mono-processus puis réparti sur tous les cœurs.
+
+Usage : python -m benchmarks.bench_labels [nb_etiquettes]
+"""
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import qrcode
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+import labels
+import qr
+from database import Database
+
+
+def raster_export(db_path, path, template):
+    """Reproduction de l'ancien export : un PNG rendu puis embarqué par étiquette."""
+    db = Database(db_path); c = canvas.Canvas(path, pagesize=template.pagesize); n = 0
+    for i_id, nom, marque, sn in db.cursor.execute("SELECT id, nom, marque, sn FROM equipement ORDER BY id").fetchall():
+        buf = io.BytesIO(); qrcode.make(qr.payload(i_id, sn)).save(buf, format="PNG"); buf.seek(0)
+        x, top = template.origin(n % template.per_page); s = template.qr_size
+        c.drawImage(ImageReader(buf), x, top - s, s, s); c.drawCentredString(x + s / 2, top - s - 10, marque); n += 1
+        if n % template.per_page == 0: c.showPage()
+    c.save(); db.close(); return n
+
+
+def main(n=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db"); db = Database(db_path)
+        db.cursor.executemany("INSERT INTO equipement (nom, marque, sn, categorie) VALUES (?,?,?,?)",
+                              [(f"Micro HF #{i}", "Sennheiser", f"SON-{i:07d}", "Son") for i in range(n)])
+        db.conn.commit(); db.close(); tpl = labels.TEMPLATES["A4 4x5"]
+        runs = [("raster (PNG/étiquette)", lambda p: raster_export(db_path, p, tpl)),
+                ("vectoriel, 1 processus", lambda p: labels.export_labels(db_path, p, tpl, workers=1)),
+                (f"vectoriel, {multiprocessing.cpu_count()} processus", lambda p: labels.export_labels(db_path, p, tpl, parallel_min=0))]
+        print(f"{n} étiquettes, modèle A4 4x5")
+        for name, fn in runs:
+            out = os.path.join(tmp, "out.pdf"); t = time.perf_counter(); count = fn(out); dt = time.perf_counter() - t
+            print(f"{name:<28}{count / dt:>10.0f} étiq./s{dt:>8.2f} s{os.path.getsize(out) / 1024:>10.0f} Kio")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
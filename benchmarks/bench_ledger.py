@@ -0,0 +1,55 @@
+"""Rapports d'utilisation sur plusieurs années de mouvements : agrégats journaliers contre relecture du journal.
+
+Usage : python -m benchmarks.bench_ledger [nb_objets] [annees]
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+import ledger
+from database import Database
+
+
+def main(n_items=2000, years=3):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db")); c = db.conn; rnd = random.Random(7)
+        c.executemany("INSERT INTO equipement (nom, sn, categorie) VALUES (?, ?, 'Son')", [(f"Micro #{i}", f"SON-{i:07d}") for i in range(n_items)])
+        c.commit()
+        # Chaque jour ~5 % du parc sort, pour 1 à 6 jours
+        day0 = datetime.datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) - datetime.timedelta(days=365 * years)
+        events = []
+        for d in range(365 * years):
+            for i in rnd.sample(range(1, n_items + 1), n_items // 20):
+                t = day0 + datetime.timedelta(days=d, minutes=rnd.randint(0, 600))
+                events.append((t, i, "out")); events.append((t + datetime.timedelta(days=rnd.randint(1, 6)), i, "in"))
+        events.sort(); t = time.perf_counter(); c.execute("BEGIN")
+        for at, i, sens in events: ledger.record(c, [(i, i, 1, sens, None)], at=at.isoformat(timespec="seconds"))
+        c.commit(); dt = time.perf_counter() - t
+        print(f"{len(events):,} mouvements journalisés en {dt:.1f} s ({len(events) / dt:,.0f} mvt/s, agrégats compris)")
+
+        end = datetime.date.today().isoformat(); start = (datetime.date.today() - datetime.timedelta(days=365)).isoformat()
+        t = time.perf_counter(); occ = ledger.occupation(c, start, end, n_items)
+        print(f"occupation sur un an : {occ:.1%} en {(time.perf_counter() - t) * 1000:.1f} ms")
+        t = time.perf_counter(); top = ledger.most_rented(c, start, end)
+        print(f"top 10 sur un an (agrégats) : {(time.perf_counter() - t) * 1000:.1f} ms")
+        daily = c.execute("SELECT id_equipement, SUM(sorties) FROM utilisation_jour WHERE jour BETWEEN ? AND ? GROUP BY 1",
+                          (start, end)).fetchall()
+        assert {i: n for i, _, n, _, _ in top} == {i: n for i, n in daily if i in {r[0] for r in top}}
+
+        # Référence : la même question posée directement au journal
+        t = time.perf_counter()
+        c.execute('''
+            SELECT id_equipement, COUNT(*) FROM mouvements WHERE sens = 'out' AND horodatage >= ?
+            GROUP BY id_equipement ORDER BY 2 DESC LIMIT 10
+        ''', (start,)).fetchall()
+        print(f"top 10 sur un an (relecture du journal) : {(time.perf_counter() - t) * 1000:.1f} ms")
+        t = time.perf_counter(); ledger.history(c, top[0][0])
+        print(f"historique d'un objet : {(time.perf_counter() - t) * 1000:.2f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
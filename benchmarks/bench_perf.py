@@ -0,0 +1,50 @@
+"""Coût des mesures (perf.py) : requêtes de l'application sur une connexion ordinaire puis sur une connexion
+mesurée, et coût d'un appel à une fonction décorée quand les mesures sont désactivées.
+
+Usage : python -m benchmarks.bench_perf [nb_objets]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import perf
+import scanner
+from benchmarks import fleet
+from database import Database
+
+
+def workload(db, conn):
+    last = 0
+    while batch := db.page(last, "", 200, conn): last = batch[-1][0]
+    db.page(0, Database.fts_query("micro senn"), 200, conn); db.dashboard_stats(conn); db.maintenance_rows(conn); db.kit_rows(conn)
+    index = scanner.ScanIndex(); index.load(conn)
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); times.append(time.perf_counter() - t)
+    return min(times) * 1000
+
+
+def main(n=50_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db")); fleet.generate(db, n)
+        plain = best(lambda: workload(db, db.conn))
+        perf.recorder.enable(os.path.join(tmp, "perf.log")); timed_conn = db.connect()
+        measured = best(lambda: workload(db, timed_conn))
+        n_sql, p50, p95, _ = perf.recorder.sql_summary()
+        print(f"{n:,} objets, pages + recherche + dashboard + maintenance + kits + index de scan :")
+        print(f"  connexion ordinaire {plain:8.1f} ms, connexion mesurée {measured:8.1f} ms (+{(measured / plain - 1) * 100:.1f} %, "
+              f"{n_sql // 5} requêtes par passage, p50 {p50:.2f} ms, p95 {p95:.2f} ms)")
+        perf.recorder.enabled = False
+        f = perf.timed("bench")(lambda: None); g = lambda: None; k = 1_000_000
+        t = time.perf_counter(); [f() for _ in range(k)]; decorated = time.perf_counter() - t
+        t = time.perf_counter(); [g() for _ in range(k)]; bare = time.perf_counter() - t
+        print(f"  fonction décorée, mesures désactivées : +{(decorated - bare) / k * 1e9:.0f} ns par appel")
+        timed_conn.close(); db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
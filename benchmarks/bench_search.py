@@ -0,0 +1,53 @@
+"""Compare la recherche LIKE '%...%' et l'index FTS5 sur une table `equipement` générée.
+
+Usage : python -m benchmarks.bench_search [nb_lignes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database import Database
+
+MARQUES = ["Sennheiser", "Sony", "Canon", "Aputure", "Rode", "Shure", "Neumann", "Blackmagic", "Manfrotto", "Zoom"]
+NOMS = {"Photo": ["Boîtier", "Objectif 50mm", "Flash"], "Vidéo": ["Caméra", "Moniteur", "Enregistreur"],
+        "Son": ["Micro HF", "Micro canon", "Casque"], "Câblage": ["Câble XLR M > XLR F", "Câble HDMI"], "Accessoires": ["Trépied", "Batterie"]}
+TERMES = ["sennheiser", "camera", "micro", "xlr", "zzz-introuvable"]
+
+
+def populate(db, n):
+    rnd = random.Random(42); rows = []
+    for i in range(n):
+        cat = rnd.choice(list(NOMS))
+        rows.append((f"{rnd.choice(NOMS[cat])} #{i}", rnd.choice(MARQUES), f"{cat[:4].upper()}-{i:07d}", cat, "Étagère " + str(i % 50)))
+    db.cursor.executemany("INSERT INTO equipement (nom, marque, sn, categorie, emplacement) VALUES (?,?,?,?,?)", rows)
+    db.conn.commit()
+
+
+def timed(cur, sql, params, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter(); cur.execute(sql, params); n = len(cur.fetchall()); best = min(best, time.perf_counter() - t)
+    return best * 1000, n
+
+
+def main(n=100_000, repeat=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db")); populate(db, n); cur = db.conn.cursor()
+        print(f"{n} lignes — meilleur temps sur {repeat} essais (page de 200 / total)")
+        print(f"{'terme':<18}{'LIKE page':>12}{'FTS page':>12}{'LIKE total':>12}{'FTS total':>12}{'lignes':>10}")
+        for term in TERMES:
+            like = f"%{term}%"
+            like_sql = "SELECT id FROM equipement WHERE nom LIKE ? OR marque LIKE ? OR categorie LIKE ?"
+            fts_sql = "SELECT id FROM equipement WHERE id IN (SELECT rowid FROM equipement_fts WHERE equipement_fts MATCH ?)"
+            lp, _ = timed(cur, like_sql + " ORDER BY id LIMIT 200", (like, like, like), repeat)
+            fp, _ = timed(cur, fts_sql + " ORDER BY id LIMIT 200", (Database.fts_query(term),), repeat)
+            lt, _ = timed(cur, like_sql, (like, like, like), repeat)
+            ft, nf = timed(cur, fts_sql, (Database.fts_query(term),), repeat)
+            print(f"{term:<18}{lp:>10.2f}ms{fp:>10.2f}ms{lt:>10.2f}ms{ft:>10.2f}ms{nf:>10}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
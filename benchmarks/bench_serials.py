@@ -0,0 +1,33 @@
+"""Allocation de S/N en masse : un million de S/N uniques pour un préfixe, avec un parc existant
+de S/N aléatoires (ancien format) qui entrent en collision avec la plage allouée.
+
+Usage : python -m benchmarks.bench_serials [nb_sn]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database import Database, SN_DIGITS, allocate_sns
+
+
+def main(n=1_000_000, legacy=100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db")); rnd = random.Random(3)
+        # Anciens S/N aléatoires, dont une partie volontairement dans la plage qui va être allouée
+        sns = {f"SON-{''.join(rnd.choices(SN_DIGITS, k=6))}" for _ in range(legacy)} | {f"SON-0000{a}{b}" for a in "0123" for b in SN_DIGITS}
+        db.cursor.executemany("INSERT INTO equipement (nom, sn, categorie) VALUES ('x', ?, 'Son')", [(sn,) for sn in sns]); db.conn.commit()
+
+        t = time.perf_counter(); out = allocate_sns(db.conn, "SON", n); dt = time.perf_counter() - t
+        assert len(out) == n and len(set(out)) == n and not set(out) & sns
+        print(f"{n:,} S/N alloués en {dt:.2f} s ({n / dt:,.0f} S/N/s), {len(sns):,} S/N existants évités")
+
+        t = time.perf_counter()
+        for _ in range(1000): db.allocate_sns("PHOT", 1)
+        print(f"allocation unitaire : {(time.perf_counter() - t):.3f} ms/S/N (1 transaction chacune)")
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,110 @@
+"""Parc synthétique reproductible (de 1 000 à 1 000 000 d'objets) pour les benchmarks.
+
+Catégories, marques et prix plausibles ; câbles et accessoires gérés en lots, dont une partie est scindée
+(lignes filles sorties) ; objets sortis avec leur journal de mouvements, objets en réparation et historique
+de réparations ; kits mêlant objets unitaires et parties de lots, dont certains sont sortis.
+Une même graine donne toujours le même parc.
+
+Usage : python -m benchmarks.fleet nb_objets [chemin.db] [--seed 1]
+"""
+import argparse
+import datetime
+import random
+import time
+
+import kits
+import ledger
+from database import Database, allocate_sns, sn_prefix
+
+# Catégorie -> (poids, [(nom, marques, prix min, prix max, quantité de lot ou None)])
+CATALOG = {
+    "Photo": (0.2, [("Boîtier hybride", ["Canon", "Nikon", "Sony", "Fujifilm"], 900, 3500, None),
+                    ("Objectif 24-70 mm", ["Canon", "Sigma", "Tamron", "Sony"], 600, 2200, None),
+                    ("Flash cobra", ["Godox", "Profoto", "Nikon"], 120, 900, None),
+                    ("Trépied", ["Manfrotto", "Gitzo", "Benro"], 90, 800, None)]),
+    "Vidéo": (0.2, [("Caméra cinéma", ["Blackmagic", "Sony", "Canon", "Panasonic"], 1500, 9000, None),
+                    ("Moniteur de champ", ["Atomos", "SmallHD"], 300, 1500, None),
+                    ("Stabilisateur", ["DJI", "Zhiyun"], 250, 900, None),
+                    ("Projecteur LED", ["Aputure", "Godox", "Nanlite"], 150, 1800, None)]),
+    "Son": (0.25, [("Micro HF", ["Sennheiser", "Shure", "Sony", "Rode"], 250, 1200, None),
+                   ("Enregistreur", ["Zoom", "Tascam", "Sound Devices"], 150, 3000, None),
+                   ("Perche", ["Rode", "K-Tek"], 80, 400, None),
+                   ("Casque", ["Sony", "Beyerdynamic", "Sennheiser"], 60, 300, None)]),
+    "Câblage": (0.2, [("Câble XLR 5 m", ["Cordial", "Klotz", "Neutrik"], 8, 30, (10, 60)),
+                      ("Câble HDMI 3 m", ["Belkin", "Hama"], 6, 25, (10, 40)),
+                      ("Rallonge secteur", ["Legrand", "Brennenstuhl"], 10, 40, (5, 30)),
+                      ("Câble USB-C", ["Anker", "Belkin"], 8, 20, (10, 50))]),
+    "Accessoires": (0.15, [("Batterie NP-F", ["Sony", "Patona"], 25, 90, (4, 30)),
+                           ("Carte SD 128 Go", ["SanDisk", "Lexar"], 20, 60, (5, 40)),
+                           ("Sac de transport", ["Peli", "Lowepro"], 40, 300, None),
+                           ("Pince étau", ["Manfrotto", "Smallrig"], 15, 45, (5, 20))]),
+}
+BORROWERS = ["Alice Martin", "Bruno Petit", "Chloé Durand", "David Leroy", "Emma Moreau", "Farid Benali", "Studio B", "Régie plateau"]
+REPAIRS = ["Connecteur cassé", "Écran fissuré", "Capteur sale", "Bruit de fond", "Bague bloquée", "Batterie gonflée", "Mise à jour firmware"]
+KIT_TYPES = ["Tournage", "Interview", "Reportage", "Podcast", "Live", "Photo studio"]
+CHUNK = 50_000
+
+
+def generate(db, n, seed=1):
+    """Remplit `db` (vide) avec `n` objets ; renvoie les effectifs générés."""
+    rnd = random.Random(seed); c = db.conn; now = datetime.datetime.now()
+    cats = list(CATALOG); weights = [CATALOG[k][0] for k in cats]
+    picks = rnd.choices(cats, weights, k=n); sns = {}
+    for cat in cats: sns[cat] = iter(allocate_sns(c, sn_prefix(cat), picks.count(cat)))
+    for start in range(0, n, CHUNK):
+        rows = []
+        for cat in picks[start:start + CHUNK]:
+            nom, brands, lo, hi, lot = rnd.choice(CATALOG[cat][1]); r = rnd.random()
+            statut = "En stock" if lot or r >= 0.17 else "Sorti" if r < 0.15 else "En Maintenance"
+            sortie = (now - datetime.timedelta(days=rnd.randint(0, 29))).strftime("%d/%m %H:%M") if statut == "Sorti" else None
+            rows.append((nom, rnd.choice(brands), f"{nom.split()[0][:3].upper()}-{rnd.randint(100, 999)}", next(sns[cat]),
+                         rnd.randint(*lot) if lot else 1, 1 if lot else 0, statut, sortie, cat, round(rnd.uniform(lo, hi), 2),
+                         f"Étagère {rnd.choice('ABCDEFGH')}{rnd.randint(1, 20)}"))
+        c.executemany("INSERT INTO equipement (nom, marque, modele, sn, quantite, is_lot, statut, date_sortie, categorie, prix, emplacement) "
+                      "VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+    items = c.execute("SELECT id, is_lot, quantite, statut FROM equipement").fetchall()
+
+    # Lots scindés : une partie sortie dans une ligne fille, comme toggle_status
+    split = [(i, rnd.randint(1, q - 1)) for i, lot, q, st in items if lot and q > 1 and rnd.random() < 0.2]
+    c.executemany("UPDATE equipement SET quantite=quantite-? WHERE id=?", [(q, i) for i, q in split])
+    c.executemany("INSERT INTO equipement (nom, marque, sn, quantite, is_lot, statut, parent_id, date_sortie, categorie, prix) "
+                  "SELECT nom, marque, ?, ?, 1, 'Sorti', id, ?, categorie, prix FROM equipement WHERE id=?",
+                  [(sn, q, now.strftime("%d/%m %H:%M"), i) for sn, (i, q) in zip(allocate_sns(c, "LOT", len(split)), split)])
+
+    # Journal : les sorties en cours, réparties sur les 30 derniers jours et entre quelques emprunteurs
+    outs = c.execute("SELECT id, COALESCE(parent_id, id), quantite FROM equipement WHERE statut='Sorti'").fetchall(); groups = {}
+    for i, p, q in outs: groups.setdefault((rnd.randint(1, 30), rnd.choice(BORROWERS)), []).append((i, p, q, "out", None))
+    for (days, who), moves in sorted(groups.items(), reverse=True):
+        ledger.record(c, moves, who, (now - datetime.timedelta(days=days)).isoformat(timespec="seconds"))
+
+    # Réparations : une en cours pour chaque objet en maintenance, un historique pour 5 % des autres
+    repairs = []
+    for i, lot, q, st in items:
+        for k in range(1 if st == "En Maintenance" else rnd.randint(1, 3) if not lot and rnd.random() < 0.05 else 0):
+            day = (now - datetime.timedelta(days=rnd.randint(0, 7) if st == "En Maintenance" else rnd.randint(30, 900))).strftime("%Y-%m-%d")
+            repairs.append((i, day, rnd.choice(REPAIRS), round(rnd.uniform(20, 400), 2), rnd.choice(["SAV constructeur", "Atelier interne", "Réparateur agréé"])))
+    c.executemany("INSERT INTO reparations (id_equipement, date_reparation, description, cout, prestataire) VALUES (?,?,?,?,?)", repairs)
+
+    # Kits : 3 à 10 objets unitaires en stock et jusqu'à 2 parties de lots ; 10 % sont sortis
+    units = [i for i, lot, q, st in items if not lot and st == "En stock"]; lots = [i for i, lot, q, st in items if lot]
+    n_kits = max(1, n // 40)
+    c.executemany("INSERT INTO kits (nom_kit) VALUES (?)", [(f"Kit {rnd.choice(KIT_TYPES)} {k:05d}",) for k in range(n_kits)])
+    kit_ids = [k for (k,) in c.execute("SELECT id FROM kits ORDER BY id")]
+    c.executemany("INSERT OR IGNORE INTO kit_items (id_kit, id_equipement, quantite) VALUES (?,?,?)",
+                  [(k, i, None) for k in kit_ids for i in rnd.sample(units, min(len(units), rnd.randint(3, 10)))]
+                  + [(k, i, rnd.randint(1, 3)) for k in kit_ids for i in rnd.sample(lots, min(len(lots), rnd.randint(0, 2)))])
+    c.commit()
+    for k in rnd.sample(kit_ids, len(kit_ids) // 10): kits.checkout_kits(c, [k], rnd.choice(BORROWERS))  # conflits ignorés
+
+    count = lambda sql: c.execute(sql).fetchone()[0]
+    return {"objets": count("SELECT COUNT(*) FROM equipement"), "lots": count("SELECT COUNT(*) FROM equipement WHERE is_lot=1 AND parent_id IS NULL"),
+            "sortis": count("SELECT COUNT(*) FROM equipement WHERE statut='Sorti'"), "reparations": len(repairs),
+            "kits": n_kits, "kits_sortis": count("SELECT COUNT(DISTINCT id_kit) FROM kit_checkouts")}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("n", type=int); ap.add_argument("path", nargs="?", default="database/fleet.db"); ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(); t = time.perf_counter(); db = Database(args.path)
+    summary = generate(db, args.n, args.seed); db.close()
+    print(f"{args.path} : {summary} en {time.perf_counter() - t:.1f} s")
@@ -0,0 +1,87 @@
+"""Test de charge du mode serveur : N postes (20 par défaut) scannent en même temps sur une même machine.
+
+Le serveur tourne dans un processus séparé sur une base synthétique ; chaque poste a son cache local,
+une boucle de synchronisation (attente longue sur /changes) et une boucle de scans envoyés par lots de 150 ms.
+Mesures : latence d'écriture d'un lot, délai de propagation d'un mouvement vers les autres postes,
+puis vérification que tous les caches sont identiques à la base du serveur.
+
+Usage : python -m benchmarks.load_stations [postes] [durée_s] [scans_par_s_et_par_poste]
+"""
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from database import Database
+
+
+def run_server(db_path, ready):
+    import server
+    srv = server.serve(db_path, port=0); ready.put(srv.server_address[1]); srv.serve_forever()
+
+
+def percentiles(values):
+    if not values: return "aucune mesure"
+    values = sorted(values); q = lambda p: values[min(len(values) - 1, int(p * len(values)))] * 1000
+    return f"p50 {q(0.5):.1f} ms, p95 {q(0.95):.1f} ms, p99 {q(0.99):.1f} ms"
+
+
+def main(n_stations=20, duration=20.0, rate=5.0, n_items=5000):
+    from station import Station
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "serveur.db"); db = Database(db_path)
+        db.cursor.executemany("INSERT INTO equipement (nom, sn, categorie, prix) VALUES (?, ?, 'Son', 100)",
+                              [(f"Micro #{i}", f"SON-{i:07d}") for i in range(n_items)]); db.conn.commit(); db.close()
+        ctx = multiprocessing.get_context("spawn"); ready = ctx.Queue()
+        proc = ctx.Process(target=run_server, args=(db_path, ready), daemon=True); proc.start(); port = ready.get(timeout=60)
+        url = f"http://127.0.0.1:{port}"
+
+        written, lock = {}, threading.Lock()  # id -> instant d'acquittement de la dernière écriture
+        flush_lat, prop_lat, scans = [], [], [0]
+        stations = [Station(url, os.path.join(tmp, f"poste{k}.db")) for k in range(n_stations)]
+        t = time.perf_counter()
+        for st in stations: st.sync()
+        print(f"{n_stations} postes, {n_items:,} objets : instantanés initiaux en {time.perf_counter() - t:.2f} s")
+
+        stop = threading.Event()
+        def on_change(ids):
+            now = time.perf_counter()
+            with lock: prop_lat.extend(now - written[i] for i in ids if i in written)
+        def scan_loop(st, k):
+            rnd = random.Random(k); next_flush = time.perf_counter() + 0.15
+            while not stop.is_set():
+                i = rnd.randint(1, n_items)
+                row = st.cache.reader().execute("SELECT statut FROM equipement WHERE id=?", (i,)).fetchone()
+                if row and row[0] != "En Maintenance": st.move(i, "in" if row[0] == "Sorti" else "out"); scans[0] += 1
+                time.sleep(rnd.expovariate(rate))
+                if time.perf_counter() >= next_flush:
+                    t0 = time.perf_counter(); touched = st.flush(f"poste {k}"); t1 = time.perf_counter()
+                    flush_lat.append(t1 - t0); next_flush = t1 + 0.15
+                    with lock: written.update((i, t1) for i in touched)
+        threads = [threading.Thread(target=st.run, args=(stop, on_change, 5.0), daemon=True) for st in stations]
+        threads += [threading.Thread(target=scan_loop, args=(st, k), daemon=True) for k, st in enumerate(stations)]
+        for th in threads: th.start()
+        time.sleep(duration); stop.set()
+        for th in threads[n_stations:]: th.join()
+        for st in stations: st.flush()
+        print(f"{scans[0]:,} scans en {duration:.0f} s ({scans[0] / duration:,.0f} scans/s), {len(flush_lat):,} lots écrits")
+        print(f"  écriture d'un lot : {percentiles(flush_lat)}")
+        print(f"  propagation vers les autres postes : {percentiles(prop_lat)}")
+
+        # Cohérence : après une dernière synchronisation, chaque cache doit refléter la base du serveur
+        ref = sqlite3.connect(db_path).execute("SELECT id, statut, quantite FROM equipement ORDER BY id").fetchall()
+        for th in threads[:n_stations]: th.join(timeout=10)
+        bad = 0
+        for st in stations:
+            st.sync(); bad += st.cache.conn.execute("SELECT id, statut, quantite FROM equipement ORDER BY id").fetchall() != ref
+            st.close()
+        print(f"  caches cohérents avec le serveur : {n_stations - bad}/{n_stations}")
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    main(*(float(a) if k else int(a) for k, a in enumerate(sys.argv[1:4])))
@@ -0,0 +1,90 @@
+"""Rejeu de scans : latence de traitement d'un scan (résolution + mise en file) et coût des écritures par lot.
+
+Sans argument, un parc synthétique est créé et des scans (QR ProStock et S/N bruts) sont générés ;
+des images 1280x720 (QR sur fond bruité) servent à mesurer le décodage webcam.
+On peut rejouer des enregistrements réels : un fichier texte (un scan par ligne) et/ou un dossier d'images.
+
+Usage : python -m benchmarks.replay_scans [--items N] [--scans fichier.txt] [--frames dossier] [--batch 10]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import cv2
+import numpy
+import qrcode
+
+import qr
+import scanner
+from database import Database
+
+
+def percentiles(values):
+    values = sorted(values); q = lambda p: values[min(len(values) - 1, int(p * len(values)))]
+    return f"p50 {q(0.5) * 1000:.3f} ms, p95 {q(0.95) * 1000:.3f} ms, max {values[-1] * 1000:.3f} ms"
+
+
+def synthetic_frames(items, n, rnd):
+    """Images BGR d'un QR ProStock posé sur un fond bruité, à une position et une taille variables."""
+    frames = []
+    for i_id, sn in rnd.sample(items, min(n, len(items))):
+        code = numpy.array(qrcode.make(qr.payload(i_id, sn), border=2).get_image().convert("L"), dtype=numpy.uint8)
+        size = rnd.randint(180, 360); code = cv2.resize(code, (size, size), interpolation=cv2.INTER_NEAREST)
+        img = numpy.random.default_rng(i_id).integers(60, 200, (720, 1280), dtype=numpy.uint8)
+        y, x = rnd.randint(80, 640 - size), rnd.randint(140, 1140 - size)  # dans la zone analysée (roi 0.8)
+        img[y:y + size, x:x + size] = code; frames.append(cv2.cvtColor(img, cv2.COLOR_GRAY2BGR))
+    return frames
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--items", type=int, default=10_000); ap.add_argument("--scans", help="fichier, un scan par ligne")
+    ap.add_argument("--frames", help="dossier d'images enregistrées"); ap.add_argument("--count", type=int, default=5000)
+    ap.add_argument("--batch", type=int, default=10, help="scans par écriture (≈ 10 scans/s pendant la fenêtre de 150 ms)")
+    args = ap.parse_args(); rnd = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        db.cursor.executemany("INSERT INTO equipement (nom, sn, categorie) VALUES (?, ?, 'Son')",
+                              [(f"Micro #{i}", f"SON-{i:07d}") for i in range(args.items)]); db.conn.commit()
+        items = db.cursor.execute("SELECT id, sn FROM equipement").fetchall()
+
+        t = time.perf_counter(); index = scanner.ScanIndex(); index.load(db.conn)
+        print(f"index : {len(index.items):,} objets chargés en {(time.perf_counter() - t) * 1000:.1f} ms")
+
+        if args.scans:
+            with open(args.scans, encoding="utf-8") as f: scans = [line.strip() for line in f if line.strip()]
+        else:
+            # 80 % de QR ProStock, 15 % de S/N bruts, 5 % de codes inconnus ; un même objet revient (sortie puis retour)
+            pick = [rnd.choice(items) for _ in range(args.count)]
+            scans = [qr.payload(i, sn) if r < 0.8 else sn if r < 0.95 else f"EAN{rnd.randint(0, 10**12)}"
+                     for (i, sn), r in zip(pick, (rnd.random() for _ in pick))]
+
+        session = scanner.ScanSession(db.conn, index); latency, flushes, outcome = [], [], {"out": 0, "in": 0, "rejet": 0}
+        for k, text in enumerate(scans, start=1):
+            t = time.perf_counter(); item_id, res = session.scan(text); latency.append(time.perf_counter() - t)
+            outcome[res if item_id is not None else "rejet"] += 1
+            if k % args.batch == 0 or k == len(scans):
+                t = time.perf_counter(); session.flush(); flushes.append(time.perf_counter() - t)
+        print(f"{len(scans):,} scans ({outcome['out']} sorties, {outcome['in']} retours, {outcome['rejet']} rejets)")
+        print(f"  traitement d'un scan : {percentiles(latency)}")
+        print(f"  écriture par lot de {args.batch} : {percentiles(flushes)} ({statistics.fmean(flushes) / args.batch * 1000:.3f} ms/scan)")
+
+        if args.frames:
+            names = sorted(os.listdir(args.frames))
+            frames = [img for img in (cv2.imread(os.path.join(args.frames, n)) for n in names) if img is not None]
+        else:
+            frames = synthetic_frames(items, 200, rnd)
+        if frames:
+            decode, found = [], 0
+            for img in frames:
+                t = time.perf_counter(); found += bool(scanner.decode_frame(img)); decode.append(time.perf_counter() - t)
+            print(f"{len(frames)} images {frames[0].shape[1]}x{frames[0].shape[0]} : {found} QR lus")
+            print(f"  décodage : {percentiles(decode)}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
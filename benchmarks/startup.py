@@ -0,0 +1,94 @@
+"""Temps de démarrage de l'application : coût des imports (`python -X importtime`) et délai jusqu'au premier affichage
+de la fenêtre avec les premières lignes de l'inventaire.
+
+Chaque mesure est faite dans un nouveau processus, sur une base synthétique. Avec --budget, le script sort en erreur
+si le premier affichage dépasse le budget ou si un module lourd (OpenCV, zbar, qrcode, reportlab) est importé
+au démarrage : utilisable tel quel en intégration continue.
+
+Usage : python -m benchmarks.startup [--items 50000] [--runs 5] [--budget ms] [--json resultats.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from database import Database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("cv2", "pyzbar", "qrcode", "reportlab", "numpy", "PIL")
+
+# Exécuté dans le processus mesuré (répertoire courant = dossier de la base synthétique)
+CHILD = '''
+import json, sys, time
+t0 = time.perf_counter()
+import main
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+t1 = time.perf_counter(); app = QApplication(sys.argv); win = main.MainWindow(); t2 = time.perf_counter()
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and win.inv_model.rowCount() and not hasattr(self, "t"): self.t = time.perf_counter(); app.quit()
+        return False
+probe = FirstPaint(); win.table.viewport().installEventFilter(probe); win.show(); app.exec()
+print(json.dumps({"imports": t1 - t0, "fenetre": t2 - t1, "premier_affichage": probe.t - t0,
+                  "lignes": win.inv_model.rowCount(), "lourds": sorted({m.split(".")[0] for m in sys.modules} & set(%r))}))
+win.close()
+''' % (HEAVY,)
+
+
+def import_times(env, cwd):
+    """[(module, propre µs, cumulé µs, profondeur)] pour `import main`, d'après `python -X importtime`."""
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env=env, cwd=cwd, capture_output=True, text=True)
+    rows = []
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        own, cum, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(own), int(cum), (len(name) - len(name.lstrip()) - 1) // 2))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--items", type=int, default=50_000); ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15, help="imports les plus coûteux affichés")
+    ap.add_argument("--budget", type=float, help="délai maximal (ms) jusqu'au premier affichage, médiane")
+    ap.add_argument("--json", help="écrit les résultats dans ce fichier"); args = ap.parse_args()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "database", "inventaire.db"))
+        db.cursor.executemany("INSERT INTO equipement (nom, marque, sn, categorie, prix) VALUES (?,?,?,?,?)",
+                              [(f"Micro HF {i}", "Sennheiser", f"SON-{i:07d}", "Son", 300) for i in range(args.items)])
+        db.conn.commit(); db.close(); shutil.copy(os.path.join(ROOT, "styles.qss"), tmp)
+
+        rows = import_times(env, tmp); top = [r for r in rows if r[3] == 1]  # modules importés directement par main
+        total = next(r[2] for r in rows if r[0] == "main")
+        print(f"import de main : {total / 1000:.1f} ms ; les plus coûteux de ses imports (cumulé) :")
+        for name, own, cum, _ in sorted(top, key=lambda r: -r[2])[:args.top]: print(f"  {cum / 1000:8.1f} ms  {name}")
+
+        runs = []
+        for _ in range(args.runs):
+            t = time.perf_counter()
+            res = subprocess.run([sys.executable, "-c", CHILD], env=env, cwd=tmp, capture_output=True, text=True, timeout=120)
+            if res.returncode: sys.exit(f"échec du démarrage :\n{res.stderr}")
+            runs.append(dict(json.loads(res.stdout.strip().splitlines()[-1]), processus=time.perf_counter() - t))
+    med = {k: statistics.median(r[k] for r in runs) * 1000 for k in ("imports", "fenetre", "premier_affichage", "processus")}
+    heavy = runs[0]["lourds"]
+    print(f"{args.runs} démarrages, {args.items:,} objets (médianes) : imports {med['imports']:.0f} ms, fenêtre {med['fenetre']:.0f} ms, "
+          f"premier affichage {med['premier_affichage']:.0f} ms ({runs[0]['lignes']} lignes), processus complet {med['processus']:.0f} ms")
+    print(f"modules lourds chargés au démarrage : {', '.join(heavy) or 'aucun'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"items": args.items, "ms": med, "lourds": heavy, "imports": [{"module": n, "propre_us": o, "cumule_us": c}
+                                                                                    for n, o, c, _ in sorted(top, key=lambda r: -r[2])]}, f, indent=1)
+    if args.budget is not None and (med["premier_affichage"] > args.budget or heavy):
+        sys.exit(f"budget de démarrage dépassé ({med['premier_affichage']:.0f} ms pour {args.budget:.0f} ms, lourds : {heavy})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Suite de benchmarks reproductible : requêtes des pages, sortie / retour de lots, exports et affichage,
+sur des parcs synthétiques de plusieurs tailles (benchmarks/fleet.py). Les résultats sont écrits en JSON
+pour comparer deux commits : --compare signale (et fait échouer) les mesures plus lentes que la référence.
+
+Les requêtes mesurées sont celles de l'application (constantes SQL de Database) ; l'affichage est mesuré
+hors écran (QT_QPA_PLATFORM=offscreen) avec la vraie fenêtre.
+
+Usage : python -m benchmarks.suite [--sizes 1000,10000,100000] [--repeat 7] [--json resultats.json]
+                                   [--compare reference.json] [--tolerance 1.25]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+
+import assets
+import csv_io
+import labels
+import qr
+from benchmarks import fleet
+from database import Database
+from main import InventoryModel, LogicManager, MainWindow
+
+
+def measure(fn, repeat):
+    """Durées (ms) de `repeat` appels : médiane, minimum, maximum."""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); times.append((time.perf_counter() - t) * 1000)
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "max_ms": max(times), "n": repeat}
+
+
+def per_op(times):
+    times = [t * 1000 for t in times]
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "max_ms": max(times), "n": len(times)}
+
+
+def settle(app, db, timeout=60):
+    """Traite les événements jusqu'à ce que toutes les lectures en arrière-plan soient livrées."""
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        app.processEvents()
+        if not db.pending: return
+        time.sleep(0.001)
+
+
+def scroll(db):
+    """Parcours de tout l'inventaire par paquets, comme fetchMore au fil du défilement."""
+    last = 0
+    while batch := db.page(last, "", InventoryModel.BATCH): last = batch[-1][0]
+
+
+def bench_queries(db, repeat):
+    match = Database.fts_query("micro senn")
+    return {"load_data.premiere_page": measure(lambda: db.page(0, "", InventoryModel.BATCH), repeat),
+            "load_data.recherche": measure(lambda: db.page(0, match, InventoryModel.BATCH), repeat),
+            "load_data.defilement_complet": measure(lambda: scroll(db), 1),
+            "update_dashboard": measure(db.dashboard_stats, repeat),
+            "load_maintenance_data": measure(db.maintenance_rows, repeat),
+            "load_kits_data": measure(db.kit_rows, repeat)}
+
+
+def bench_toggle(db, count=50):
+    """Sortie d'une partie de lot (scission en ligne fille) puis son retour, par LogicManager.move_item comme toggle_status."""
+    lots = [i for (i,) in db.conn.execute("SELECT id FROM equipement WHERE is_lot=1 AND parent_id IS NULL AND statut='En stock' AND quantite > 1 LIMIT ?", (count,))]
+    out, back, children = [], [], []
+    for i in lots:
+        t = time.perf_counter(); children.append(LogicManager.move_item(db, i, db.item_state(i), 1, "Bench")[-1]); out.append(time.perf_counter() - t)
+    for i in children:
+        t = time.perf_counter(); LogicManager.move_item(db, i, db.item_state(i)); back.append(time.perf_counter() - t)
+    return {"toggle_status.scission": per_op(out), "toggle_status.retour": per_op(back)}
+
+
+def bench_exports(db, tmp, labels_count=1000, qr_count=200):
+    ids = db.conn.execute("SELECT id, sn FROM equipement WHERE sn IS NOT NULL ORDER BY id LIMIT ?", (max(labels_count, qr_count),)).fetchall()
+    last = ids[min(labels_count, len(ids)) - 1][0]; renders = []
+    res = {"export_csv": measure(lambda: csv_io.export_csv(db.path, os.path.join(tmp, "export.csv")), 1),
+           "export_csv.toutes_colonnes": measure(lambda: csv_io.export_csv(db.path, os.path.join(tmp, "export.csv"), [c[0] for c in csv_io.COLUMNS]), 1),
+           "export_labels": measure(lambda: labels.export_labels(db.path, os.path.join(tmp, "labels.pdf"), labels.TEMPLATES["A4 4x5"],
+                                                                 where="id <= ?", params=(last,)), 1)}
+    res["export_labels"]["etiquettes"] = min(labels_count, len(ids))
+    store = assets.AssetStore(os.path.join(tmp, "assets.db"))
+    for i, sn in ids[:qr_count]:
+        t = time.perf_counter(); qr.render(i, sn, store); renders.append(time.perf_counter() - t)
+    store.close(); res["qr_render"] = per_op(renders); return res
+
+
+def bench_ui(app):
+    """Fenêtre réelle sur database/inventaire.db (répertoire courant) : premier affichage, pages, modèle complet."""
+    t = time.perf_counter(); win = MainWindow(); built = time.perf_counter()
+    painted = []
+    class Probe(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and win.inv_model.rowCount() and not painted: painted.append(time.perf_counter())
+            return False
+    probe = Probe(); win.table.viewport().installEventFilter(probe); win.show()
+    while not painted: app.processEvents()
+    settle(app, win.db)
+    res = {"ui.fenetre": {"median_ms": (built - t) * 1000, "n": 1}, "ui.premier_affichage": {"median_ms": (painted[0] - t) * 1000, "n": 1}}
+    for name, index in (("kits", 1), ("check", 2), ("maintenance", 3), ("scan", 4)):
+        t = time.perf_counter(); win.content.setCurrentIndex(index); settle(app, win.db); app.processEvents()
+        res[f"ui.page_{name}"] = {"median_ms": (time.perf_counter() - t) * 1000, "n": 1}
+    win.content.setCurrentIndex(0); settle(app, win.db)
+    t = time.perf_counter(); win.inv_model.fetch_all(); app.processEvents()
+    res["ui.modele_complet"] = {"median_ms": (time.perf_counter() - t) * 1000, "n": 1, "lignes": win.inv_model.rowCount()}
+    win.close(); win.db.close(); win.deleteLater(); app.processEvents(); return res
+
+
+def run(size, repeat, seed, app):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # la fenêtre utilise des chemins relatifs (database/, data/assets.db)
+        try:
+            db = Database(); t = time.perf_counter(); summary = fleet.generate(db, size, seed)
+            res = {"parc": summary, "generation": {"median_ms": (time.perf_counter() - t) * 1000, "n": 1}}
+            res.update(bench_queries(db, repeat)); res.update(bench_toggle(db)); res.update(bench_exports(db, tmp))
+            db.close(); res.update(bench_ui(app))
+        finally:
+            os.chdir(cwd)
+    return res
+
+
+def environment():
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError: commit = ""
+    return {"commit": commit, "date": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version, "plateforme": platform.platform(), "cpus": os.cpu_count()}
+
+
+def compare(results, reference, tolerance):
+    """Affiche les écarts avec la référence ; renvoie les mesures plus lentes que `tolerance` x la référence."""
+    slower = []
+    for size, benches in results["tailles"].items():
+        for name, m in benches.items():
+            ref = reference.get("tailles", {}).get(size, {}).get(name)
+            if not isinstance(m, dict) or "median_ms" not in m or not ref or not ref.get("median_ms"): continue
+            ratio = m["median_ms"] / ref["median_ms"]; flag = ""
+            if ratio > tolerance and m["median_ms"] - ref["median_ms"] > 1: slower.append((size, name, ratio)); flag = "  <-- régression"
+            print(f"  {size:>8} {name:<32} {ref['median_ms']:10.2f} -> {m['median_ms']:10.2f} ms  x{ratio:.2f}{flag}")
+    return slower
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="1000,10000,100000", help="tailles de parc, séparées par des virgules (jusqu'à 1000000)")
+    ap.add_argument("--repeat", type=int, default=7); ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="écrit les résultats dans ce fichier"); ap.add_argument("--compare", help="résultats JSON de référence")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="rapport au-delà duquel une mesure est une régression")
+    args = ap.parse_args(); app = QApplication.instance() or QApplication(sys.argv)
+    results = {"environnement": environment(), "repeat": args.repeat, "seed": args.seed, "tailles": {}}
+    for size in (int(s) for s in args.sizes.split(",")):
+        res = results["tailles"][str(size)] = run(size, args.repeat, args.seed, app)
+        print(f"--- {size:,} objets : {res['parc']}")
+        for name, m in res.items():
+            if name != "parc": print(f"  {name:<32} {m['median_ms']:10.2f} ms" + (f"  (min {m['min_ms']:.2f}, max {m['max_ms']:.2f}, n={m['n']})" if m["n"] > 1 else ""))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(results, f, indent=1, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: reference = json.load(f)
+        print(f"comparaison avec {args.compare} ({reference.get('environnement', {}).get('commit', '?')}) :")
+        slower = compare(results, reference, args.tolerance)
+        if slower: sys.exit(f"{len(slower)} mesure(s) plus lente(s) que x{args.tolerance} la référence")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Export CSV en flux et import en masse, au format Excel FR (séparateur `;`, utf-8 avec BOM)."""
+import csv
+import sqlite3
+
+import ledger
+from database import allocate_sns
+
+BATCH = 5000
+STATUTS = ["En stock", "Sorti", "En Maintenance"]
+
+# (en-tête, expression SQL, cochée par défaut) ; les colonnes par défaut reproduisent l'export historique
+COLUMNS = [
+    ("ID", "e.id", True), ("Cat", "e.categorie", True), ("Nom", "e.nom", True), ("Marque", "e.marque", True),
+    ("Modèle", "e.modele", False), ("S/N", "e.sn", True), ("Qté", "e.quantite", True), ("Statut", "e.statut", True),
+    ("Sorti", "e.date_sortie", True), ("Prix", "e.prix", False), ("Emplacement", "e.emplacement", False),
+    ("Réparations", "r.nb", False), ("Coût réparations", "r.total", False), ("Kits", "k.noms", False),
+]
+REPAIRS_JOIN = "LEFT JOIN (SELECT id_equipement, COUNT(*) AS nb, SUM(cout) AS total FROM reparations GROUP BY id_equipement) r ON r.id_equipement = e.id"
+KITS_JOIN = ("LEFT JOIN (SELECT ki.id_equipement, GROUP_CONCAT(k.nom_kit, ', ') AS noms FROM kit_items ki "
+             "JOIN kits k ON k.id = ki.id_kit GROUP BY ki.id_equipement) k ON k.id_equipement = e.id")
+
+# En-tête CSV -> colonne de `equipement` pour l'import (ID est ignoré : la base attribue les ids)
+IMPORT_FIELDS = {"Cat": "categorie", "Nom": "nom", "Marque": "marque", "Modèle": "modele", "S/N": "sn", "Qté": "quantite",
+                 "Statut": "statut", "Sorti": "date_sortie", "Prix": "prix", "Emplacement": "emplacement"}
+
+def export_csv(db_path, path, headers=None, progress=None, cancelled=None):
+    """Écrit `equipement` (+ réparations / kits si demandés) par paquets de BATCH lignes ; renvoie le nombre de lignes."""
+    cols = [c for c in COLUMNS if (c[0] in headers if headers else c[2])]
+    exprs = [c[1] for c in cols]
+    joins = [j for prefix, j in (("r.", REPAIRS_JOIN), ("k.", KITS_JOIN)) if any(e.startswith(prefix) for e in exprs)]
+    conn = sqlite3.connect(db_path); cur = conn.cursor()
+    try:
+        total = cur.execute("SELECT COUNT(*) FROM equipement").fetchone()[0]
+        cur.execute(f"SELECT {', '.join(exprs)} FROM equipement e {' '.join(joins)} ORDER BY e.id"); done = 0
+        with open(path, 'w', newline='', encoding='utf-8-sig') as file:
+            writer = csv.writer(file, delimiter=';'); writer.writerow([c[0] for c in cols])
+            while rows := cur.fetchmany(BATCH):
+                if cancelled and cancelled(): return None
+                writer.writerows(rows); done += len(rows)
+                if progress: progress(done, total)
+        return done
+    finally:
+        conn.close()
+
+def parse_row(record):
+    """Valide et normalise une ligne du CSV ; lève ValueError avec un message lisible."""
+    nom = (record.get("nom") or "").strip()
+    if not nom: raise ValueError("nom manquant")
+    try: qte = int(record.get("quantite") or 1)
+    except ValueError: raise ValueError(f"quantité invalide : {record['quantite']!r}")
+    if qte < 1: raise ValueError(f"quantité invalide : {qte}")
+    try: prix = float((record.get("prix") or "0").replace(",", ".").replace("€", "").replace(" ", ""))
+    except ValueError: raise ValueError(f"prix invalide : {record['prix']!r}")
+    statut = (record.get("statut") or "En stock").strip()
+    if statut not in STATUTS: raise ValueError(f"statut inconnu : {statut!r}")
+    return {"nom": nom, "marque": (record.get("marque") or "").strip(), "modele": (record.get("modele") or "").strip() or None,
+            "sn": (record.get("sn") or "").strip(), "quantite": qte, "is_lot": 1 if qte > 1 else 0, "statut": statut,
+            "date_sortie": (record.get("date_sortie") or None) if statut == "Sorti" else None,
+            "categorie": (record.get("categorie") or "").strip() or None, "prix": prix,
+            "emplacement": (record.get("emplacement") or "").strip() or None}
+
+def write_batch(conn, sql, fields, batch, known, sn_prefix):
+    """Une transaction : allocation des S/N manquants (une requête par préfixe), insertion, puis journalisation
+    des lignes importées déjà sorties. Renvoie les [(id, sn)] insérés : la transaction IMMEDIATE tient le verrou
+    d'écriture, les ids au-delà du maximum lu au début sont donc tous ceux de ce paquet."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        missing = {}
+        for row in batch:
+            if not row["sn"]: missing.setdefault(sn_prefix(row["categorie"]), []).append(row)
+        for prefix, rows in missing.items():
+            for row, sn in zip(rows, allocate_sns(conn, prefix, len(rows), exclude=known)): row["sn"] = sn; known.add(sn)
+        last = conn.execute("SELECT COALESCE(MAX(id), 0) FROM equipement").fetchone()[0]
+        conn.executemany(sql, [[row[f] for f in fields] for row in batch])
+        new = conn.execute("SELECT id, sn, statut, quantite FROM equipement WHERE id > ? ORDER BY id", (last,)).fetchall()
+        # Sorties importées : journal et `encours` tenus comme pour une sortie faite dans l'application
+        ledger.record(conn, [(i, i, q, "out", None) for i, _, st, q in new if st == "Sorti"])
+        conn.commit(); return [(i, sn) for i, sn, _, _ in new]
+    except sqlite3.Error:
+        conn.rollback(); raise
+
+def import_csv(db_path, path, sn_prefix, progress=None, cancelled=None):
+    """Importe un CSV au format de l'export. Les S/N déjà connus (base ou plus haut dans le fichier) sont ignorés,
+    les S/N vides sont alloués par paquet sur la séquence de `sn_prefix(categorie)`.
+    Insertion par executemany, une transaction par paquet.
+
+    Renvoie {"inserted", "duplicates", "errors": [(ligne, message)], "new": [(id, sn)]}, ou None si annulé
+    (les paquets déjà validés restent en base)."""
+    conn = sqlite3.connect(db_path); cur = conn.cursor()
+    fields = ["nom", "marque", "modele", "sn", "quantite", "is_lot", "statut", "date_sortie", "categorie", "prix", "emplacement"]
+    sql = f"INSERT INTO equipement ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})"
+    result = {"inserted": 0, "duplicates": 0, "errors": [], "new": []}
+    try:
+        known = {sn for (sn,) in cur.execute("SELECT sn FROM equipement WHERE sn IS NOT NULL")}
+        with open(path, newline='', encoding='utf-8-sig') as file:
+            # Enregistrements, pas lignes physiques : un champ entre guillemets peut contenir des retours à la ligne
+            total = sum(1 for _ in csv.reader(file, delimiter=';')) - 1; file.seek(0)
+            reader = csv.reader(file, delimiter=';'); header = next(reader, [])
+            by_name = {**{h.lower(): f for h, f in IMPORT_FIELDS.items()}, **{f: f for f in IMPORT_FIELDS.values()}}
+            mapping = [by_name.get(h.strip().lower()) for h in header]
+            if "nom" not in mapping: raise ValueError("colonne « Nom » absente de l'en-tête")
+            batch = []; done = 0
+            for line, values in enumerate(reader, start=2):
+                done += 1
+                if not any(v.strip() for v in values): continue
+                try: row = parse_row({f: v for f, v in zip(mapping, values) if f})
+                except ValueError as e: result["errors"].append((line, str(e))); continue
+                if row["sn"] in known: result["duplicates"] += 1; continue
+                if row["sn"]: known.add(row["sn"])
+                batch.append(row)
+                if len(batch) >= BATCH:
+                    if cancelled and cancelled(): return None
+                    result["new"] += write_batch(conn, sql, fields, batch, known, sn_prefix); result["inserted"] += len(batch); batch = []
+                    if progress: progress(done, total)
+            if batch: result["new"] += write_batch(conn, sql, fields, batch, known, sn_prefix); result["inserted"] += len(batch)
+            if progress: progress(total, total)
+        return result
+    finally:
+        conn.close()
@@ -1,13 +1,180 @@
 import sqlite3
 import os
+import json
+import string
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+import perf
+
+SN_DIGITS = string.digits + string.ascii_uppercase
+
+def sn_suffix(value, width=6):
+    # Base 36 complétée à gauche : l'ordre alphabétique des S/N suit l'ordre de la séquence
+    out = ""
+    while value: value, r = divmod(value, 36); out = SN_DIGITS[r] + out
+    return out.rjust(width, "0")
+
+def sn_prefix(categorie):
+    return (categorie or "INT")[:4].upper()
+
+def allocate_sns(conn, prefix, n, exclude=()):
+    """Réserve `n` S/N garantis uniques de la forme PREFIX-XXXXXX, en un aller-retour par paquet.
+
+    Une séquence par préfixe (table sn_sequences) fournit une plage contiguë ; les rares S/N déjà pris
+    dans cette plage (anciens S/N aléatoires, ou `exclude`) sont écartés et remplacés.
+    S'exécute dans la transaction en cours s'il y en a une, sinon dans sa propre transaction IMMEDIATE."""
+    own = not conn.in_transaction
+    if own: conn.execute("BEGIN IMMEDIATE")
+    try:
+        out = []
+        conn.execute("INSERT INTO sn_sequences (prefix, next) VALUES (?, 1) ON CONFLICT (prefix) DO NOTHING", (prefix,))
+        while len(out) < n:
+            k = n - len(out)
+            start = conn.execute("UPDATE sn_sequences SET next = next + ? WHERE prefix = ? RETURNING next - ?", (k, prefix, k)).fetchone()[0]
+            cands = [f"{prefix}-{sn_suffix(v)}" for v in range(start, start + k)]
+            # Parcours de l'index unique sur sn limité à la plage : coût proportionnel aux collisions, pas à n
+            taken = {sn for (sn,) in conn.execute("SELECT sn FROM equipement WHERE sn BETWEEN ? AND ?", (cands[0], cands[-1]))}
+            out.extend(c for c in cands if c not in taken and c not in exclude)
+        if own: conn.commit()
+        return out
+    except sqlite3.Error:
+        if own: conn.rollback()
+        raise
+
+class _QuerySignals(QObject):
+    done = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+class _Query(QRunnable):
+    def __init__(self, db, token, fn, args, label):
+        super().__init__(); self.db, self.token, self.fn, self.args, self.label = db, token, fn, args, label
+
+    def run(self):
+        try:
+            with perf.span(self.label, "lecture") as info:
+                res = self.fn(self.db.reader(), *self.args)
+                if isinstance(res, list): info["lignes"] = len(res)
+        except Exception as e: self.db.signals.failed.emit(self.token, str(e)); return
+        self.db.signals.done.emit(self.token, res)
 
 class Database:
-    def __init__(self, db_name="database/inventaire.db"):
+    FTS_COLUMNS = ["nom", "marque", "categorie", "sn", "modele", "emplacement"]
+    # Colonnes ajoutées à `equipement` après la première version du schéma
+    LEGACY_COLUMNS = ["quantite INTEGER DEFAULT 1", "is_lot INTEGER DEFAULT 0", "parent_id INTEGER DEFAULT NULL", "date_sortie TEXT", "categorie TEXT", "prix REAL DEFAULT 0"]
+    # Étapes de migration, dans l'ordre : la base stocke dans PRAGMA user_version le nombre d'étapes déjà appliquées.
+    # Ne jamais modifier ni réordonner une étape publiée, seulement en ajouter à la fin.
+    MIGRATIONS = ["create_tables", "add_legacy_columns", "create_search_index", "create_stats", "create_indexes", "create_sn_sequences",
+                  "create_kit_checkouts", "create_movements", "backfill_kit_checkouts"]
+
+    # Chemins chauds (liste, recherche, bascule de statut) : texte SQL constant, donc préparé une seule fois
+    # par connexion puis repris du cache de requêtes de sqlite3
+    ITEM_COLUMNS = "id, categorie, nom, marque, sn, quantite, statut, prix, is_lot"
+    SEARCH = "id IN (SELECT rowid FROM equipement_fts WHERE equipement_fts MATCH ?)"
+    SQL_PAGE = f"SELECT {ITEM_COLUMNS} FROM equipement WHERE id > ? ORDER BY id LIMIT ?"
+    SQL_PAGE_SEARCH = f"SELECT {ITEM_COLUMNS} FROM equipement WHERE id > ? AND {SEARCH} ORDER BY id LIMIT ?"
+    SQL_ROWS = f"SELECT {ITEM_COLUMNS} FROM equipement WHERE id IN (SELECT value FROM json_each(?))"
+    SQL_ROWS_SEARCH = f"{SQL_ROWS} AND {SEARCH}"
+    SQL_ITEM_STATE = "SELECT nom, statut, quantite, is_lot, parent_id FROM equipement WHERE id = ?"
+    SQL_MAINTENANCE = ("SELECT r.id, r.date_reparation, e.nom, r.description, r.cout, e.id FROM reparations r "
+                       "JOIN equipement e ON r.id_equipement=e.id WHERE e.statut='En Maintenance'")
+    SQL_KITS = ("SELECT k.id, k.nom_kit, COUNT(ki.id_equipement), CASE WHEN k.id IN (SELECT id_kit FROM kit_checkouts) "
+                "THEN 'Sorti' ELSE 'En stock' END FROM kits k LEFT JOIN kit_items ki ON k.id=ki.id_kit GROUP BY k.id")
+
+    def __init__(self, db_name="database/inventaire.db", readers=3):
         # S'assure que le dossier database existe
         os.makedirs(os.path.dirname(db_name), exist_ok=True)
-        self.conn = sqlite3.connect(db_name)
+        self.path = db_name
+        # Une seule connexion d'écriture (thread de l'interface) ; les lectures en arrière-plan passent par
+        # une connexion par thread du pool (WAL : elles ne bloquent pas l'écriture, ni l'inverse)
+        self.conn = self.connect()
         self.cursor = self.conn.cursor()
-        self.create_tables()
+        self.configure()
+        self.migrate()
+        self.readers, self.reader_conns, self.lock = readers, {}, threading.Lock()
+        self.pool = self.signals = None; self.pending = {}; self.latest = {}; self.token = 0
+
+    def connect(self):
+        # Mesures activées (perf.py) : chaque requête de la connexion est chronométrée
+        factory = perf.TimedConnection if perf.recorder.enabled else sqlite3.Connection
+        conn = sqlite3.connect(self.path, cached_statements=256, check_same_thread=False, factory=factory)
+        conn.execute("PRAGMA busy_timeout = 5000"); return conn
+
+    def configure(self):
+        # WAL : les lectures ne bloquent plus pendant une écriture, et synchronous=NORMAL y reste sûr.
+        # Cache de 16 Mo (valeur négative = en Kio) et tables temporaires en mémoire.
+        for pragma in ["journal_mode = WAL", "synchronous = NORMAL", "cache_size = -16000", "temp_store = MEMORY"]:
+            self.cursor.execute(f"PRAGMA {pragma}")
+
+    def reader(self):
+        """Connexion de lecture du thread courant, ouverte au premier appel (lecture seule).
+        Indexée par l'id du thread système : threading.local ne survit pas d'une tâche à l'autre sur un thread Qt."""
+        ident = threading.get_ident()
+        with self.lock: conn = self.reader_conns.get(ident)
+        if conn is None:
+            conn = self.connect()
+            for pragma in ["query_only = ON", "cache_size = -8000", "temp_store = MEMORY"]: conn.execute(f"PRAGMA {pragma}")
+            perf.recorder.name_thread("lecture")
+            with self.lock: self.reader_conns[ident] = conn
+        return conn
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None):
+        """Exécute `fn(connexion de lecture, *args)` sur le pool de lecture ; `on_done(résultat)` ou `on_error(message)`
+        sont appelés dans le thread de l'interface. Pour une même `key`, seul le résultat de la dernière demande
+        est livré (une recherche tapée vite n'affiche jamais un résultat périmé)."""
+        if self.pool is None:
+            # Threads jamais recyclés : au plus `readers` connexions de lecture pour toute la session
+            self.pool = QThreadPool(); self.pool.setMaxThreadCount(self.readers); self.pool.setExpiryTimeout(-1)
+            self.signals = _QuerySignals(); self.signals.done.connect(self.on_query_done); self.signals.failed.connect(self.on_query_failed)
+        self.token += 1; self.pending[self.token] = (on_done, on_error, key)
+        if key is not None: self.latest[key] = self.token
+        label = key if isinstance(key, str) else type(key).__name__ if key is not None else getattr(fn, "__name__", "requête")
+        self.pool.start(_Query(self, self.token, fn, args, label)); return self.token
+
+    def take(self, token):
+        on_done, on_error, key = self.pending.pop(token)
+        if key is not None and self.latest.get(key) != token: return None, None
+        self.latest.pop(key, None); return on_done, on_error
+
+    def on_query_done(self, token, res):
+        on_done, _ = self.take(token)
+        if on_done: on_done(res)
+
+    def on_query_failed(self, token, message):
+        _, on_error = self.take(token)
+        if on_error: on_error(message)
+
+    def page(self, last_id, match="", limit=200, conn=None):
+        """Paquet suivant de `equipement` après `last_id` (pagination sur l'id), filtré par une requête FTS."""
+        conn = conn or self.conn
+        if match: return conn.execute(self.SQL_PAGE_SEARCH, (last_id, match, limit)).fetchall()
+        return conn.execute(self.SQL_PAGE, (last_id, limit)).fetchall()
+
+    def rows(self, ids, match="", conn=None):
+        conn = conn or self.conn; ids = json.dumps(list(ids))
+        if match: return conn.execute(self.SQL_ROWS_SEARCH, (ids, match)).fetchall()
+        return conn.execute(self.SQL_ROWS, (ids,)).fetchall()
+
+    def item_state(self, i_id):
+        return self.conn.execute(self.SQL_ITEM_STATE, (i_id,)).fetchone()
+
+    def maintenance_rows(self, conn=None):
+        return (conn or self.conn).execute(self.SQL_MAINTENANCE).fetchall()
+
+    def kit_rows(self, conn=None):
+        return (conn or self.conn).execute(self.SQL_KITS).fetchall()
+
+    def migrate(self):
+        """Applique uniquement les étapes postérieures à PRAGMA user_version, chacune dans sa propre transaction."""
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        for v, step in enumerate(self.MIGRATIONS[version:], start=version + 1):
+            self.cursor.execute("BEGIN")
+            try:
+                getattr(self, step)()
+                self.cursor.execute(f"PRAGMA user_version = {v}")
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback(); raise
 
     def create_tables(self):
         # Table des Catégories (Photo, Vidéo, Son...)
@@ -69,9 +236,212 @@ class Database:
             )
         ''')
 
-        self.conn.commit()
+    def add_legacy_columns(self):
+        existing = {row[1] for row in self.cursor.execute("PRAGMA table_info(equipement)").fetchall()}
+        for col in self.LEGACY_COLUMNS:
+            if col.split()[0] not in existing: self.cursor.execute(f"ALTER TABLE equipement ADD COLUMN {col}")
+
+    def create_search_index(self):
+        # Index plein texte (FTS5) sur le matériel, synchronisé par triggers.
+        # remove_diacritics : "camera" trouve "Caméra" ; prefix : index des préfixes courts pour la recherche à la frappe
+        cols = ", ".join(self.FTS_COLUMNS)
+        new, old = ", ".join(f"new.{c}" for c in self.FTS_COLUMNS), ", ".join(f"old.{c}" for c in self.FTS_COLUMNS)
+        self.cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS equipement_fts USING fts5(
+                {cols}, content='equipement', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+        self.cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS equipement_fts_ai AFTER INSERT ON equipement BEGIN
+                INSERT INTO equipement_fts (rowid, {cols}) VALUES (new.id, {new});
+            END
+        ''')
+        self.cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS equipement_fts_ad AFTER DELETE ON equipement BEGIN
+                INSERT INTO equipement_fts (equipement_fts, rowid, {cols}) VALUES ('delete', old.id, {old});
+            END
+        ''')
+        # Uniquement sur les colonnes indexées : un changement de statut ne touche pas l'index
+        self.cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS equipement_fts_au AFTER UPDATE OF {cols} ON equipement BEGIN
+                INSERT INTO equipement_fts (equipement_fts, rowid, {cols}) VALUES ('delete', old.id, {old});
+                INSERT INTO equipement_fts (rowid, {cols}) VALUES (new.id, {new});
+            END
+        ''')
+        self.cursor.execute("INSERT INTO equipement_fts (equipement_fts) VALUES ('rebuild')")
+
+    def create_stats(self):
+        # Agrégats du dashboard par (catégorie, statut), tenus à jour par triggers : lire le dashboard
+        # ne parcourt plus `equipement`, quelle que soit sa taille
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_equipement (
+                categorie TEXT NOT NULL,
+                statut TEXT NOT NULL,
+                nb INTEGER NOT NULL DEFAULT 0,
+                unites INTEGER NOT NULL DEFAULT 0,
+                valeur REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (categorie, statut)
+            )
+        ''')
+        add = '''INSERT INTO stats_equipement (categorie, statut, nb, unites, valeur)
+                 VALUES (COALESCE(new.categorie, ''), COALESCE(new.statut, ''), 1, COALESCE(new.quantite, 0), COALESCE(new.prix * new.quantite, 0))
+                 ON CONFLICT (categorie, statut) DO UPDATE SET nb = nb + 1, unites = unites + excluded.unites, valeur = valeur + excluded.valeur;'''
+        remove = '''UPDATE stats_equipement SET nb = nb - 1, unites = unites - COALESCE(old.quantite, 0), valeur = valeur - COALESCE(old.prix * old.quantite, 0)
+                    WHERE categorie = COALESCE(old.categorie, '') AND statut = COALESCE(old.statut, '');'''
+        self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS stats_equipement_ai AFTER INSERT ON equipement BEGIN {add} END")
+        self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS stats_equipement_ad AFTER DELETE ON equipement BEGIN {remove} END")
+        self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS stats_equipement_au AFTER UPDATE OF categorie, statut, quantite, prix ON equipement BEGIN {remove} {add} END")
+        self.rebuild_stats()
+
+    def create_indexes(self):
+        # Onglet Check (statut='Sorti') : index couvrant, la requête ne lit jamais la table
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_equipement_statut ON equipement (statut, nom, marque, quantite, date_sortie)")
+        # Regroupements par catégorie (agrégats du dashboard)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_equipement_categorie ON equipement (categorie, statut, quantite, prix)")
+        # Lots sortis -> lot parent (seules les lignes filles sont indexées)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_equipement_parent ON equipement (parent_id) WHERE parent_id IS NOT NULL")
+        # Jointure réparations -> matériel (onglet Maintenance) et recherche des kits d'un objet
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_reparations_equipement ON reparations (id_equipement, date_reparation, description, cout)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_kit_items_equipement ON kit_items (id_equipement)")
+
+    def rebuild_stats(self):
+        self.cursor.execute("DELETE FROM stats_equipement")
+        self.cursor.execute('''
+            INSERT INTO stats_equipement (categorie, statut, nb, unites, valeur)
+            SELECT COALESCE(categorie, ''), COALESCE(statut, ''), COUNT(*), COALESCE(SUM(quantite), 0), COALESCE(SUM(prix * quantite), 0)
+            FROM equipement GROUP BY 1, 2
+        ''')
+
+    def dashboard_stats(self, conn=None):
+        """Indicateurs du dashboard à partir des agrégats (quelques lignes seulement)."""
+        rows = (conn or self.conn).execute("SELECT categorie, statut, nb, unites, valeur FROM stats_equipement WHERE nb > 0").fetchall()
+        stats = {"valeur": 0.0, "unites": 0, "par_categorie": {}, "par_statut": {}}
+        for cat, st, nb, unites, valeur in rows:
+            stats["valeur"] += valeur; stats["unites"] += unites
+            for key, group in ((cat, "par_categorie"), (st, "par_statut")):
+                agg = stats[group].setdefault(key, {"nb": 0, "unites": 0, "valeur": 0.0})
+                agg["nb"] += nb; agg["unites"] += unites; agg["valeur"] += valeur
+        empty = {"nb": 0, "unites": 0, "valeur": 0.0}
+        stats["sorti"] = stats["par_statut"].get("Sorti", empty)["nb"]
+        stats["maintenance"] = stats["par_statut"].get("En Maintenance", empty)["nb"]
+        stats["occupation"] = stats["par_statut"].get("Sorti", empty)["unites"] / stats["unites"] if stats["unites"] else 0.0
+        return stats
+
+    def create_sn_sequences(self):
+        # Prochaine valeur de séquence par préfixe de S/N (voir allocate_sns)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sn_sequences (
+                prefix TEXT PRIMARY KEY,
+                next INTEGER NOT NULL
+            )
+        ''')
+
+    def create_kit_checkouts(self):
+        # Quantité prise dans un lot par le kit (NULL = le lot entier)
+        if "quantite" not in {row[1] for row in self.cursor.execute("PRAGMA table_info(kit_items)").fetchall()}:
+            self.cursor.execute("ALTER TABLE kit_items ADD COLUMN quantite INTEGER")
+        # Lignes réellement emportées par un kit sorti (objets entiers ou parties de lots) ; vide = kit en stock
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS kit_checkouts (
+                id_kit INTEGER,
+                id_equipement INTEGER,
+                PRIMARY KEY (id_kit, id_equipement)
+            )
+        ''')
+
+    def create_movements(self):
+        # Journal des sorties / retours, en ajout seul (voir ledger.py)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mouvements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_ligne INTEGER NOT NULL,
+                id_equipement INTEGER NOT NULL,
+                quantite INTEGER NOT NULL,
+                sens TEXT NOT NULL CHECK (sens IN ('out', 'in')),
+                horodatage TEXT NOT NULL,
+                id_kit INTEGER,
+                emprunteur TEXT
+            )
+        ''')
+        for event in ("UPDATE", "DELETE"):
+            self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS mouvements_no_{event.lower()} BEFORE {event} ON mouvements "
+                                "BEGIN SELECT RAISE(ABORT, 'mouvements : journal en ajout seul'); END")
+        # Historique d'un objet, mouvements d'une période, dernière sortie d'une ligne (« qui a quoi depuis quand »)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_mouvements_equipement ON mouvements (id_equipement, horodatage)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_mouvements_horodatage ON mouvements (horodatage)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_mouvements_sorties ON mouvements (id_ligne) WHERE sens = 'out'")
+        # Unités actuellement dehors par objet de stock, et depuis quand le compte n'a pas changé
+        self.cursor.execute("CREATE TABLE IF NOT EXISTS encours (id_equipement INTEGER PRIMARY KEY, quantite INTEGER NOT NULL, depuis TEXT NOT NULL)")
+        # Agrégats par jour et par mois (par objet), par jour (tous objets) : unites_heures = unités dehors x heures
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS utilisation_jour (
+                jour TEXT NOT NULL,
+                id_equipement INTEGER NOT NULL,
+                sorties INTEGER NOT NULL DEFAULT 0,
+                unites_sorties INTEGER NOT NULL DEFAULT 0,
+                unites_heures REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (jour, id_equipement)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS utilisation_mois (
+                mois TEXT NOT NULL,
+                id_equipement INTEGER NOT NULL,
+                sorties INTEGER NOT NULL DEFAULT 0,
+                unites_sorties INTEGER NOT NULL DEFAULT 0,
+                unites_heures REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (mois, id_equipement)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS utilisation_totale (
+                jour TEXT PRIMARY KEY,
+                sorties INTEGER NOT NULL DEFAULT 0,
+                unites_sorties INTEGER NOT NULL DEFAULT 0,
+                unites_heures REAL NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        # Reprise de l'existant : une sortie par ligne actuellement sortie, datée par date_sortie ("%d/%m %H:%M",
+        # sans année : l'année en cours est supposée)
+        self.cursor.execute('''
+            INSERT INTO mouvements (id_ligne, id_equipement, quantite, sens, horodatage)
+            SELECT id, COALESCE(parent_id, id), quantite, 'out',
+                CASE WHEN date_sortie GLOB '[0-9][0-9]/[0-9][0-9] [0-9][0-9]:[0-9][0-9]'
+                     THEN strftime('%Y', 'now', 'localtime') || '-' || substr(date_sortie, 4, 2) || '-' || substr(date_sortie, 1, 2) || 'T' || substr(date_sortie, 7, 5) || ':00'
+                     ELSE strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime') END
+            FROM equipement WHERE statut = 'Sorti'
+        ''')
+        self.cursor.execute("INSERT INTO encours SELECT id_equipement, SUM(quantite), MAX(horodatage) FROM mouvements GROUP BY id_equipement")
+
+    def backfill_kit_checkouts(self):
+        # Kits sortis par l'ancien toggle_kit (tous les objets 'Sorti', rien dans kit_checkouts) : sans cette reprise
+        # ils s'affichent en stock et ne peuvent plus rentrer. Leurs sorties sont déjà au journal (reprise de create_movements).
+        self.cursor.execute('''
+            INSERT INTO kit_checkouts (id_kit, id_equipement)
+            SELECT ki.id_kit, ki.id_equipement FROM kit_items ki
+            WHERE ki.id_kit IN (SELECT k.id_kit FROM kit_items k JOIN equipement e ON e.id = k.id_equipement
+                                GROUP BY k.id_kit HAVING SUM(e.statut != 'Sorti') = 0)
+              AND ki.id_kit NOT IN (SELECT id_kit FROM kit_checkouts)
+              AND ki.id_equipement NOT IN (SELECT id_equipement FROM kit_checkouts)
+              AND ki.id_equipement IN (SELECT id FROM equipement)
+        ''')
+
+    def allocate_sns(self, prefix, n=1):
+        return allocate_sns(self.conn, prefix, n)
+
+    @staticmethod
+    def fts_query(text):
+        """Transforme la saisie utilisateur en requête MATCH : chaque mot est cherché en préfixe (ET implicite).
+        Les mots sans lettre ni chiffre ("-", "/") ne donnent aucun terme au tokenizer : ignorés. None si rien ne reste
+        (pas de filtre, comme une saisie vide)."""
+        words = [t for t in text.split() if any(ch.isalnum() for ch in t)]
+        return " ".join('"' + t.replace('"', '""') + '"*' for t in words) or None
 
     def close(self):
+        if self.pool: self.pool.waitForDone()
+        for conn in self.reader_conns.values(): conn.close()
+        self.cursor.execute("PRAGMA optimize")
         self.conn.close()
 
 if __name__ == "__main__":
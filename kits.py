@@ -0,0 +1,84 @@
+"""Sortie et retour de kits : tout est résolu en SQL ensembliste et écrit en une seule transaction.
+
+Une sortie vérifie d'abord les conflits de tous les kits demandés (objet déjà sorti, en maintenance,
+quantité de lot insuffisante, objet demandé par deux kits de la même sortie) ; s'il y en a un seul, rien n'est écrit.
+Les lots dont le kit ne prend qu'une partie sont scindés comme dans toggle_status, et ce que chaque kit
+a réellement emporté est noté dans kit_checkouts pour que le retour remette exactement ces lignes en stock.
+Sorties et retours sont journalisés (ledger.py) avec le kit et l'emprunteur.
+"""
+import datetime
+import json
+import sqlite3
+
+import ledger
+from database import allocate_sns
+
+
+def checkout_kits(conn, kit_ids, borrower=None):
+    """Sort les kits donnés ; renvoie (ids touchés, messages de conflit). En cas de conflit, rien n'est écrit."""
+    now = datetime.datetime.now().strftime("%d/%m %H:%M"); kits = json.dumps(list(kit_ids))
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Besoin de chaque kit : quantite NULL dans kit_items = le lot entier
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS kit_need (id_kit INTEGER, id INTEGER, q INTEGER, whole INTEGER)")
+        conn.execute("DELETE FROM kit_need")
+        conn.execute('''
+            INSERT INTO kit_need SELECT ki.id_kit, e.id, COALESCE(ki.quantite, e.quantite), COALESCE(ki.quantite, e.quantite) >= e.quantite
+            FROM kit_items ki JOIN equipement e ON e.id = ki.id_equipement
+            WHERE ki.id_kit IN (SELECT value FROM json_each(?))
+        ''', (kits,))
+        conflicts = [f"Kit « {nom} » : déjà sorti" for (nom,) in conn.execute(
+            "SELECT nom_kit FROM kits WHERE id IN (SELECT value FROM json_each(?)) AND id IN (SELECT id_kit FROM kit_checkouts)", (kits,))]
+        for nom, sn, statut, qte, need, n in conn.execute('''
+                SELECT e.nom, e.sn, e.statut, e.quantite, SUM(n.q), COUNT(*) FROM kit_need n JOIN equipement e ON e.id = n.id
+                GROUP BY e.id HAVING e.statut != 'En stock' OR SUM(n.q) > e.quantite'''):
+            if statut != "En stock": why = "en maintenance" if statut == "En Maintenance" else "déjà sorti"
+            elif n > 1: why = f"demandé par {n} kits ({need} pour {qte} en stock)"
+            else: why = f"{need} demandés, {qte} en stock"
+            conflicts.append(f"{nom} ({sn}) : {why}")
+        if conflicts:
+            conn.rollback(); return [], conflicts
+
+        conn.execute("UPDATE equipement SET statut='Sorti', date_sortie=? WHERE id IN (SELECT id FROM kit_need WHERE whole)", (now,))
+        conn.execute("INSERT INTO kit_checkouts (id_kit, id_equipement) SELECT id_kit, id FROM kit_need WHERE whole")
+        # Parties de lots : une ligne fille par (kit, lot), S/N alloués en un seul appel
+        parts = conn.execute("SELECT id_kit, id, q FROM kit_need WHERE NOT whole").fetchall()
+        sns = allocate_sns(conn, "LOT", len(parts)) if parts else []
+        conn.execute("UPDATE equipement SET quantite = quantite - (SELECT SUM(q) FROM kit_need n WHERE n.id = equipement.id AND NOT whole) "
+                     "WHERE id IN (SELECT id FROM kit_need WHERE NOT whole)")
+        conn.executemany("INSERT INTO equipement (nom, marque, sn, quantite, is_lot, statut, parent_id, date_sortie, categorie, prix) "
+                         "SELECT nom, marque, ?, ?, 1, 'Sorti', id, ?, categorie, prix FROM equipement WHERE id=?",
+                         [(sn, q, now, i) for sn, (_, i, q) in zip(sns, parts)])
+        conn.executemany("INSERT INTO kit_checkouts (id_kit, id_equipement) SELECT ?, id FROM equipement WHERE sn=?",
+                         [(k, sn) for sn, (k, _, _) in zip(sns, parts)])
+        children = dict(conn.execute("SELECT sn, id FROM equipement WHERE sn IN (SELECT value FROM json_each(?))", (json.dumps(sns),)))
+        ledger.record(conn, [(i, i, q, "out", k) for k, i, q in conn.execute("SELECT id_kit, id, q FROM kit_need WHERE whole")]
+                      + [(children[sn], i, q, "out", k) for sn, (k, i, q) in zip(sns, parts)], borrower)
+        touched = [i for (i,) in conn.execute("SELECT DISTINCT id FROM kit_need")] + list(children.values())
+        conn.commit()
+        return touched, []
+    except sqlite3.Error:
+        conn.rollback(); raise
+
+
+def return_kits(conn, kit_ids):
+    """Remet en stock ce que les kits ont emporté (les parties de lots rejoignent leur lot) ; renvoie les ids touchés.
+    Un objet déjà rentré ou passé en maintenance entre-temps n'est pas modifié."""
+    kits = json.dumps(list(kit_ids))
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute('''
+            SELECT c.id_kit, e.id, e.parent_id, e.quantite, e.statut FROM kit_checkouts c JOIN equipement e ON e.id = c.id_equipement
+            WHERE c.id_kit IN (SELECT value FROM json_each(?))
+        ''', (kits,)).fetchall()
+        ledger.record(conn, [(i, p or i, q, "in", k) for k, i, p, q, st in rows if st == "Sorti"])
+        children = [(i, p, q) for _, i, p, q, st in rows if p is not None and st == "Sorti"]
+        conn.executemany("UPDATE equipement SET quantite=quantite+? WHERE id=?", [(q, p) for _, p, q in children])
+        conn.executemany("DELETE FROM equipement WHERE id=?", [(i,) for i, _, _ in children])
+        conn.execute("UPDATE equipement SET statut='En stock', date_sortie=NULL WHERE statut='Sorti' AND id IN "
+                     "(SELECT id_equipement FROM kit_checkouts WHERE id_kit IN (SELECT value FROM json_each(?)))", (kits,))
+        conn.execute("DELETE FROM kit_checkouts WHERE id_kit IN (SELECT value FROM json_each(?))", (kits,))
+        conn.commit()
+        return [i for _, i, _, _, _ in rows] + [p for _, p, _ in children]
+    except sqlite3.Error:
+        conn.rollback(); raise
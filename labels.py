@@ -0,0 +1,105 @@
+"""Planches d'étiquettes PDF : lecture en flux depuis SQLite, QR codes tracés en vectoriel.
+
+L'encodage des QR (la partie coûteuse, en Python pur) est réparti sur des processus qui ne chargent que
+qrmatrix et qrcode ; le processus appelant écrit les pages dans l'ordre au fur et à mesure.
+"""
+import multiprocessing
+import sqlite3
+import sys
+from collections import deque
+from contextlib import contextmanager
+
+import qrmatrix
+from qrmatrix import encode_page
+
+# Unités reportlab (points) : qrcode et reportlab ne sont importés qu'à l'export
+cm = 72 / 2.54
+A4 = (21 * cm, 29.7 * cm)
+
+class LabelTemplate:
+    def __init__(self, pagesize, cols, rows, cell_w, cell_h, left, top, qr_size, text="below"):
+        self.pagesize, self.cols, self.rows = pagesize, cols, rows
+        self.cell_w, self.cell_h, self.left, self.top = cell_w, cell_h, left, top
+        self.qr_size, self.text = qr_size, text
+        self.per_page = cols * rows
+
+    def origin(self, k):
+        """Coin haut-gauche de la k-ième étiquette de la page."""
+        return self.left + (k % self.cols) * self.cell_w, self.pagesize[1] - self.top - (k // self.cols) * self.cell_h
+
+TEMPLATES = {
+    "A4 4x5": LabelTemplate(A4, 4, 5, 5*cm, 5*cm, 1*cm, 0.5*cm, 3.5*cm),
+    "A4 3x8": LabelTemplate(A4, 3, 8, 7*cm, 3.7125*cm, 0, 0, 3*cm, text="right"),
+    "Rouleau thermique 50x30": LabelTemplate((5*cm, 3*cm), 1, 1, 5*cm, 3*cm, 0, 0, 2.6*cm, text="right"),
+}
+
+def draw_qr(c, x, y, size, encoded):
+    # Opérateurs PDF bruts sous une transformation en modules : les nombres entiers se formatent bien plus vite
+    # que les coordonnées flottantes de path.rect (formatage reportlab en Python pur, plus coûteux que l'encodage)
+    n, ops = encoded; m = size / n
+    c.saveState(); c.transform(m, 0, 0, -m, x, y + size); c.addLiteral(ops); c.restoreState()
+
+@contextmanager
+def light_main():
+    """Les processus "spawn" réimportent le module principal du parent (main.py : PyQt6, interface...) ;
+    le temps de leur démarrage, ce module principal est remplacé par qrmatrix."""
+    main = sys.modules["__main__"]; sys.modules["__main__"] = qrmatrix
+    try: yield
+    finally: sys.modules["__main__"] = main
+
+def draw_page(c, template, items):
+    s = template.qr_size
+    for k, (nom, marque, encoded) in enumerate(items):
+        x, top = template.origin(k)
+        if template.text == "below":
+            draw_qr(c, x, top - s, s, encoded)
+            c.setFont("Helvetica-Bold", 8); c.drawCentredString(x + s / 2, top - s - 0.3*cm, marque)
+            c.setFont("Helvetica", 7); c.drawCentredString(x + s / 2, top - s - 0.7*cm, nom[:25])
+        else:
+            pad = (template.cell_h - s) / 2; tx = x + s + 2 * pad; mid = top - template.cell_h / 2
+            draw_qr(c, x + pad, top - pad - s, s, encoded)
+            c.setFont("Helvetica-Bold", 8); c.drawString(tx, mid + 0.1*cm, marque[:20])
+            c.setFont("Helvetica", 7); c.drawString(tx, mid - 0.3*cm, nom[:25])
+    c.showPage()
+
+def export_labels(db_path, path, template, where="", params=(), workers=None, progress=None, cancelled=None, parallel_min=200):
+    """Écrit la planche des objets sélectionnés par `where` (sans le mot-clé WHERE) ; renvoie le nombre d'étiquettes.
+
+    `progress(faites, total)` est appelé après chaque page ; si `cancelled()` devient vrai, l'export s'arrête
+    et renvoie None (le fichier partiel est laissé tel quel). En dessous de `parallel_min` étiquettes,
+    tout est encodé dans le processus courant (démarrer des processus coûterait plus cher)."""
+    from reportlab.pdfbase.pdfdoc import PDFZCompress
+    from reportlab.pdfgen import canvas
+    conn = sqlite3.connect(db_path); cur = conn.cursor()
+    cond = "sn IS NOT NULL AND sn != ''" + (f" AND ({where})" if where else "")
+    total = cur.execute(f"SELECT COUNT(*) FROM equipement WHERE {cond}", params).fetchone()[0]
+    cur.execute(f"SELECT id, nom, marque, sn FROM equipement WHERE {cond} ORDER BY id", params)
+    # Flux zlib seul, propre à ce document : sans compression de page, reportlab applique les filtres par défaut
+    # du document au lieu de rl_config.useA85 (global) ; l'ASCII85, en Python pur, n'apporte rien à un fichier PDF
+    c = canvas.Canvas(path, pagesize=template.pagesize, pageCompression=0); c._doc.defaultStreamFilters = [PDFZCompress]; done = 0
+    workers = workers or multiprocessing.cpu_count()
+    # Paquets d'au moins ~40 étiquettes par tâche, même pour une étiquette par page (rouleau)
+    chunk = template.per_page * max(1, 40 // template.per_page)
+    pool = None
+    if workers > 1 and total >= parallel_min:
+        with light_main(): pool = multiprocessing.get_context("spawn").Pool(workers)
+    try:
+        pending = deque()
+        def flush_one():
+            nonlocal done
+            items = pending.popleft(); items = items.get() if pool else items
+            for k in range(0, len(items), template.per_page): draw_page(c, template, items[k:k + template.per_page])
+            done += len(items)
+            if progress: progress(done, total)
+        # Au plus 2 paquets par processus en vol : la mémoire reste bornée quelle que soit la taille de l'export
+        while batch := cur.fetchmany(chunk):
+            if cancelled and cancelled(): return None
+            pending.append(pool.apply_async(encode_page, (batch,)) if pool else encode_page(batch))
+            if len(pending) >= (2 * workers if pool else 1): flush_one()
+        while pending:
+            if cancelled and cancelled(): return None
+            flush_one()
+        c.save(); return done
+    finally:
+        if pool: pool.terminate()
+        conn.close()
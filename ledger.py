@@ -0,0 +1,122 @@
+"""Journal des mouvements (sorties / retours) en ajout seul, et agrégats d'utilisation par jour.
+
+Un mouvement est daté en ISO 8601 (triable, avec l'année) et porte deux ids : la ligne déplacée (`id_ligne`,
+une partie de lot qui sera supprimée à son retour) et l'objet de stock (`id_equipement`, le lot parent),
+sur lequel l'historique et les agrégats sont tenus. Les agrégats sont mis à jour à chaque écriture :
+les rapports sur plusieurs années lisent quelques lignes par jour, jamais le journal.
+"""
+import datetime
+import json
+
+
+def now_iso():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def day_segments(start, end):
+    """Découpe l'intervalle [start, end[ par jour civil : [(jour ISO, heures)]."""
+    out = []
+    while start < end:
+        nxt = min(end, datetime.datetime.combine(start.date() + datetime.timedelta(days=1), datetime.time.min))
+        out.append((start.date().isoformat(), (nxt - start).total_seconds() / 3600)); start = nxt
+    return out
+
+
+def record(conn, moves, borrower=None, at=None):
+    """Journalise les mouvements [(id_ligne, id_equipement, quantité, "out"|"in", id_kit)] dans la transaction en cours.
+
+    Les unités sorties d'un objet sont suivies dans `encours` ; à chaque mouvement, le temps passé dehors
+    depuis le mouvement précédent est ventilé par jour dans les agrégats (unités x heures)."""
+    if not moves: return
+    at = at or now_iso(); t = datetime.datetime.fromisoformat(at); day = at[:10]
+    ids = json.dumps(sorted({m[1] for m in moves}))
+    state = {i: [q, datetime.datetime.fromisoformat(s)] for i, q, s in conn.execute(
+        "SELECT id_equipement, quantite, depuis FROM encours WHERE id_equipement IN (SELECT value FROM json_each(?))", (ids,))}
+    usage = {}  # (jour, id_equipement) -> [sorties, unités sorties, unités x heures]
+    for _, i, q, sens, _ in moves:
+        cur = state.setdefault(i, [0, t])
+        for d, h in day_segments(cur[1], t) if cur[0] else ():
+            usage.setdefault((d, i), [0, 0, 0.0])[2] += cur[0] * h
+        if sens == "out":
+            u = usage.setdefault((day, i), [0, 0, 0.0]); u[0] += 1; u[1] += q
+        cur[0] = max(0, cur[0] + (q if sens == "out" else -q)); cur[1] = t
+
+    conn.executemany("INSERT INTO mouvements (id_ligne, id_equipement, quantite, sens, horodatage, id_kit, emprunteur) VALUES (?,?,?,?,?,?,?)",
+                     [(l, i, q, s, at, k, borrower) for l, i, q, s, k in moves])
+    conn.executemany("INSERT INTO encours (id_equipement, quantite, depuis) VALUES (?,?,?) "
+                     "ON CONFLICT (id_equipement) DO UPDATE SET quantite=excluded.quantite, depuis=excluded.depuis",
+                     [(i, q, at) for i, (q, _) in state.items() if q])
+    conn.executemany("DELETE FROM encours WHERE id_equipement=?", [(i,) for i, (q, _) in state.items() if not q])
+    conn.executemany('''
+        INSERT INTO utilisation_jour (jour, id_equipement, sorties, unites_sorties, unites_heures) VALUES (?,?,?,?,?)
+        ON CONFLICT (jour, id_equipement) DO UPDATE SET sorties=sorties+excluded.sorties,
+            unites_sorties=unites_sorties+excluded.unites_sorties, unites_heures=unites_heures+excluded.unites_heures
+    ''', [(d, i, *u) for (d, i), u in usage.items()])
+    months, totals = {}, {}
+    for (d, i), u in usage.items():
+        for agg, key in ((months, (d[:7], i)), (totals, d)):
+            tot = agg.setdefault(key, [0, 0, 0.0]); tot[0] += u[0]; tot[1] += u[1]; tot[2] += u[2]
+    conn.executemany('''
+        INSERT INTO utilisation_mois (mois, id_equipement, sorties, unites_sorties, unites_heures) VALUES (?,?,?,?,?)
+        ON CONFLICT (mois, id_equipement) DO UPDATE SET sorties=sorties+excluded.sorties,
+            unites_sorties=unites_sorties+excluded.unites_sorties, unites_heures=unites_heures+excluded.unites_heures
+    ''', [(m, i, *u) for (m, i), u in months.items()])
+    conn.executemany('''
+        INSERT INTO utilisation_totale (jour, sorties, unites_sorties, unites_heures) VALUES (?,?,?,?)
+        ON CONFLICT (jour) DO UPDATE SET sorties=sorties+excluded.sorties,
+            unites_sorties=unites_sorties+excluded.unites_sorties, unites_heures=unites_heures+excluded.unites_heures
+    ''', [(d, *u) for d, u in totals.items()])
+
+
+def close_lines(conn, line_ids, at=None):
+    """Retour de clôture des lignes sorties parmi `line_ids`, avant leur suppression (dans la transaction en cours) :
+    leurs unités quittent `encours`, le temps passé dehors jusqu'ici reste compté. Renvoie les ids rentrés."""
+    rows = conn.execute("SELECT id, COALESCE(parent_id, id), quantite FROM equipement WHERE id IN (SELECT value FROM json_each(?)) "
+                        "AND statut='Sorti'", (json.dumps(list(line_ids)),)).fetchall()
+    record(conn, [(i, p, q, "in", None) for i, p, q in rows], at=at)
+    return [i for i, _, _ in rows]
+
+
+def history(conn, item_id, limit=200):
+    """Derniers mouvements d'un objet (lot parent pour les lots) : [(horodatage, sens, quantité, id_kit, emprunteur)]."""
+    return conn.execute("SELECT horodatage, sens, quantite, id_kit, emprunteur FROM mouvements WHERE id_equipement=? "
+                        "ORDER BY horodatage DESC LIMIT ?", (item_id, limit)).fetchall()
+
+
+def on_loan(conn):
+    """Qui a quoi depuis quand : [(id, nom, marque, quantité, sorti le, emprunteur)] pour chaque ligne sortie."""
+    return conn.execute('''
+        SELECT e.id, e.nom, e.marque, e.quantite, COALESCE(m.horodatage, e.date_sortie), m.emprunteur FROM equipement e
+        LEFT JOIN mouvements m ON m.id = (SELECT MAX(id) FROM mouvements WHERE id_ligne = e.id AND sens = 'out')
+        WHERE e.statut = 'Sorti' ORDER BY m.horodatage
+    ''').fetchall()
+
+
+def occupation(conn, start, end, units):
+    """Part des `units` unités du parc passée dehors entre les jours ISO `start` et `end` inclus (0..1).
+    Les sorties encore en cours sont comptées jusqu'à maintenant."""
+    t0 = datetime.datetime.fromisoformat(start); t1 = min(datetime.datetime.fromisoformat(end) + datetime.timedelta(days=1), datetime.datetime.now())
+    if not units or t1 <= t0: return 0.0
+    done = conn.execute("SELECT COALESCE(SUM(unites_heures), 0) FROM utilisation_totale WHERE jour BETWEEN ? AND ?", (start, end)).fetchone()[0]
+    running = sum(q * h for q, since in conn.execute("SELECT quantite, depuis FROM encours")
+                  for _, h in day_segments(max(t0, datetime.datetime.fromisoformat(since)), t1))
+    return (done + running) / (units * (t1 - t0).total_seconds() / 3600)
+
+
+def most_rented(conn, start, end, limit=10):
+    """Objets les plus sortis entre deux jours ISO : [(id, nom, sorties, unités sorties, unités x heures)].
+    Les mois entièrement compris dans la période sont lus dans utilisation_mois, les jours des bords dans utilisation_jour."""
+    d0, d1 = datetime.date.fromisoformat(start), datetime.date.fromisoformat(end)
+    m0 = d0 if d0.day == 1 else (d0.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    m1 = (d1 + datetime.timedelta(days=1)).replace(day=1)  # premier jour après le dernier mois complet
+    if m0 >= m1: m0 = m1 = d1 + datetime.timedelta(days=1)
+    return conn.execute('''
+        SELECT t.id_equipement, e.nom, t.sorties, t.unites_sorties, t.unites_heures FROM (
+            SELECT id_equipement, SUM(sorties) AS sorties, SUM(unites_sorties) AS unites_sorties, SUM(unites_heures) AS unites_heures FROM (
+                SELECT id_equipement, sorties, unites_sorties, unites_heures FROM utilisation_mois WHERE mois >= ? AND mois < ?
+                UNION ALL
+                SELECT id_equipement, sorties, unites_sorties, unites_heures FROM utilisation_jour
+                WHERE jour BETWEEN ? AND ? AND (jour < ? OR jour >= ?)
+            ) GROUP BY id_equipement ORDER BY 2 DESC, 4 DESC LIMIT ?
+        ) t LEFT JOIN equipement e ON e.id = t.id_equipement ORDER BY t.sorties DESC, t.unites_heures DESC
+    ''', (m0.isoformat()[:7], m1.isoformat()[:7], start, end, m0.isoformat(), m1.isoformat(), limit)).fetchall()
@@ -1,48 +1,93 @@
 import sys
 import os
-import qrcode
-import cv2
+import time
 import datetime
-import csv
-import random
-import string
-from pyzbar.pyzbar import decode, ZBarSymbol
+import sqlite3
+import bisect
+import json
+import mimetypes
+import tempfile
+import threading
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QStackedWidget, 
                              QTableWidget, QTableWidgetItem, QHeaderView, 
                              QDialog, QFormLayout, QLineEdit, QComboBox, 
-                             QFileDialog, QMessageBox, QInputDialog, QListWidget, QListWidgetItem, QCheckBox, QSpinBox, QFrame)
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QImage, QPixmap, QColor, QFont
-from database import Database
-
-# Imports pour le PDF
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
+                             QFileDialog, QMessageBox, QInputDialog, QListWidget, QListWidgetItem, QCheckBox, QSpinBox, QFrame,
+                             QTableView, QStyledItemDelegate, QStyleOptionButton, QStyle, QAbstractItemView, QProgressDialog)
+from PyQt6.QtCore import Qt, QTimer, QObject, QAbstractTableModel, QModelIndex, QEvent, QRect, QRunnable, QThreadPool, QUrl, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap, QColor, QFont, QKeySequence, QShortcut, QDesktopServices
+from database import Database, sn_prefix
+import perf
+import assets
+import qr
+import labels
+import csv_io
+import scanner
+import kits
+import ledger
+from station import Station, TABLES as SYNCED_TABLES
 
 # --- LOGIQUE METIER ---
 class LogicManager:
     @staticmethod
     def setup_folders():
-        for path in ["data/qrcodes", "data/factures"]:
+        for path in ["data"]:  # QR et factures : magasin d'assets (data/assets.db)
             os.makedirs(path, exist_ok=True)
 
     @staticmethod
-    def generate_unique_sn(prefix="INT"):
-        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        return f"{prefix}-{suffix}"
+    def sn_prefix(categorie):
+        return sn_prefix(categorie)
+
+    @staticmethod
+    def generate_unique_sn(db, prefix="INT"):
+        # S/N tiré de la séquence du préfixe : unique garanti (voir database.allocate_sns)
+        return db.allocate_sns(prefix, 1)[0]
 
     @staticmethod
-    def generate_qr(item_id, sn):
+    def generate_qr(item_id, sn, store):
+        # Rendu synchrone ; l'interface passe par MainWindow.qr_queue (threads)
         if not sn: return None
-        try:
-            path = f"data/qrcodes/QR_{item_id}.png"
-            img = qrcode.make(f"PROSTOCK-ID:{item_id}-SN:{sn}")
-            img.save(path)
-            return path
+        try: return qr.render(item_id, sn, store)
         except: return None
 
+    @staticmethod
+    def move_item(db, i_id, state, qty=None, borrower=None):
+        """Sortie / retour d'un objet dont `state` vient de Database.item_state ; renvoie les ids touchés.
+        Une sortie de `qty` unités d'un lot qui en compte plus crée une ligne fille ; son retour la fond dans le lot."""
+        cur = db.conn.cursor(); _, st, qte, lot, p_id = state; now = datetime.datetime.now().strftime("%d/%m %H:%M")
+        touched = [i_id, p_id]; moves = []  # (ligne, objet de stock, qté, sens, kit) pour le journal
+        if lot and st == "En stock" and qty is not None and qty < qte:
+            cur.execute("UPDATE equipement SET quantite=quantite-? WHERE id=?", (qty, i_id))
+            cur.execute("INSERT INTO equipement (nom, marque, sn, quantite, is_lot, statut, parent_id, date_sortie, categorie) SELECT nom, marque, ?, ?, 1, 'Sorti', ?, ?, categorie FROM equipement WHERE id=?", (LogicManager.generate_unique_sn(db, "LOT"), qty, i_id, now, i_id))
+            touched.append(cur.lastrowid); moves.append((cur.lastrowid, i_id, qty, "out", None))
+        elif p_id and st == "Sorti":
+            cur.execute("UPDATE equipement SET quantite=quantite+? WHERE id=?", (qte, p_id)); cur.execute("DELETE FROM equipement WHERE id=?", (i_id,))
+            moves.append((i_id, p_id, qte, "in", None))
+        else:
+            nv = "Sorti" if st=="En stock" else "En stock"
+            cur.execute("UPDATE equipement SET statut=?, date_sortie=? WHERE id=?", (nv, now if nv=="Sorti" else None, i_id))
+            if st != "En Maintenance": moves.append((i_id, p_id or i_id, qte, "out" if nv == "Sorti" else "in", None))
+        ledger.record(db.conn, moves, borrower)
+        db.conn.commit(); return touched
+
+    @staticmethod
+    def update_item(db, i_id, nom, marque, sn, prix, quantite, categorie, is_lot):
+        """Modifie une fiche. La quantité d'une ligne sortie ne change pas (ValueError) : le journal et `encours`
+        comptent les unités parties, le retour doit rentrer les mêmes. sqlite3.IntegrityError si le S/N est pris."""
+        res = db.item_state(i_id)
+        if res and res[1] == "Sorti" and quantite != res[2]: raise ValueError("Rentrez l'objet avant de changer sa quantité.")
+        try:
+            db.conn.execute("UPDATE equipement SET nom=?, marque=?, sn=?, prix=?, quantite=?, categorie=?, is_lot=? WHERE id=?",
+                            (nom, marque, sn, prix, quantite, categorie, is_lot, i_id))
+        except sqlite3.IntegrityError: db.conn.rollback(); raise
+        db.conn.commit()
+
+    @staticmethod
+    def delete_item(db, i_id):
+        """Supprime une ligne ; sortie, elle est d'abord rentrée dans le journal (même transaction) pour qu'`encours`
+        et l'occupation ne la comptent plus."""
+        ledger.close_lines(db.conn, [i_id]); db.conn.execute("DELETE FROM equipement WHERE id=?", (i_id,)); db.conn.commit()
+
 # --- DIALOGUES ---
 class AddRepairDialog(QDialog):
     def __init__(self, item_name, parent=None):
@@ -57,6 +102,41 @@ class AddRepairDialog(QDialog):
         layout.addLayout(form); self.btn_save = QPushButton("Envoyer en réparation"); self.btn_save.setObjectName("ActionBtn")
         self.btn_save.clicked.connect(self.accept); layout.addWidget(self.btn_save)
 
+class InvoiceDialog(QDialog):
+    """Facture d'un objet : aperçu (vignette en cache), pièce jointe rangée dans le magasin d'assets.
+    `ref` donne la référence à enregistrer après exec() (None : facture retirée)."""
+    def __init__(self, item_name, ref, store, thumbs, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Facture : {item_name}")
+        self.setFixedWidth(320); self.ref, self.store, self.thumbs = ref, store, thumbs
+        layout = QVBoxLayout(self); self.preview = QLabel(); self.preview.setAlignment(Qt.AlignmentFlag.AlignCenter); self.preview.setMinimumHeight(250)
+        self.info = QLabel(); self.info.setAlignment(Qt.AlignmentFlag.AlignCenter); self.info.setStyleSheet("color: #888;")
+        h = QHBoxLayout(); btn_attach = QPushButton("📎 Joindre…"); btn_attach.clicked.connect(self.attach)
+        self.btn_open = QPushButton("Ouvrir"); self.btn_open.clicked.connect(self.open_file)
+        self.btn_remove = QPushButton("Retirer"); self.btn_remove.clicked.connect(lambda: (setattr(self, "ref", None), self.show_invoice()))
+        h.addWidget(btn_attach); h.addWidget(self.btn_open); h.addWidget(self.btn_remove)
+        self.btn_save = QPushButton("Enregistrer"); self.btn_save.setObjectName("ActionBtn"); self.btn_save.clicked.connect(self.accept)
+        layout.addWidget(self.preview); layout.addWidget(self.info); layout.addLayout(h); layout.addWidget(self.btn_save); self.show_invoice()
+
+    def show_invoice(self):
+        meta = self.store.info(self.ref); img = self.thumbs.get(self.ref) if meta else None
+        if img: self.preview.setPixmap(QPixmap.fromImage(img))
+        else: self.preview.setPixmap(QPixmap()); self.preview.setText("Aperçu indisponible" if meta else "Aucune facture")
+        self.info.setText(f"{meta[0]} · {meta[1] / 1024:.0f} Ko" if meta else ""); self.btn_open.setEnabled(bool(meta)); self.btn_remove.setEnabled(bool(meta))
+
+    def attach(self):
+        f, _ = QFileDialog.getOpenFileName(self, "Facture", "", "Factures (*.pdf *.png *.jpg *.jpeg);;Tous les fichiers (*)")
+        if f: self.ref = self.store.put_file(f); self.show_invoice()
+
+    def open_file(self):
+        # Copie dans le dossier temporaire (par morceaux), nommée par le contenu : ouverte par l'application du système
+        path = os.path.join(tempfile.gettempdir(), f"prostock-{assets.key_of(self.ref)[:16]}{mimetypes.guess_extension(self.store.info(self.ref)[0]) or ''}")
+        if not os.path.exists(path):
+            with self.store.open(self.ref) as blob, open(path + ".tmp", "wb") as f:
+                while chunk := blob.read(1 << 20): f.write(chunk)
+            os.replace(path + ".tmp", path)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+
 class SelectItemsDialog(QDialog):
     def __init__(self, items, parent=None):
         super().__init__(parent)
@@ -73,6 +153,14 @@ class SelectItemsDialog(QDialog):
     def get_selected_ids(self):
         return [self.list_widget.item(i).data(Qt.ItemDataRole.UserRole) for i in range(self.list_widget.count()) if self.list_widget.item(i).checkState() == Qt.CheckState.Checked]
 
+class SelectColumnsDialog(SelectItemsDialog):
+    def __init__(self, columns, parent=None):
+        super().__init__([], parent); self.setWindowTitle("Colonnes à exporter")
+        for header, _, default in columns:
+            list_item = QListWidgetItem(header); list_item.setData(Qt.ItemDataRole.UserRole, header)
+            list_item.setFlags(list_item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            list_item.setCheckState(Qt.CheckState.Checked if default else Qt.CheckState.Unchecked); self.list_widget.addItem(list_item)
+
 class AddDeviceDialog(QDialog):
     def __init__(self, parent=None, edit_data=None):
         super().__init__(parent); self.setWindowTitle("Matériel"); self.setFixedWidth(500)
@@ -106,10 +194,192 @@ class AddDeviceDialog(QDialog):
     def toggle_cable_fields(self, text):
         self.cable_widget.setVisible(text == "Câblage")
 
+# --- NOTIFICATIONS DE CHANGEMENTS ---
+class ChangeBus(QObject):
+    """Chaque écriture publie ce qu'elle a touché ; tout ce qui est publié pendant un même tour de boucle
+    d'événements est fusionné en un seul signal `changed(tables, ids)` (ids = None : lignes inconnues, tout relire).
+    Depuis un autre thread (synchronisation d'un poste), émettre `remote(tables, ids)` au lieu d'appeler `publish`."""
+    changed = pyqtSignal(object, object)
+    remote = pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent); self.tables, self.ids, self.scheduled = set(), set(), False
+        self.remote.connect(self.publish)  # connexion mise en file : publish s'exécute dans le thread de l'interface
+
+    def publish(self, tables, ids=None):
+        self.tables |= set(tables)
+        if "equipement" in tables and self.ids is not None: self.ids = None if ids is None else self.ids | {i for i in ids if i}
+        if not self.scheduled: self.scheduled = True; QTimer.singleShot(0, self.flush)
+
+    def flush(self):
+        tables, ids = self.tables, self.ids; self.tables, self.ids, self.scheduled = set(), set(), False
+        if tables: self.changed.emit(tables, ids)
+
+# --- TÂCHES EN ARRIÈRE-PLAN (exports, imports) ---
+class JobSignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)  # résultat de la fonction, None si annulé
+    failed = pyqtSignal(str)
+
+class BackgroundJob(QRunnable):
+    """Exécute une fonction d'export/import sur le QThreadPool ; elle reçoit les callbacks `progress=` et `cancelled=`."""
+    def __init__(self, parent, fn, *args, **kwargs):
+        super().__init__(); self.fn, self.args, self.kwargs = fn, args, kwargs; self.cancelled = False
+        # Les signaux appartiennent à la fenêtre : ils survivent au QRunnable détruit par le pool
+        self.signals = JobSignals(parent)
+
+    def run(self):
+        perf.recorder.name_thread("tâches")
+        try:
+            with perf.span(self.fn.__name__, "tâche") as info:
+                res = self.fn(*self.args, progress=self.signals.progress.emit, cancelled=lambda: self.cancelled, **self.kwargs)
+                if isinstance(res, int): info["lignes"] = res
+        except Exception as e: self.signals.failed.emit(str(e)); return
+        self.signals.finished.emit(res)
+
+# --- MESURES (python main.py --perf) ---
+class PerfOverlay(QLabel):
+    """Résumé des mesures de perf.py, en bas à droite de la fenêtre (à côté du toast), rafraîchi chaque seconde."""
+    def __init__(self, parent):
+        super().__init__(parent); self.setObjectName("PerfOverlay"); self.hide()
+        self.timer = QTimer(self); self.timer.setInterval(1000); self.timer.timeout.connect(self.refresh)
+
+    def toggle(self):
+        if self.isVisible(): self.hide(); self.timer.stop(); return
+        self.refresh(); self.show(); self.raise_(); self.timer.start()
+
+    def refresh(self):
+        self.setText(perf.recorder.summary() + "\nF12 : masquer — Ctrl+Maj+T : trace Chrome"); self.adjustSize()
+        self.move(self.parentWidget().width() - self.width() - 20, self.parentWidget().height() - self.height() - 20)
+
+# --- MODÈLE INVENTAIRE ---
+class InventoryModel(QAbstractTableModel):
+    """Vue paginée de `equipement` : les lignes sont chargées par paquets (pagination sur l'id) au fil du défilement.
+    La première page d'une recherche est lue en arrière-plan : la frappe ne bloque jamais l'interface."""
+    HEADERS = ["ID", "Catégorie", "Nom", "Marque", "S/N", "Qté", "Statut", "Mouve.", "Action"]
+    CAT_COLORS = {"Photo": "#3498db", "Vidéo": "#e74c3c", "Son": "#2ecc71", "Câblage": "#f39c12", "Accessoires": "#95a5a6"}
+    STATUS_COLORS = {"En stock": "#00FF00", "En Maintenance": "#f39c12"}
+    BATCH = 200
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent); self.db = db; self.filter = ""; self.loading = False
+        self.rows, self.ids, self.last_id, self.exhausted = [], [], 0, False
+        self.bold = QFont(); self.bold.setBold(True)
+
+    def where(self):
+        # Recherche via l'index FTS5 (préfixes, sans accents) plutôt qu'un LIKE '%...%' qui parcourt toute la table
+        match = Database.fts_query(self.filter)
+        if not match: return "", ()
+        return Database.SEARCH, (match,)
+
+    def set_filter(self, text):
+        self.filter = text; self.loading = True; match = Database.fts_query(text)
+        self.db.submit(lambda conn: self.db.page(0, match, self.BATCH, conn), on_done=self.on_first_page, key=self)
+
+    @perf.timed("premiere_page", "load", rows=lambda a, res: len(a[1]))
+    def on_first_page(self, batch):
+        self.beginResetModel(); self.loading = False
+        self.rows, self.ids = list(batch), [r[0] for r in batch]
+        self.last_id, self.exhausted = (batch[-1][0] if batch else 0), len(batch) < self.BATCH
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self.rows)
+    def columnCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole: return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()): return not parent.isValid() and not self.exhausted and not self.loading
+
+    @perf.timed(cat="load")
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted or self.loading: return
+        batch = self.db.page(self.last_id, Database.fts_query(self.filter), self.BATCH); self.exhausted = len(batch) < self.BATCH
+        if not batch: return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(batch) - 1)
+        self.rows.extend(batch); self.ids.extend(r[0] for r in batch); self.last_id = batch[-1][0]
+        self.endInsertRows()
+
+    def fetch_all(self):
+        while self.canFetchMore(): self.fetchMore()
+
+    def row_data(self, row): return self.rows[row]
+
+    @perf.timed(cat="load", rows=lambda a, res: len(a[1]))
+    def refresh_rows(self, ids):
+        """Relit uniquement les lignes touchées par une écriture (modifiées, créées ou supprimées)."""
+        ids = sorted({i for i in ids if i})
+        if not ids: return
+        # Page en cours de lecture : elle a pu être lue avant l'écriture, on la redemande
+        if self.loading: self.set_filter(self.filter); return
+        found = {r[0]: r for r in self.db.rows(ids, Database.fts_query(self.filter))}
+        for i in ids:
+            pos = bisect.bisect_left(self.ids, i); present = pos < len(self.ids) and self.ids[pos] == i
+            if i in found and present:
+                self.rows[pos] = found[i]; self.dataChanged.emit(self.index(pos, 0), self.index(pos, len(self.HEADERS) - 1))
+            elif i in found and (i <= self.last_id or self.exhausted):
+                # Nouvelle ligne dans la zone déjà chargée (au-delà, fetchMore la ramènera)
+                self.beginInsertRows(QModelIndex(), pos, pos)
+                self.rows.insert(pos, found[i]); self.ids.insert(pos, i); self.last_id = max(self.last_id, i)
+                self.endInsertRows()
+            elif present:
+                self.beginRemoveRows(QModelIndex(), pos, pos); del self.rows[pos]; del self.ids[pos]; self.endRemoveRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        r, c = self.rows[index.row()], index.column()
+        if role == Qt.ItemDataRole.DisplayRole and c < 7: return str(r[c] if r[c] else "---")
+        if role == Qt.ItemDataRole.TextAlignmentRole: return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if c == 1: return QColor(self.CAT_COLORS.get(r[1], "#ffffff"))
+            if c == 6: return QColor(self.STATUS_COLORS.get(r[6], "#FF4444"))
+        if role == Qt.ItemDataRole.FontRole and c == 1: return self.bold
+        if role == Qt.ItemDataRole.UserRole: return r
+        return None
+
+class ButtonsDelegate(QStyledItemDelegate):
+    """Dessine des boutons dans une cellule sans créer de widgets ; `clicked(row, n° du bouton)` au relâchement."""
+    clicked = pyqtSignal(int, int)
+
+    def __init__(self, buttons, view, width=None):
+        super().__init__(view); self.buttons = buttons; self.width = width; self.pressed = None
+        # Bouton jamais affiché : sert de support au style (styles.qss) pour le rendu des boutons
+        self.proto = QPushButton(view); self.proto.hide()
+
+    def rects(self, rect, n):
+        if self.width:
+            x = rect.x() + (rect.width() - n * self.width) // 2
+            return [QRect(x + k * self.width, rect.y(), self.width, rect.height()) for k in range(n)]
+        w = rect.width() // n; return [QRect(rect.x() + k * w, rect.y(), w, rect.height()) for k in range(n)]
+
+    def paint(self, painter, option, index):
+        btns = self.buttons(index.data(Qt.ItemDataRole.UserRole))
+        for k, (rect, (text, enabled)) in enumerate(zip(self.rects(option.rect, len(btns)), btns)):
+            opt = QStyleOptionButton(); opt.rect = rect; opt.text = text; opt.palette = option.palette
+            opt.state = QStyle.StateFlag.State_Enabled if enabled else QStyle.StateFlag.State_None
+            opt.state |= QStyle.StateFlag.State_Sunken if self.pressed == (index.row(), k) else QStyle.StateFlag.State_Raised
+            self.proto.style().drawControl(QStyle.ControlElement.CE_PushButton, opt, painter, self.proto)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease): return False
+        btns = self.buttons(index.data(Qt.ItemDataRole.UserRole)); pos = event.position().toPoint(); hit = None
+        for k, rect in enumerate(self.rects(option.rect, len(btns))):
+            if rect.contains(pos) and btns[k][1]: hit = (index.row(), k)
+        if event.type() == QEvent.Type.MouseButtonPress: self.pressed = hit; return hit is not None
+        pressed, self.pressed = self.pressed, None
+        if hit and hit == pressed: self.clicked.emit(*hit)
+        return hit is not None
+
 # --- FENÊTRE PRINCIPALE ---
 class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__(); self.db = Database(); self.update_db_schema(); self.resize(1400, 850)
+    def __init__(self, server=None):
+        super().__init__(); self.resize(1400, 850)
+        # Mode multi-postes (--server URL) : l'interface lit le cache local du poste, les mouvements partent au serveur
+        self.station = Station(server, "database/poste.db") if server else None
+        self.db = self.station.cache if self.station else Database()
+        # Envois au serveur hors du thread de l'interface, un à la fois : ils arrivent dans l'ordre des clics et des scans
+        self.station_pool = QThreadPool(self); self.station_pool.setMaxThreadCount(1)
         main_widget = QWidget(); self.setCentralWidget(main_widget); self.main_layout = QHBoxLayout(main_widget)
         self.main_layout.setContentsMargins(0,0,0,0)
 
@@ -117,159 +387,255 @@ class MainWindow(QMainWindow):
         self.sidebar = QWidget(); self.sidebar.setObjectName("Sidebar"); sidebar_layout = QVBoxLayout(self.sidebar)
         logo = QLabel("PRO-STOCK"); logo.setObjectName("TitleLabel"); sidebar_layout.addWidget(logo)
         self.btn_inv = QPushButton("📦 Inventaire"); self.btn_kits = QPushButton("🧰 Kits")
-        self.btn_check = QPushButton("🔄 Check In/Out"); self.btn_maint = QPushButton("🛠 Maintenance")
-        for b in [self.btn_inv, self.btn_kits, self.btn_check, self.btn_maint]: sidebar_layout.addWidget(b)
+        self.btn_check = QPushButton("🔄 Check In/Out"); self.btn_maint = QPushButton("🛠 Maintenance"); self.btn_scan = QPushButton("📷 Scan")
+        for b in [self.btn_inv, self.btn_kits, self.btn_check, self.btn_maint, self.btn_scan]: sidebar_layout.addWidget(b)
         sidebar_layout.addStretch()
 
         self.toast = QLabel(self); self.toast.setObjectName("Toast"); self.toast.hide()
         self.toast_timer = QTimer(); self.toast_timer.timeout.connect(self.toast.hide)
-
-        # Content
-        self.content = QStackedWidget()
-        self.page_inv = self.create_inv_page()
-        self.page_kits = self.create_kits_page()
-        self.page_check = self.create_check_page()
-        self.page_maint = self.create_maintenance_page()
-        for p in [self.page_inv, self.page_kits, self.page_check, self.page_maint]: self.content.addWidget(p)
+        if perf.recorder.enabled:
+            # Mesures : F12 affiche l'overlay, Ctrl+Maj+T exporte une trace Chrome, résumé SQL dans le journal chaque minute
+            self.perf_overlay = PerfOverlay(self)
+            QShortcut(QKeySequence("F12"), self).activated.connect(self.perf_overlay.toggle)
+            QShortcut(QKeySequence("Ctrl+Shift+T"), self).activated.connect(self.export_trace)
+            self.perf_timer = QTimer(self); self.perf_timer.timeout.connect(perf.recorder.dump); self.perf_timer.start(60_000)
+
+        # QR et factures dans le magasin d'assets ; ramasse-miettes en arrière-plan peu après le démarrage
+        # et après les suppressions (un seul passage pour une rafale)
+        self.assets = assets.AssetStore(); self.thumbs = assets.ThumbnailCache(self.assets)
+        self.gc_timer = QTimer(self); self.gc_timer.setSingleShot(True); self.gc_timer.setInterval(5000)
+        self.gc_timer.timeout.connect(self.sweep_assets); self.gc_timer.start()
+
+        # Rendu des QR en arrière-plan ; les références sont enregistrées en base par paquets
+        self.qr_queue = qr.QrQueue(self.assets, self); self.qr_paths = []
+        self.qr_queue.rendered.connect(lambda i, path: self.qr_paths.append((path, i)))
+        self.qr_queue.progress.connect(self.on_qr_progress); self.qr_queue.finished.connect(self.save_qr_paths)
+
+        # Content : seule la page Inventaire est construite au démarrage ; les autres pages sont des conteneurs vides
+        # remplis à leur première visite (self.builders)
+        self.content = QStackedWidget(); self.page_inv = self.create_inv_page(); self.camera = self.wedge = None
+        self.page_kits, self.page_check, self.page_maint, self.page_scan = (QWidget() for _ in range(4))
+        for p in [self.page_inv, self.page_kits, self.page_check, self.page_maint, self.page_scan]: self.content.addWidget(p)
+        self.builders = {self.page_kits: self.create_kits_page, self.page_check: self.create_check_page,
+                         self.page_maint: self.create_maintenance_page, self.page_scan: self.create_scan_page}
         self.main_layout.addWidget(self.sidebar); self.main_layout.addWidget(self.content)
 
+        # Page -> (tables dont elle dépend, rechargement). Les pages cachées sont seulement marquées "sales"
+        # et rechargées quand on les affiche.
+        self.pages = {self.page_inv: ({"equipement"}, self.refresh_inventory),
+                      self.page_kits: ({"kits", "kit_items", "kit_checkouts"}, lambda ids: self.load_kits_data()),
+                      self.page_check: ({"equipement"}, lambda ids: self.load_check_data()),
+                      self.page_maint: ({"equipement", "reparations"}, lambda ids: self.load_maintenance_data()),
+                      self.page_scan: ({"equipement"}, self.load_scan_index)}
+        self.dirty = {}; self.changes = ChangeBus(self); self.changes.changed.connect(self.on_data_changed)
+        if self.station:
+            # Deltas du serveur (attente longue) dans un thread ; le premier instantané relit tout (ids = None)
+            self.sync_stop = threading.Event()
+            threading.Thread(target=self.station.run, args=(self.sync_stop, lambda ids: self.changes.remote.emit(set(SYNCED_TABLES), ids)),
+                             daemon=True, name="synchronisation").start()
+        self.content.currentChanged.connect(lambda i: self.refresh_page(self.content.widget(i)))
+
         self.btn_inv.clicked.connect(lambda: self.content.setCurrentIndex(0))
         self.btn_kits.clicked.connect(lambda: self.content.setCurrentIndex(1))
         self.btn_check.clicked.connect(lambda: self.content.setCurrentIndex(2))
         self.btn_maint.clicked.connect(lambda: self.content.setCurrentIndex(3))
+        self.btn_scan.clicked.connect(lambda: self.content.setCurrentIndex(4))
+        self.content.currentChanged.connect(self.on_page_changed)
+
+        # Premier affichage : la première page de l'inventaire est lue tout de suite (LIMIT sur la clé primaire),
+        # le dashboard arrive en arrière-plan
+        self.inv_model.on_first_page(self.db.page(0, None, InventoryModel.BATCH)); self.update_dashboard()
+        self.load_stylesheet()
+
+    def on_data_changed(self, tables, ids):
+        for page, (deps, _) in self.pages.items():
+            if not deps & tables: continue
+            pending = self.dirty.get(page, set())
+            self.dirty[page] = None if pending is None or ids is None else pending | ids
+        self.refresh_page(self.content.currentWidget())
+
+    def refresh_page(self, page):
+        if page in self.builders:
+            # Première visite : construction de la page dans son conteneur, puis chargement complet
+            lay = QVBoxLayout(page); lay.setContentsMargins(0,0,0,0); lay.addWidget(self.builders.pop(page)()); self.dirty[page] = None
+        if page not in self.dirty: return
+        # Tout rechargement de page passe ici : complet (ids None) et partiel sont chronométrés séparément
+        ids = self.dirty.pop(page)
+        with perf.span("rechargement complet" if ids is None else "rechargement partiel", "load", page=self.content.indexOf(page)):
+            self.pages[page][1](ids)
+
+    def refresh_inventory(self, ids):
+        # ids : lignes touchées par les écritures -> seules celles-ci sont relues
+        if ids is None: self.load_data()
+        else: self.inv_model.refresh_rows(ids)
+        self.update_dashboard()
 
-        self.refresh_all(); self.load_stylesheet()
-
-    def update_db_schema(self):
-        cursor = self.db.conn.cursor()
-        for col in ["quantite INTEGER DEFAULT 1", "is_lot INTEGER DEFAULT 0", "parent_id INTEGER DEFAULT NULL", "date_sortie TEXT", "categorie TEXT", "prix REAL DEFAULT 0"]:
-            try: cursor.execute(f"ALTER TABLE equipement ADD COLUMN {col}")
-            except: pass
-        self.db.conn.commit()
-
-    def refresh_all(self):
-        self.load_data(); self.load_check_data(); self.load_maintenance_data(); self.load_kits_data(); self.update_dashboard()
+    def remote(self, fn, *args, on_done=None):
+        """Écriture envoyée au serveur (mode multi-postes) sur self.station_pool ; `on_done(réponse)` dans le thread
+        de l'interface, un message si le serveur ne répond pas. Le cache est mis à jour par le delta qui suit."""
+        def call(*a, progress=None, cancelled=None): return fn(*a)
+        call.__name__ = fn.__name__; job = BackgroundJob(self, call, *args)
+        job.signals.failed.connect(lambda msg: self.show_toast(f"Échec de l'envoi au serveur : {msg}"))
+        if on_done: job.signals.finished.connect(on_done)
+        for sig in (job.signals.finished, job.signals.failed): sig.connect(job.signals.deleteLater)
+        self.station_pool.start(job)
+
+    def server_only(self):
+        """Mode multi-postes : fiches, factures, kits et imports ne se modifient que sur la base du serveur."""
+        if self.station: self.show_toast("Poste connecté au serveur : modification impossible ici")
+        return self.station is not None
+
+    def send_moves(self, conn, moves, borrower=None):
+        # Écriture des scans d'un poste (ScanSession.write) : envoi en arrière-plan, rien à relire tout de suite
+        for i, direction in moves: self.station.move(i, direction)
+        self.remote(self.station.flush, borrower); return []
 
     def show_toast(self, message):
         self.toast.setText(message); self.toast.adjustSize()
         self.toast.move((self.width() - self.toast.width()) // 2, self.height() - 80)
         self.toast.show(); self.toast_timer.start(2500)
 
+    def export_trace(self):
+        path = os.path.join(os.path.dirname(perf.LOG_PATH), f"trace-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+        n = perf.recorder.write_trace(path); self.show_toast(f"Trace Chrome : {path} ({n} événements)")
+
     def create_stat_card(self, title, color):
         card = QFrame(); card.setObjectName("StatCard"); card.setStyleSheet(f"QFrame#StatCard {{ background-color: #1e1e1e; border-radius: 8px; border-left: 5px solid {color}; padding: 10px; }}")
         lay = QVBoxLayout(card); t = QLabel(title); t.setStyleSheet("color: #888; font-size: 11px;"); v = QLabel("0")
         v.setStyleSheet(f"color: {color}; font-size: 18px; font-weight: bold;"); lay.addWidget(t); lay.addWidget(v); card.v = v; return card
 
     def update_dashboard(self):
-        cur = self.db.conn.cursor()
-        cur.execute("SELECT SUM(prix * quantite) FROM equipement"); val = cur.fetchone()[0] or 0
-        self.stat_val.v.setText(f"{val:,.2f} €")
-        cur.execute("SELECT COUNT(*) FROM equipement WHERE statut = 'Sorti'"); out = cur.fetchone()[0] or 0
-        self.stat_out.v.setText(str(out))
-        cur.execute("SELECT COUNT(*) FROM equipement WHERE statut = 'En Maintenance'"); maint = cur.fetchone()[0] or 0
-        self.stat_maint.v.setText(str(maint))
+        self.db.submit(self.db.dashboard_stats, on_done=self.show_dashboard, key="dashboard")
+
+    @perf.timed(cat="load")
+    def show_dashboard(self, stats):
+        self.stat_val.v.setText(f"{stats['valeur']:,.2f} €"); self.stat_out.v.setText(str(stats['sorti']))
+        self.stat_maint.v.setText(str(stats['maintenance'])); self.stat_occ.v.setText(f"{stats['occupation']:.0%}")
 
     def create_inv_page(self):
         p = QWidget(); l = QVBoxLayout(p); dash = QHBoxLayout()
         self.stat_val = self.create_stat_card("VALEUR PARC", "#3498db"); self.stat_out = self.create_stat_card("MATÉRIEL SORTI", "#e74c3c")
-        self.stat_maint = self.create_stat_card("EN RÉPARATION", "#f39c12"); dash.addWidget(self.stat_val); dash.addWidget(self.stat_out); dash.addWidget(self.stat_maint)
+        self.stat_maint = self.create_stat_card("EN RÉPARATION", "#f39c12"); self.stat_occ = self.create_stat_card("TAUX D'OCCUPATION", "#2ecc71")
+        for card in [self.stat_val, self.stat_out, self.stat_maint, self.stat_occ]: dash.addWidget(card)
         l.addLayout(dash); h = QHBoxLayout()
-        self.search = QLineEdit(); self.search.setPlaceholderText("Rechercher..."); self.search.textChanged.connect(self.load_data)
+        self.search = QLineEdit(); self.search.setPlaceholderText("Rechercher...")
+        # Anti-rebond : une seule requête quand la frappe se calme
+        self.search_timer = QTimer(); self.search_timer.setSingleShot(True); self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.load_data); self.search.textChanged.connect(lambda _: self.search_timer.start())
         btn_csv = QPushButton("📊 CSV"); btn_csv.clicked.connect(self.export_to_csv)
+        btn_import = QPushButton("📥 Import"); btn_import.clicked.connect(self.import_from_csv)
         btn_qr = QPushButton("🖨️ QR"); btn_qr.clicked.connect(self.export_qr_sheet)
+        btn_qr_missing = QPushButton("🔁 QR manquants"); btn_qr_missing.clicked.connect(self.regenerate_missing_qr)
         btn_add = QPushButton("+ Ajouter"); btn_add.setObjectName("ActionBtn"); btn_add.clicked.connect(self.open_add_dialog)
-        h.addWidget(self.search); h.addStretch(); h.addWidget(btn_csv); h.addWidget(btn_qr); h.addWidget(btn_add)
-        l.addLayout(h); self.table = QTableWidget(); self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels(["ID", "Catégorie", "Nom", "Marque", "S/N", "Qté", "Statut", "Mouve.", "Action"])
+        h.addWidget(self.search); h.addStretch(); h.addWidget(btn_csv); h.addWidget(btn_import); h.addWidget(btn_qr); h.addWidget(btn_qr_missing); h.addWidget(btn_add)
+        l.addLayout(h); self.table = QTableView(); self.inv_model = InventoryModel(self.db, self); self.table.setModel(self.inv_model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed); self.table.verticalHeader().setDefaultSectionSize(36)
+
+        # Boutons dessinés par délégués (aucun widget par ligne)
+        self.mv_delegate = ButtonsDelegate(self.move_button, self.table)
+        self.mv_delegate.clicked.connect(lambda row, k: self.toggle_status(self.inv_model.row_data(row)[0]))
+        self.act_delegate = ButtonsDelegate(self.action_buttons, self.table, width=30)
+        self.act_delegate.clicked.connect(self.on_action_clicked)
+        self.table.setItemDelegateForColumn(7, self.mv_delegate); self.table.setItemDelegateForColumn(8, self.act_delegate)
         l.addWidget(self.table); return p
 
-    def get_cat_color(self, cat):
-        colors = {"Photo": "#3498db", "Vidéo": "#e74c3c", "Son": "#2ecc71", "Câblage": "#f39c12", "Accessoires": "#95a5a6"}
-        return colors.get(cat, "#ffffff")
+    @staticmethod
+    def move_button(r):
+        if r[6] == "En Maintenance": return [("En Rép.", False)]
+        return [("Rentrer" if r[6] == "Sorti" else "Sortir", True)]
+
+    @staticmethod
+    def action_buttons(r):
+        return [("✏️", True), ("📄", True), ("🛠️", r[6] == "En stock"), ("🗑️", True)]
 
+    def on_action_clicked(self, row, k):
+        r = self.inv_model.row_data(row)
+        if k == 0: self.edit_item(r)
+        elif k == 1: self.open_invoice_dialog(r[0], r[2])
+        elif k == 2: self.open_repair_dialog(r[0], r[2])
+        else: self.delete_item(r[0])
+
+    @perf.timed(cat="load")
     def load_data(self):
-        f = self.search.text(); cur = self.db.conn.cursor()
-        q = "SELECT id, categorie, nom, marque, sn, quantite, statut, prix, is_lot FROM equipement"
-        if f: cur.execute(f"{q} WHERE nom LIKE ? OR marque LIKE ? OR categorie LIKE ?", (f'%{f}%', f'%{f}%', f'%{f}%'))
-        else: cur.execute(q)
-        rows = cur.fetchall(); self.table.setRowCount(0)
-        for r_idx, r_data in enumerate(rows):
-            self.table.insertRow(r_idx)
-            for c_idx in range(7):
-                val = str(r_data[c_idx] if r_data[c_idx] else "---")
-                it = QTableWidgetItem(val); it.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                
-                # GESTION DES COULEURS
-                if c_idx == 1: # Catégorie
-                    it.setForeground(QColor(self.get_cat_color(val)))
-                    f_bold = QFont(); f_bold.setBold(True); it.setFont(f_bold)
-                
-                if c_idx == 6: # Statut
-                    color = "#00FF00" if r_data[c_idx] == "En stock" else "#FF4444"
-                    if r_data[c_idx] == "En Maintenance": color = "#f39c12"
-                    it.setForeground(QColor(color))
-                    
-                self.table.setItem(r_idx, c_idx, it)
-            
-            # Bouton Mouvement
-            btn_mv = QPushButton("Rentrer" if r_data[6]=="Sorti" else "Sortir")
-            if r_data[6] == "En Maintenance": btn_mv.setEnabled(False); btn_mv.setText("En Rép.")
-            btn_mv.clicked.connect(lambda ch, i=r_data[0]: self.toggle_status(i)); self.table.setCellWidget(r_idx, 7, btn_mv)
-            
-            # Actions
-            act_lay = QHBoxLayout(); w = QWidget()
-            btn_e = QPushButton("✏️"); btn_e.setFixedWidth(30); btn_e.clicked.connect(lambda ch, d=r_data: self.edit_item(d))
-            btn_m = QPushButton("🛠️"); btn_m.setFixedWidth(30); btn_m.setEnabled(r_data[6]=="En stock"); btn_m.clicked.connect(lambda ch, i=r_data[0], n=r_data[2]: self.open_repair_dialog(i, n))
-            btn_d = QPushButton("🗑️"); btn_d.setFixedWidth(30); btn_d.clicked.connect(lambda ch, i=r_data[0]: self.delete_item(i))
-            act_lay.addWidget(btn_e); act_lay.addWidget(btn_m); act_lay.addWidget(btn_d); act_lay.setContentsMargins(0,0,0,0)
-            w.setLayout(act_lay); self.table.setCellWidget(r_idx, 8, w)
-        self.update_dashboard()
+        self.inv_model.set_filter(self.search.text())
 
     def edit_item(self, data):
         mapped = {'id': data[0], 'categorie': data[1], 'nom': data[2], 'marque': data[3], 'sn': data[4], 'quantite': data[5], 'prix': data[7], 'is_lot': data[8]}
+        if self.server_only(): return
         d = AddDeviceDialog(self, edit_data=mapped)
         if d.exec():
-            cur = self.db.conn.cursor()
-            cur.execute("UPDATE equipement SET nom=?, marque=?, sn=?, prix=?, quantite=?, categorie=?, is_lot=? WHERE id=?",
-                        (d.nom.text(), d.marque.text(), d.sn.text(), float(d.prix.text() or 0), d.quantite.value(), d.cat.currentText(), 1 if d.is_batch.isChecked() else 0, mapped['id']))
-            self.db.conn.commit(); self.refresh_all()
+            try:
+                LogicManager.update_item(self.db, mapped['id'], d.nom.text(), d.marque.text(), d.sn.text(), float(d.prix.text() or 0),
+                                         d.quantite.value(), d.cat.currentText(), 1 if d.is_batch.isChecked() else 0)
+            except sqlite3.IntegrityError: QMessageBox.warning(self, "Matériel", f"Le S/N « {d.sn.text()} » est déjà utilisé."); return
+            except ValueError as e: QMessageBox.warning(self, "Matériel", str(e)); return
+            self.changes.publish({"equipement"}, [mapped['id']])
+            if d.sn.text() != mapped['sn']: self.qr_queue.submit([(mapped['id'], d.sn.text())])  # QR périmé : l'ancien sera ramassé
 
     def delete_item(self, i_id):
+        if self.server_only(): return
         if QMessageBox.question(self, "Supprimer", "Supprimer définitivement ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes:
-            cur = self.db.conn.cursor(); cur.execute("DELETE FROM equipement WHERE id=?", (i_id,)); self.db.conn.commit(); self.refresh_all()
+            LogicManager.delete_item(self.db, i_id); self.changes.publish({"equipement"}, [i_id])
+            self.gc_timer.start()
+
+    def open_invoice_dialog(self, i_id, nom):
+        if self.server_only(): return
+        old = self.db.conn.execute("SELECT facture_path FROM equipement WHERE id=?", (i_id,)).fetchone()[0]
+        d = InvoiceDialog(nom, old, self.assets, self.thumbs, self)
+        if d.exec() and d.ref != old:
+            self.db.conn.execute("UPDATE equipement SET facture_path=? WHERE id=?", (d.ref, i_id)); self.db.conn.commit()
+            self.changes.publish({"equipement"}, [i_id]); self.show_toast("Facture enregistrée" if d.ref else "Facture retirée")
+            if old: self.gc_timer.start()
+
+    def sweep_assets(self):
+        # Sans dialogue : anciens fichiers rangés dans le magasin, assets orphelins supprimés.
+        # Pas sur un poste : qr_path / facture_path ne sont pas synchronisés, chaque instantané les remet à NULL
+        # dans le cache et le ramasse-miettes supprimerait des QR et factures encore utilisés
+        if self.station: return
+        job = BackgroundJob(self, assets.sweep, self.db.path, self.assets.path)
+        job.signals.finished.connect(lambda res: self.changes.publish({"equipement"}) if res and res["importes"] else None)
+        QThreadPool.globalInstance().start(job)
 
     def toggle_status(self, i_id):
-        cur = self.db.conn.cursor(); cur.execute("SELECT nom, statut, quantite, is_lot, parent_id FROM equipement WHERE id = ?", (i_id,))
-        res = cur.fetchone(); 
+        res = self.db.item_state(i_id)
         if not res: return
-        nom, st, qte, lot, p_id = res; now = datetime.datetime.now().strftime("%d/%m %H:%M")
+        nom, st, qte, lot, _ = res; borrower, qty = "", None
+        if st == "En stock":
+            borrower, ok = QInputDialog.getText(self, "Sortie", f"Emprunteur de '{nom}' (facultatif) :")
+            if not ok: return
+        if self.station:  # le serveur sort la ligne entière (pas de sortie partielle d'un lot)
+            self.station.move(i_id, "in" if st == "Sorti" else "out"); self.remote(self.station.flush, borrower.strip() or None); return
         if lot and st == "En stock" and qte > 1:
-            val, ok = QInputDialog.getInt(self, "Sortie", f"Qté pour '{nom}' ?", 1, 1, qte)
-            if ok:
-                if val == qte: cur.execute("UPDATE equipement SET statut='Sorti', date_sortie=? WHERE id=?", (now, i_id))
-                else:
-                    cur.execute("UPDATE equipement SET quantite=quantite-? WHERE id=?", (val, i_id))
-                    cur.execute("INSERT INTO equipement (nom, marque, sn, quantite, is_lot, statut, parent_id, date_sortie, categorie) SELECT nom, marque, 'LOT-OUT', ?, 1, 'Sorti', ?, ?, categorie FROM equipement WHERE id=?", (val, i_id, now, i_id))
-        elif p_id and st == "Sorti":
-            cur.execute("UPDATE equipement SET quantite=quantite+? WHERE id=?", (qte, p_id)); cur.execute("DELETE FROM equipement WHERE id=?", (i_id,))
-        else:
-            nv = "Sorti" if st=="En stock" else "En stock"
-            cur.execute("UPDATE equipement SET statut=?, date_sortie=? WHERE id=?", (nv, now if nv=="Sorti" else None, i_id))
-        self.db.conn.commit(); self.refresh_all()
+            qty, ok = QInputDialog.getInt(self, "Sortie", f"Qté pour '{nom}' ?", 1, 1, qte)
+            if not ok: return
+        self.changes.publish({"equipement"}, LogicManager.move_item(self.db, i_id, res, qty, borrower.strip() or None))
 
     def create_check_page(self):
         p = QWidget(); l = QVBoxLayout(p); l.addWidget(QLabel("MATÉRIEL SORTI"))
-        self.check_t = QTableWidget(); self.check_t.setColumnCount(5)
-        self.check_t.setHorizontalHeaderLabels(["ID", "Nom", "Marque", "Qté", "Sorti le"])
+        self.check_t = QTableWidget(); self.check_t.setColumnCount(6)
+        self.check_t.setHorizontalHeaderLabels(["ID", "Nom", "Marque", "Qté", "Sorti le", "Emprunteur"])
         self.check_t.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        l.addWidget(self.check_t); return p
+        l.addWidget(self.check_t); self.check_report = QLabel(""); l.addWidget(self.check_report); return p
 
+    @perf.timed(cat="load")
     def load_check_data(self):
-        cur = self.db.conn.cursor(); cur.execute("SELECT id, nom, marque, quantite, date_sortie FROM equipement WHERE statut='Sorti'")
-        rows = cur.fetchall(); self.check_t.setRowCount(0)
+        def query(conn):
+            # Date et emprunteur viennent du journal des mouvements (date ISO, avec l'année)
+            end = datetime.date.today(); start = (end - datetime.timedelta(days=29)).isoformat(); end = end.isoformat()
+            return (ledger.on_loan(conn), ledger.occupation(conn, start, end, self.db.dashboard_stats(conn)["unites"]),
+                    ledger.most_rented(conn, start, end, 5))
+        self.db.submit(query, on_done=self.fill_check, key="check")
+
+    @perf.timed(cat="load", rows=lambda a, res: len(a[1][0]))
+    def fill_check(self, res):
+        rows, occ, most = res; self.check_t.setRowCount(0)
         for r_idx, r_data in enumerate(rows):
-            self.check_t.insertRow(r_idx); [self.check_t.setItem(r_idx, c, QTableWidgetItem(str(d))) for c, d in enumerate(r_data)]
+            self.check_t.insertRow(r_idx)
+            for c, d in enumerate(r_data): self.check_t.setItem(r_idx, c, QTableWidgetItem((d or "").replace("T", " ")[:16] if c == 4 else str(d or "")))
+        top = ", ".join(f"{nom or '#' + str(i)} ({n})" for i, nom, n, _, _ in most)
+        self.check_report.setText(f"30 derniers jours : occupation {occ:.0%}" + (f" — les plus sortis : {top}" if top else ""))
 
     def create_maintenance_page(self):
         p = QWidget(); l = QVBoxLayout(p); l.setContentsMargins(30,30,30,30); l.addWidget(QLabel("MATÉRIEL EN RÉPARATION"))
@@ -278,98 +644,260 @@ class MainWindow(QMainWindow):
         self.maint_t.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         l.addWidget(self.maint_t); return p
 
+    @perf.timed(cat="load")
     def load_maintenance_data(self):
-        cur = self.db.conn.cursor()
-        cur.execute("SELECT r.id, r.date_reparation, e.nom, r.description, r.cout, e.id FROM reparations r JOIN equipement e ON r.id_equipement=e.id WHERE e.statut='En Maintenance'")
-        rows = cur.fetchall(); self.maint_t.setRowCount(0)
+        self.db.submit(self.db.maintenance_rows, on_done=self.fill_maintenance, key="maint")
+
+    @perf.timed(cat="load", rows=lambda a, res: len(a[1]))
+    def fill_maintenance(self, rows):
+        self.maint_t.setRowCount(0)
         for r_idx, r_data in enumerate(rows):
             self.maint_t.insertRow(r_idx)
             for c_idx in range(5): self.maint_t.setItem(r_idx, c_idx, QTableWidgetItem(str(r_data[c_idx])))
             btn = QPushButton("✅ Terminer"); btn.clicked.connect(lambda ch, i=r_data[5]: self.finish_repair(i))
             self.maint_t.setCellWidget(r_idx, 5, btn)
 
+    def create_scan_page(self):
+        p = QWidget(); l = QVBoxLayout(p); l.setContentsMargins(30,30,30,30); h = QHBoxLayout(); t = QLabel("SCAN CHECK IN / OUT")
+        self.scan_mode = QComboBox(); self.scan_mode.addItems(["Auto", "Sortie", "Retour"])
+        self.btn_cam = QPushButton("📷 Webcam"); self.btn_cam.clicked.connect(self.toggle_camera)
+        self.scan_borrower = QLineEdit(); self.scan_borrower.setPlaceholderText("Emprunteur (facultatif)")
+        h.addWidget(t); h.addStretch(); h.addWidget(self.scan_borrower); h.addWidget(QLabel("Mode :")); h.addWidget(self.scan_mode); h.addWidget(self.btn_cam); l.addLayout(h)
+        body = QHBoxLayout(); self.cam_view = QLabel("Douchette USB prête : scannez une étiquette"); self.cam_view.setFixedSize(320, 240)
+        self.cam_view.setAlignment(Qt.AlignmentFlag.AlignCenter); self.scan_log = QListWidget()
+        body.addWidget(self.cam_view); body.addWidget(self.scan_log); l.addLayout(body)
+        self.scan_status = QLabel(""); l.addWidget(self.scan_status)
+
+        # Index S/N -> id en mémoire, mouvements écrits par lots (une transaction toutes les 150 ms au plus)
+        self.scan_index = scanner.ScanIndex()
+        self.scan_session = scanner.ScanSession(self.db.conn, self.scan_index, self.send_moves if self.station else scanner.apply_moves)
+        self.scan_times = []; self.camera = None; self.scan_loading = False
+        self.scan_timer = QTimer(); self.scan_timer.setSingleShot(True); self.scan_timer.setInterval(150)
+        self.scan_timer.timeout.connect(self.flush_scans)
+        self.wedge = scanner.WedgeCapture(self); self.wedge.scanned.connect(self.on_scan); self.wedge.passthrough.add(self.scan_borrower)
+        QApplication.instance().installEventFilter(self.wedge)
+        return p
+
+    @perf.timed(cat="load")
+    def load_scan_index(self, ids):
+        if ids is not None and not self.scan_loading: self.scan_index.load(self.db.conn, ids); return
+        # Rechargement complet (tout le parc) en arrière-plan, puis échange avec l'index courant
+        def build(conn): index = scanner.ScanIndex(); index.load(conn); return index
+        self.scan_loading = True; self.db.submit(build, on_done=self.set_scan_index, key="scan")
+
+    def set_scan_index(self, index):
+        self.scan_loading = False
+        # Les scans en file pas encore écrits restent visibles dans le nouvel index
+        for i, direction in self.scan_session.pending.items():
+            if i in index.items: index.items[i][1] = "Sorti" if direction == "out" else "En stock"
+        self.scan_index = self.scan_session.index = index
+
+    def on_page_changed(self, i):
+        # Douchette captée et webcam allumée uniquement sur la page Scan
+        on_scan = self.content.widget(i) is self.page_scan
+        if self.wedge: self.wedge.active = on_scan
+        if not on_scan and self.camera: self.toggle_camera()
+
+    def on_scan(self, text):
+        t0 = time.perf_counter(); mode = {"Sortie": "out", "Retour": "in"}.get(self.scan_mode.currentText(), "auto")
+        item_id, res = self.scan_session.scan(text, mode)
+        if item_id is None: entry = QListWidgetItem(f"⚠ {res}"); entry.setForeground(QColor("#FF4444"))
+        else:
+            entry = QListWidgetItem(f"{'⬆ Sortie' if res == 'out' else '⬇ Retour'} : {self.scan_index.items[item_id][0]}")
+            entry.setForeground(QColor("#FF4444" if res == "out" else "#00FF00")); self.scan_times.append(t0)
+            if not self.scan_timer.isActive(): self.scan_timer.start()
+        self.scan_log.insertItem(0, entry)
+        if self.scan_log.count() > 200: self.scan_log.takeItem(200)
+
+    def flush_scans(self):
+        touched = self.scan_session.flush(self.scan_borrower.text().strip() or None); now = time.perf_counter()
+        if self.scan_times:
+            worst = (now - min(self.scan_times)) * 1000
+            self.scan_status.setText(f"{len(self.scan_times)} mouvement(s) enregistrés — latence max {worst:.0f} ms")
+        self.scan_times = []; self.changes.publish({"equipement"}, touched)
+
+    def toggle_camera(self):
+        if self.camera:
+            self.camera.stop(); self.camera = None; self.btn_cam.setText("📷 Webcam")
+            self.cam_view.clear(); self.cam_view.setText("Douchette USB prête : scannez une étiquette"); return
+        self.camera = scanner.CameraWorker(parent=self); self.camera.scanned.connect(self.on_scan)
+        self.camera.frame.connect(lambda img: self.cam_view.setPixmap(QPixmap.fromImage(img)))
+        self.camera.failed.connect(lambda msg: (self.show_toast(msg), self.toggle_camera() if self.camera else None))
+        self.camera.start(); self.btn_cam.setText("⏹ Arrêter")
+
+    def closeEvent(self, event):
+        if self.camera: self.camera.stop()
+        if self.wedge: self.flush_scans()
+        # QR rendus mais pas encore enregistrés : sans leur référence, le prochain ramasse-miettes les supprimerait
+        self.qr_queue.cancel(); self.save_qr_paths()
+        if self.station: self.sync_stop.set(); self.station_pool.waitForDone(5000)  # derniers scans envoyés
+        perf.recorder.dump(); super().closeEvent(event)
+
     def open_repair_dialog(self, i_id, nom):
         d = AddRepairDialog(nom, self)
-        if d.exec():
-            cur = self.db.conn.cursor()
-            cur.execute("INSERT INTO reparations (id_equipement, date_reparation, description, cout, prestataire) VALUES (?,?,?,?,?)",
-                        (i_id, d.date.text(), d.desc.text(), d.cout.text(), d.prestataire.text()))
-            cur.execute("UPDATE equipement SET statut='En Maintenance' WHERE id=?", (i_id,))
-            self.db.conn.commit(); self.refresh_all(); self.show_toast("Matériel envoyé en SAV")
+        if not d.exec(): return
+        if self.station:
+            self.remote(self.station.start_repair, i_id, d.desc.text(), d.cout.text(), d.prestataire.text(), d.date.text(),
+                        on_done=lambda _: self.show_toast("Matériel envoyé en SAV"))
+            return
+        cur = self.db.conn.cursor()
+        cur.execute("INSERT INTO reparations (id_equipement, date_reparation, description, cout, prestataire) VALUES (?,?,?,?,?)",
+                    (i_id, d.date.text(), d.desc.text(), d.cout.text(), d.prestataire.text()))
+        cur.execute("UPDATE equipement SET statut='En Maintenance' WHERE id=?", (i_id,))
+        self.db.conn.commit(); self.changes.publish({"equipement", "reparations"}, [i_id]); self.show_toast("Matériel envoyé en SAV")
 
     def finish_repair(self, i_id):
+        if self.station:
+            self.remote(self.station.finish_repair, i_id, on_done=lambda _: self.show_toast("Matériel de retour en stock")); return
         cur = self.db.conn.cursor(); cur.execute("UPDATE equipement SET statut='En stock' WHERE id=?", (i_id,))
-        self.db.conn.commit(); self.refresh_all(); self.show_toast("Matériel de retour en stock")
+        self.db.conn.commit(); self.changes.publish({"equipement"}, [i_id]); self.show_toast("Matériel de retour en stock")
 
     def open_add_dialog(self):
+        if self.server_only(): return
         d = AddDeviceDialog(self)
         if d.exec():
             cur = self.db.conn.cursor(); cat = d.cat.currentText(); qty = d.quantite.value(); lot = 1 if d.is_batch.isChecked() else 0
             nom = f"Câble {d.p_a.currentText()} > {d.p_b.currentText()} ({d.lg.text()})" if cat=="Câblage" else d.nom.text()
-            sn = d.sn.text().strip() or LogicManager.generate_unique_sn(cat[:4].upper())
-            cur.execute("INSERT INTO equipement (nom, marque, sn, quantite, is_lot, statut, categorie, prix) VALUES (?,?,?,?,?,?,?,?)",
-                        (nom, d.marque.text(), sn, qty, lot, "En stock", cat, float(d.prix.text() or 0)))
-            if not lot: LogicManager.generate_qr(cur.lastrowid, sn)
-            self.db.conn.commit(); self.refresh_all(); self.show_toast("Ajouté")
+            sn = d.sn.text().strip() or LogicManager.generate_unique_sn(self.db, LogicManager.sn_prefix(cat))
+            try:
+                cur.execute("INSERT INTO equipement (nom, marque, sn, quantite, is_lot, statut, categorie, prix) VALUES (?,?,?,?,?,?,?,?)",
+                            (nom, d.marque.text(), sn, qty, lot, "En stock", cat, float(d.prix.text() or 0)))
+            except sqlite3.IntegrityError:
+                self.db.conn.rollback(); QMessageBox.warning(self, "Matériel", f"Le S/N « {sn} » est déjà utilisé."); return
+            new_id = cur.lastrowid
+            self.qr_queue.submit([(new_id, sn)])
+            self.db.conn.commit(); self.changes.publish({"equipement"}, [new_id]); self.show_toast("Ajouté")
 
     def create_kits_page(self):
         p = QWidget(); l = QVBoxLayout(p); l.setContentsMargins(30,30,30,30); h = QHBoxLayout(); t = QLabel("GESTION DES KITS")
         btn = QPushButton("+ NOUVEAU KIT"); btn.clicked.connect(self.create_new_kit)
-        h.addWidget(t); h.addStretch(); h.addWidget(btn); l.addLayout(h)
-        self.kits_t = QTableWidget(); self.kits_t.setColumnCount(4); self.kits_t.setHorizontalHeaderLabels(["ID", "Nom du Kit", "Objets", "Action"])
+        btn_out = QPushButton("SORTIR LA SÉLECTION"); btn_out.clicked.connect(lambda: self.move_kits(self.selected_kits()))
+        btn_in = QPushButton("RETOUR DE LA SÉLECTION"); btn_in.clicked.connect(lambda: self.move_kits(self.selected_kits(), back=True))
+        h.addWidget(t); h.addStretch(); h.addWidget(btn_out); h.addWidget(btn_in); h.addWidget(btn); l.addLayout(h)
+        self.kits_t = QTableWidget(); self.kits_t.setColumnCount(5); self.kits_t.setHorizontalHeaderLabels(["ID", "Nom du Kit", "Objets", "Statut", "Action"])
+        self.kits_t.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.kits_t.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch); l.addWidget(self.kits_t); return p
 
+    @perf.timed(cat="load")
     def load_kits_data(self):
-        cur = self.db.conn.cursor(); cur.execute("SELECT k.id, k.nom_kit, COUNT(ki.id_equipement) FROM kits k LEFT JOIN kit_items ki ON k.id=ki.id_kit GROUP BY k.id")
-        rows = cur.fetchall(); self.kits_t.setRowCount(0)
+        self.db.submit(self.db.kit_rows, on_done=self.fill_kits, key="kits")
+
+    @perf.timed(cat="load", rows=lambda a, res: len(a[1]))
+    def fill_kits(self, rows):
+        self.kits_t.setRowCount(0)
         for r_idx, r_data in enumerate(rows):
             self.kits_t.insertRow(r_idx); [self.kits_t.setItem(r_idx, c, QTableWidgetItem(str(d))) for c, d in enumerate(r_data)]
-            btn = QPushButton("Basculer Statut"); btn.clicked.connect(lambda ch, k=r_data[0]: self.toggle_kit(k)); self.kits_t.setCellWidget(r_idx, 3, btn)
+            btn = QPushButton("Retour" if r_data[3] == "Sorti" else "Sortir"); btn.clicked.connect(lambda ch, k=r_data[0]: self.toggle_kit(k)); self.kits_t.setCellWidget(r_idx, 4, btn)
+
+    def selected_kits(self):
+        return [int(self.kits_t.item(r.row(), 0).text()) for r in self.kits_t.selectionModel().selectedRows()]
 
     def toggle_kit(self, k_id):
-        cur = self.db.conn.cursor(); cur.execute("SELECT statut FROM equipement WHERE id IN (SELECT id_equipement FROM kit_items WHERE id_kit=?) LIMIT 1", (k_id,))
-        res = cur.fetchone(); 
-        if res:
-            nv = "Sorti" if res[0]=="En stock" else "En stock"; now = datetime.datetime.now().strftime("%d/%m %H:%M") if nv=="Sorti" else None
-            cur.execute("UPDATE equipement SET statut=?, date_sortie=? WHERE id IN (SELECT id_equipement FROM kit_items WHERE id_kit=?)", (nv, now, k_id))
-            self.db.conn.commit(); self.refresh_all(); self.show_toast(f"Kit {nv}")
+        out = self.db.conn.execute("SELECT 1 FROM kit_checkouts WHERE id_kit=? LIMIT 1", (k_id,)).fetchone()
+        self.move_kits([k_id], back=bool(out))
+
+    def move_kits(self, kit_ids, back=False):
+        if not kit_ids: return
+        borrower = None
+        if not back:
+            borrower, ok = QInputDialog.getText(self, "Sortie", "Emprunteur (facultatif) :")
+            if not ok: return
+            borrower = borrower.strip() or None
+        if self.station:  # réponse du serveur dans kits_moved
+            if back: self.remote(self.station.return_kits, kit_ids, on_done=lambda touched: self.kits_moved(kit_ids, back, touched, []))
+            else: self.remote(self.station.checkout_kits, kit_ids, borrower, on_done=lambda res: self.kits_moved(kit_ids, back, *res))
+        elif back: self.kits_moved(kit_ids, back, kits.return_kits(self.db.conn, kit_ids), [])
+        else: self.kits_moved(kit_ids, back, *kits.checkout_kits(self.db.conn, kit_ids, borrower))
+
+    def kits_moved(self, kit_ids, back, touched, conflicts):
+        if conflicts:
+            more = f"\n… et {len(conflicts) - 15} autres" if len(conflicts) > 15 else ""
+            QMessageBox.warning(self, "Kits", "Sortie impossible, rien n'a été modifié :\n\n" + "\n".join(conflicts[:15]) + more); return
+        self.changes.publish({"equipement", "kit_checkouts"}, touched)
+        self.show_toast(f"{len(kit_ids)} kit(s) {'rentré(s)' if back else 'sorti(s)'}")
 
     def create_new_kit(self):
+        if self.server_only(): return
         n, ok = QInputDialog.getText(self, "Nouveau Kit", "Nom :")
         if ok and n:
             cur = self.db.conn.cursor(); cur.execute("INSERT INTO kits (nom_kit) VALUES (?)", (n,)); k_id = cur.lastrowid
             cur.execute("SELECT id, nom, marque FROM equipement"); items = cur.fetchall(); sel = SelectItemsDialog(items, self)
             if sel.exec():
-                [cur.execute("INSERT INTO kit_items (id_kit, id_equipement) VALUES (?,?)", (k_id, i)) for i in sel.get_selected_ids()]
-                self.db.conn.commit(); self.load_kits_data(); self.show_toast("Kit créé")
+                ids = sel.get_selected_ids(); qtes = {}
+                # Pour un lot, le kit peut n'en prendre qu'une partie (scindée à la sortie)
+                cur.execute("SELECT id, nom, quantite FROM equipement WHERE is_lot=1 AND quantite > 1 AND id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))
+                for i, nom, qte in cur.fetchall():
+                    val, ok = QInputDialog.getInt(self, "Nouveau Kit", f"Qté de '{nom}' dans le kit ?", qte, 1, qte)
+                    if ok and val < qte: qtes[i] = val
+                cur.executemany("INSERT INTO kit_items (id_kit, id_equipement, quantite) VALUES (?,?,?)", [(k_id, i, qtes.get(i)) for i in ids])
+                self.db.conn.commit(); self.changes.publish({"kits", "kit_items"}); self.show_toast("Kit créé")
+            else: self.db.conn.rollback()
 
     def export_qr_sheet(self):
-        sel = self.table.selectionModel().selectedRows(); rows = [r.row() for r in sel] if sel else range(self.table.rowCount())
+        tpl, ok = QInputDialog.getItem(self, "Planche QR", "Modèle :", list(labels.TEMPLATES), 0, False)
+        if not ok: return
         f, _ = QFileDialog.getSaveFileName(self, "Planche QR", "planche.pdf", "PDF (*.pdf)")
-        if f:
-            c = canvas.Canvas(f, pagesize=A4); h, count = A4[1], 0
-            for r_idx in rows:
-                i_id, nom, mrq = self.table.item(r_idx,0).text(), self.table.item(r_idx,2).text(), self.table.item(r_idx,3).text()
-                qr = f"data/qrcodes/QR_{i_id}.png"
-                if os.path.exists(qr):
-                    cx, cy = 1*cm + ((count%4)*5*cm), h - 4*cm - ((count//4)*5*cm)
-                    c.drawImage(qr, cx, cy, 3.5*cm, 3.5*cm); c.setFont("Helvetica-Bold", 8); c.drawCentredString(cx+1.75*cm, cy-0.3*cm, mrq)
-                    c.setFont("Helvetica", 7); c.drawCentredString(cx+1.75*cm, cy-0.7*cm, nom[:25]); count+=1
-                    if count>=20: c.showPage(); count=0
-            c.save(); self.show_toast("PDF exporté")
+        if not f: return
+        # Sélection, sinon tout ce que filtre la recherche : les lignes sont relues en flux depuis la base
+        sel = self.table.selectionModel().selectedRows()
+        if sel: where, params = "id IN (SELECT value FROM json_each(?))", (json.dumps([self.inv_model.row_data(r.row())[0] for r in sel]),)
+        else: where, params = self.inv_model.where()
+        self.run_export("Planche QR", "PDF exporté", labels.export_labels, self.db.path, f, labels.TEMPLATES[tpl], where=where, params=params)
+
+    def run_export(self, title, message, fn, *args, on_done=None, **kwargs):
+        job = BackgroundJob(self, fn, *args, **kwargs); dlg = QProgressDialog(title, "Annuler", 0, 0, self)
+        dlg.setWindowModality(Qt.WindowModality.NonModal); dlg.setMinimumDuration(500)
+        dlg.canceled.connect(lambda: setattr(job, "cancelled", True))
+        job.signals.progress.connect(lambda done, total: (dlg.setMaximum(total), dlg.setValue(done)))
+        def cleanup(): dlg.reset(); dlg.deleteLater(); job.signals.deleteLater()
+        job.signals.finished.connect(lambda res: (cleanup(), self.show_toast(message if res is not None else "Opération annulée")))
+        if on_done: job.signals.finished.connect(on_done)
+        job.signals.failed.connect(lambda err: (cleanup(), QMessageBox.warning(self, title, err)))
+        QThreadPool.globalInstance().start(job)
+
+    def regenerate_missing_qr(self):
+        # Seuls les objets dont la référence QR manque au magasin d'assets sont rendus ; la comparaison (tout le parc,
+        # toutes les clés du magasin) tourne sur le pool de lecture, la file de rendu démarre à son retour
+        def missing(conn):
+            keys = self.assets.keys()
+            return [(i, sn) for i, sn, ref in conn.execute("SELECT id, sn, qr_path FROM equipement WHERE sn IS NOT NULL AND sn != ''")
+                    if assets.key_of(ref) not in keys]
+        self.db.submit(missing, on_done=self.qr_queue.submit, key="qr_manquants")
+
+    def on_qr_progress(self, done, total):
+        if total > 1: self.show_toast(f"QR : {done}/{total}")
+
+    def save_qr_paths(self):
+        if not self.qr_paths: return
+        cur = self.db.conn.cursor(); cur.executemany("UPDATE equipement SET qr_path=? WHERE id=?", self.qr_paths)
+        self.db.conn.commit(); self.qr_paths = []
 
     def export_to_csv(self):
+        d = SelectColumnsDialog(csv_io.COLUMNS, self)
+        if not d.exec() or not d.get_selected_ids(): return
         f, _ = QFileDialog.getSaveFileName(self, "Export", "inventaire.csv", "CSV (*.csv)")
-        if f:
-            cur = self.db.conn.cursor(); cur.execute("SELECT id, categorie, nom, marque, sn, quantite, statut, date_sortie FROM equipement")
-            with open(f, 'w', newline='', encoding='utf-8-sig') as file:
-                writer = csv.writer(file, delimiter=';'); writer.writerow(["ID", "Cat", "Nom", "Marque", "S/N", "Qté", "Statut", "Sorti"])
-                writer.writerows(cur.fetchall())
-            self.show_toast("CSV Exporté")
+        if f: self.run_export("Export CSV", "CSV Exporté", csv_io.export_csv, self.db.path, f, headers=d.get_selected_ids())
+
+    def import_from_csv(self):
+        if self.server_only(): return
+        f, _ = QFileDialog.getOpenFileName(self, "Import", "", "CSV (*.csv)")
+        if f: self.run_export("Import CSV", "Import terminé", csv_io.import_csv, self.db.path, f, LogicManager.sn_prefix, on_done=self.on_import_done)
+
+    def on_import_done(self, res):
+        self.changes.publish({"equipement"})  # annulé ou non, des paquets ont pu être validés
+        if res is None: return
+        self.qr_queue.submit(res["new"])
+        msg = f"{res['inserted']} objets importés, {res['duplicates']} doublons (S/N) ignorés"
+        if res["errors"]: msg += f", {len(res['errors'])} lignes rejetées :\n" + "\n".join(f"ligne {l} : {e}" for l, e in res["errors"][:20])
+        QMessageBox.information(self, "Import CSV", msg)
 
     def load_stylesheet(self):
         if os.path.exists("styles.qss"):
             with open("styles.qss", "r") as f: self.setStyleSheet(f.read())
 
 if __name__ == "__main__":
-    LogicManager.setup_folders(); app = QApplication(sys.argv); win = MainWindow(); win.show(); sys.exit(app.exec())
\ No newline at end of file
+    LogicManager.setup_folders()
+    if "--perf" in sys.argv or os.environ.get("PROSTOCK_PERF"): perf.recorder.enable()
+    # Poste d'un serveur partagé (server.py) : python main.py --server http://hote:8765
+    server = sys.argv[sys.argv.index("--server") + 1] if "--server" in sys.argv[:-1] else os.environ.get("PROSTOCK_SERVER")
+    app = QApplication(sys.argv); win = MainWindow(server); win.show(); sys.exit(app.exec())
\ No newline at end of file
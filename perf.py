@@ -0,0 +1,179 @@
+"""Mesures de performance (optionnelles) : requêtes SQL, chargements des pages, exports et rendus QR.
+
+Activé au lancement (`python main.py --perf` ou PROSTOCK_PERF=1) : les connexions ouvertes ensuite par Database
+mesurent chaque requête (exécution + lecture des lignes), et les fonctions décorées par `timed` ou entourées
+de `span` sont chronométrées. Désactivé, les connexions sont des sqlite3.Connection ordinaires et un décorateur
+ne coûte qu'un test d'attribut par appel.
+
+Les mesures sont résumées dans l'overlay de la fenêtre, écrites dans un journal tournant (data/logs/perf.log)
+et exportables en trace Chrome (chrome://tracing, Perfetto).
+"""
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LOG_PATH = "data/logs/perf.log"
+
+
+def short_sql(sql, width=70):
+    sql = " ".join(sql.split()); return sql if len(sql) <= width else sql[:width - 1] + "…"
+
+
+class Recorder:
+    """Collecte des mesures, utilisable depuis n'importe quel thread.
+    Événements : (nom, catégorie, début, durée, thread, args) ; les requêtes SQL sont en plus agrégées par texte."""
+
+    def __init__(self, max_events=200_000):
+        self.enabled = False; self.lock = threading.Lock(); self.t0 = time.perf_counter()
+        self.events = deque(maxlen=max_events); self.recent = deque(maxlen=12)
+        self.sql = {}  # texte -> [exécutions, temps total, plus long appel, lignes lues]
+        self.sql_times = deque(maxlen=20_000)  # durées complètes (exécution + lecture) des dernières requêtes
+        self.threads = {}; self.log = None
+
+    def enable(self, log_path=LOG_PATH):
+        self.enabled = True; self.threads[threading.get_ident()] = "interface"
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        self.log = logging.getLogger("prostock.perf"); self.log.setLevel(logging.INFO); self.log.propagate = False
+        handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=5, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s")); self.log.addHandler(handler)
+        self.log.info("--- mesures activées (pid %d)", os.getpid())
+
+    def add(self, name, cat, start, dur, args=None):
+        self.events.append((name, cat, start, dur, threading.get_ident(), args))
+        self.recent.append((name, dur, args))
+        if self.log: self.log.info("%-28s %-6s %9.2f ms %s", name, cat, dur * 1000, json.dumps(args, ensure_ascii=False) if args else "")
+
+    def add_sql(self, sql, start, dur, execs=1, rows=0):
+        with self.lock:
+            s = self.sql.get(sql)
+            if s is None: s = self.sql[sql] = [0, 0.0, 0.0, 0]
+            s[0] += execs; s[1] += dur; s[2] = max(s[2], dur); s[3] += rows
+        self.events.append((sql, "sql" if execs else "sql.lecture", start, dur, threading.get_ident(), {"lignes": rows} if rows else None))
+
+    @contextmanager
+    def span(self, name, cat="ui", **args):
+        """Chronomètre le bloc ; l'appelant peut compléter le dict renvoyé (ex. lignes=...)."""
+        if not self.enabled: yield args; return
+        t = time.perf_counter()
+        try: yield args
+        finally: self.add(name, cat, t, time.perf_counter() - t, args)
+
+    def timed(self, name=None, cat="ui", rows=None):
+        """Décorateur : chronomètre chaque appel ; `rows(args, résultat)` donne le nombre de lignes traitées."""
+        def deco(fn):
+            label = name or fn.__name__
+            @functools.wraps(fn)
+            def wrapper(*a, **kw):
+                if not self.enabled: return fn(*a, **kw)
+                t = time.perf_counter(); res = fn(*a, **kw); dur = time.perf_counter() - t
+                self.add(label, cat, t, dur, {"lignes": rows(a, res)} if rows else None); return res
+            return wrapper
+        return deco
+
+    def name_thread(self, name):
+        self.threads.setdefault(threading.get_ident(), name)
+
+    # --- Résumés
+    def sql_summary(self, top=5):
+        """(nb de requêtes, p50 ms, p95 ms, [(temps total ms, exécutions, plus long ms, lignes, sql)] les plus coûteuses)."""
+        times = sorted(self.sql_times)
+        q = lambda p: times[min(len(times) - 1, int(p * len(times)))] * 1000 if times else 0.0
+        with self.lock:
+            n = sum(s[0] for s in self.sql.values())
+            worst = sorted(((s[1] * 1000, s[0], s[2] * 1000, s[3], sql) for sql, s in self.sql.items()), reverse=True)[:top]
+        return n, q(0.5), q(0.95), worst
+
+    def summary(self, top=5):
+        n, p50, p95, worst = self.sql_summary(top)
+        lines = [f"SQL : {n} requêtes, p50 {p50:.2f} ms, p95 {p95:.2f} ms"]
+        lines += [f"  {total:8.1f} ms  x{k:<5} max {mx:6.1f} ms  {short_sql(sql)}" for total, k, mx, _, sql in worst]
+        lines.append("Derniers appels :")
+        lines += [f"  {name:<24} {dur * 1000:8.1f} ms" + (f"  {args}" if args else "") for name, dur, args in reversed(self.recent)]
+        return "\n".join(lines)
+
+    def dump(self):
+        """Écrit le résumé SQL dans le journal."""
+        if self.log: self.log.info("résumé\n%s", self.summary(top=15))
+
+    def write_trace(self, path):
+        """Trace au format Chrome (événements complets "X", en µs depuis l'activation) ; renvoie le nombre d'événements."""
+        pid = os.getpid(); events = list(self.events)
+        out = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}} for tid, name in self.threads.items()]
+        for name, cat, start, dur, tid, args in events:
+            ev = {"name": short_sql(name) if cat.startswith("sql") else name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+                  "ts": round((start - self.t0) * 1e6, 1), "dur": round(dur * 1e6, 1)}
+            if cat.startswith("sql"): ev["args"] = dict(args or {}, sql=" ".join(name.split()))
+            elif args: ev["args"] = args
+            out.append(ev)
+        with open(path, "w", encoding="utf-8") as f: json.dump({"traceEvents": out, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(events)
+
+
+recorder = Recorder()
+span, timed = recorder.span, recorder.timed
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Curseur mesuré : chaque exécution, puis le temps passé à lire ses lignes (fetch* ou itération)."""
+    _sql = None; _exec = 0.0; _spent = 0.0; _rows = 0; _t = 0.0
+
+    def _run(self, method, sql, *args):
+        self._flush(); t = time.perf_counter()
+        try: return method(sql, *args)
+        finally: self._t = time.perf_counter(); self._exec = self._t - t; recorder.add_sql(sql, t, self._exec); self._sql = sql
+
+    def execute(self, sql, params=()): return self._run(super().execute, sql, params)
+    def executemany(self, sql, seq): return self._run(super().executemany, sql, seq)
+    def executescript(self, script): return self._run(super().executescript, script)
+
+    def _flush(self):
+        """Clôt la requête en cours : temps de lecture de ses lignes, et sa durée complète pour les percentiles."""
+        if self._sql is None: return
+        if self._spent: recorder.add_sql(self._sql, self._t, self._spent, execs=0, rows=self._rows)
+        recorder.sql_times.append(self._exec + self._spent); self._sql = None; self._spent = 0.0; self._rows = 0
+
+    def _read(self, fetch, *args):
+        t = time.perf_counter(); rows = fetch(*args); self._spent += time.perf_counter() - t
+        return rows
+
+    def fetchall(self):
+        rows = self._read(super().fetchall); self._rows += len(rows); self._flush(); return rows
+
+    def fetchmany(self, size=None):
+        rows = self._read(super().fetchmany, size or self.arraysize); self._rows += len(rows)
+        if not rows: self._flush()
+        return rows
+
+    def fetchone(self):
+        row = self._read(super().fetchone)
+        if row is None: self._flush()
+        else: self._rows += 1
+        return row
+
+    def __next__(self):
+        t = time.perf_counter()
+        try: row = super().__next__()
+        except StopIteration: self._spent += time.perf_counter() - t; self._flush(); raise
+        self._spent += time.perf_counter() - t; self._rows += 1; return row
+
+    def close(self):
+        self._flush(); super().close()
+
+    def __del__(self):
+        try: self._flush()
+        except Exception: pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connexion dont tous les curseurs, y compris ceux de execute(), sont des TimedCursor (voir Database.connect)."""
+    def cursor(self, factory=TimedCursor): return super().cursor(factory)
+    def execute(self, sql, params=()): return self.cursor().execute(sql, params)
+    def executemany(self, sql, seq): return self.cursor().executemany(sql, seq)
+    def executescript(self, script): return self.cursor().executescript(script)
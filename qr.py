@@ -0,0 +1,74 @@
+import io
+from PyQt6.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool, pyqtSignal
+
+import perf
+from qrmatrix import payload
+
+def render(item_id, sn, store):
+    """Renvoie la référence du QR de l'objet dans `store` (assets.AssetStore), en ne l'encodant que s'il n'y est pas déjà :
+    le PNG est rangé sous le nom "qr:<charge utile>", retrouvé avant tout encodage. Utilisable depuis n'importe quel thread."""
+    data = payload(item_id, sn); name = "qr:" + data
+    found = store.find(name)
+    if found: return found
+    import qrcode  # importé au premier rendu : la plupart des sessions n'en font aucun
+    buf = io.BytesIO(); qrcode.make(data).save(buf, format="PNG")
+    return store.put(buf.getvalue(), "image/png", name=name)
+
+class _JobSignals(QObject):
+    rendered = pyqtSignal(int, str)
+    failed = pyqtSignal(int)
+
+class _QrJob(QRunnable):
+    def __init__(self, items, signals, queue):
+        super().__init__(); self.items = items; self.signals = signals; self.queue = queue
+
+    def run(self):
+        perf.recorder.name_thread("qr")
+        with perf.span("qr", "qr", lignes=len(self.items)):
+            for item_id, sn in self.items:
+                if self.queue.cancelled: return
+                try: self.signals.rendered.emit(item_id, render(item_id, sn, self.queue.store))
+                except Exception: self.signals.failed.emit(item_id)
+
+class QrQueue(QObject):
+    """File de rendus QR exécutée sur un pool de threads : l'interface n'attend jamais qrcode.
+
+    `rendered(id, référence)` pour chaque QR prêt, `progress(faits, total)` par paquet, `finished()` quand la file est vide.
+    Les signaux arrivent dans le thread de l'interface."""
+    rendered = pyqtSignal(int, str)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+    CHUNK = 100
+
+    def __init__(self, store, parent=None, workers=2):
+        super().__init__(parent); self.store = store; self.pool = QThreadPool(self); self.pool.setMaxThreadCount(workers)
+        self.total = self.done = 0; self.cancelled = False; self.jobs = []
+
+    def submit(self, items):
+        items = [(i, sn) for i, sn in items if sn]
+        if not items: return
+        self.cancelled = False; self.total += len(items)
+        for k in range(0, len(items), self.CHUNK):
+            signals = _JobSignals(); signals.rendered.connect(self.on_rendered); signals.failed.connect(self.on_failed)
+            # Garder une référence : le QObject de signaux doit vivre jusqu'à la fin du job
+            self.jobs.append(signals); self.pool.start(_QrJob(items[k:k + self.CHUNK], signals, self))
+
+    def cancel(self):
+        """Abandonne les rendus pas encore commencés et attend les jobs en cours ; les QR déjà rendus sont
+        livrés (`rendered`) avant le retour, leurs références peuvent donc être enregistrées juste après."""
+        self.cancelled = True; self.pool.clear(); self.pool.waitForDone()
+        QCoreApplication.sendPostedEvents()  # signaux encore en file depuis les threads du pool
+        self.total = self.done = 0; self.jobs.clear()
+
+    def on_rendered(self, item_id, path):
+        self.rendered.emit(item_id, path); self.step()
+
+    def on_failed(self, item_id):
+        self.step()
+
+    def step(self):
+        if not self.total: return  # résultat arrivé après cancel()
+        self.done += 1
+        if self.done % self.CHUNK == 0 or self.done == self.total: self.progress.emit(self.done, self.total)
+        if self.done == self.total:
+            self.total = self.done = 0; self.jobs.clear(); self.finished.emit()
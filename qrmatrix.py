@@ -0,0 +1,33 @@
+"""Contenu et matrice des QR codes, sans Qt : partagé par qr.py (PNG) et labels.py (tracé vectoriel).
+
+C'est le seul module (avec qrcode) que chargent les processus d'encodage des étiquettes : ils n'importent
+ni PyQt6 ni l'interface (voir labels.light_main).
+"""
+
+def payload(item_id, sn):
+    return f"PROSTOCK-ID:{item_id}-SN:{sn}"
+
+def qr_runs(data):
+    """Matrice du QR en segments horizontaux (x, y, longueur) de modules noirs."""
+    # Masque fixe : évite d'évaluer les 8 masques possibles (~5x plus rapide), le code reste valide pour tout lecteur
+    import qrcode
+    code = qrcode.QRCode(border=0, mask_pattern=0); code.add_data(data); code.make(fit=True)
+    matrix = code.get_matrix(); runs = []
+    for y, row in enumerate(matrix):
+        x, n = 0, len(row)
+        while x < n:
+            if row[x]:
+                start = x
+                while x < n and row[x]: x += 1
+                runs.append((start, y, x - start))
+            else: x += 1
+    return len(matrix), runs
+
+def qr_ops(data):
+    """(côté en modules, opérateurs PDF des rectangles) : coordonnées entières, en modules, axe y vers le bas."""
+    n, runs = qr_runs(data)
+    return n, " ".join(f"{x} {y} {length} 1 re" for x, y, length in runs) + " f"
+
+def encode_page(rows):
+    """Exécuté dans les processus de travail : (nom, marque, QR encodé) pour chaque ligne de la page."""
+    return [(nom or "---", marque or "---", qr_ops(payload(i_id, sn))) for i_id, nom, marque, sn in rows]
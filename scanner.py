@@ -0,0 +1,175 @@
+"""Mode scan : douchette USB (émulation clavier) et webcam.
+
+Les QR `PROSTOCK-ID:<id>-SN:<sn>` sont résolus par un index en mémoire, sans requête ;
+les mouvements sont mis en file et écrits par lots, une transaction par lot.
+"""
+import datetime
+import json
+import re
+import sqlite3
+import time
+
+from PyQt6.QtCore import QObject, QThread, QEvent, QTimer, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QKeyEvent
+from PyQt6.QtWidgets import QApplication, QWidget
+
+import ledger
+
+PAYLOAD = re.compile(r"PROSTOCK-ID:(\d+)-SN:(.*)")
+
+def parse_scan(text):
+    """(id, sn) pour un QR ProStock, (None, texte) pour un S/N scanné tel quel (étiquette constructeur...)."""
+    text = text.strip(); m = PAYLOAD.fullmatch(text)
+    return (int(m.group(1)), m.group(2)) if m else (None, text)
+
+def decode_frame(frame, max_width=640, roi=0.8):
+    """Textes des QR d'une image BGR. Seul le centre de l'image (roi) est analysé, réduit à max_width,
+    et zbar ne cherche que des QR : c'est ce qui tient le décodage sous quelques ms par image."""
+    import cv2  # imports lourds (OpenCV, zbar) faits au premier décodage, pas au démarrage
+    from pyzbar.pyzbar import decode, ZBarSymbol
+    h, w = frame.shape[:2]
+    if roi < 1:
+        dy, dx = int(h * (1 - roi) / 2), int(w * (1 - roi) / 2); frame = frame[dy:h - dy, dx:w - dx]
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    if gray.shape[1] > max_width:
+        s = max_width / gray.shape[1]; gray = cv2.resize(gray, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+    return [r.data.decode("utf-8", "replace") for r in decode(gray, symbols=[ZBarSymbol.QRCODE])]
+
+def apply_moves(conn, moves, borrower=None):
+    """Écrit les mouvements [(id, "out"|"in")] en une transaction, journal compris ; renvoie les ids touchés.
+    Les conditions sur le statut rendent l'opération idempotente (un objet déjà sorti n'est pas ressorti)."""
+    now = datetime.datetime.now().strftime("%d/%m %H:%M")
+    out = [i for i, d in moves if d == "out"]; back = [i for i, d in moves if d == "in"]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        sql = "SELECT id, COALESCE(parent_id, id), quantite FROM equipement WHERE id IN (SELECT value FROM json_each(?)) AND statut=?"
+        ledger.record(conn, [(i, p, q, "out", None) for i, p, q in conn.execute(sql, (json.dumps(out), "En stock"))]
+                      + [(i, p, q, "in", None) for i, p, q in conn.execute(sql, (json.dumps(back), "Sorti"))], borrower)
+        conn.executemany("UPDATE equipement SET statut='Sorti', date_sortie=? WHERE id=? AND statut='En stock'", [(now, i) for i in out])
+        # Partie de lot sortie : la ligne fille retourne dans son lot parent (comme toggle_status)
+        children = conn.execute("SELECT id, parent_id, quantite FROM equipement WHERE id IN (SELECT value FROM json_each(?)) "
+                                "AND parent_id IS NOT NULL AND statut='Sorti'", (json.dumps(back),)).fetchall()
+        conn.executemany("UPDATE equipement SET quantite=quantite+? WHERE id=?", [(q, p) for _, p, q in children])
+        conn.executemany("DELETE FROM equipement WHERE id=?", [(i,) for i, _, _ in children])
+        conn.executemany("UPDATE equipement SET statut='En stock', date_sortie=NULL WHERE id=? AND statut='Sorti'", [(i,) for i in back])
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback(); raise
+    return out + back + [p for _, p, _ in children]
+
+class ScanIndex:
+    """Index mémoire id -> (sn, statut) et sn -> id."""
+    def __init__(self):
+        self.items, self.by_sn = {}, {}
+
+    def load(self, conn, ids=None):
+        """Charge tout (ids=None) ou recharge seulement les ids donnés (supprimés compris)."""
+        if ids is None:
+            self.items.clear(); self.by_sn.clear()
+            rows = conn.execute("SELECT id, sn, statut FROM equipement")
+        else:
+            ids = list(ids)
+            for i in ids: self.drop(i)
+            rows = conn.execute("SELECT id, sn, statut FROM equipement WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))
+        for i, sn, statut in rows:
+            self.items[i] = [sn, statut]
+            if sn: self.by_sn[sn] = i
+
+    def drop(self, i):
+        old = self.items.pop(i, None)
+        if old and self.by_sn.get(old[0]) == i: del self.by_sn[old[0]]
+
+    def resolve(self, item_id, sn):
+        if item_id is not None: return item_id if item_id in self.items else None
+        return self.by_sn.get(sn)
+
+class ScanSession:
+    """Traite les scans (sans Qt, rejouable hors interface) : résolution, sens du mouvement, file d'écriture.
+    `write(conn, moves, borrower)` écrit un lot : apply_moves, ou l'envoi au serveur pour un poste (station.py)."""
+    def __init__(self, conn, index, write=apply_moves):
+        self.conn, self.index, self.write = conn, index, write; self.pending = {}
+
+    def scan(self, text, mode="auto"):
+        """Renvoie (id, "out"|"in") si le mouvement est mis en file, sinon (None, message)."""
+        item_id = self.index.resolve(*parse_scan(text))
+        if item_id is None: return None, f"Inconnu : {text.strip()}"
+        item = self.index.items[item_id]; sn, statut = item
+        if statut == "En Maintenance": return None, f"{sn} : en maintenance"
+        direction = mode if mode != "auto" else ("in" if statut == "Sorti" else "out")
+        if (direction == "out") == (statut == "Sorti"): return None, f"{sn} : déjà {'sorti' if statut == 'Sorti' else 'en stock'}"
+        # Statut mis à jour tout de suite dans l'index : un second scan avant l'écriture voit le nouvel état
+        item[1] = "Sorti" if direction == "out" else "En stock"; self.pending[item_id] = direction
+        return item_id, direction
+
+    def flush(self, borrower=None):
+        if not self.pending: return []
+        moves, self.pending = list(self.pending.items()), {}
+        return self.write(self.conn, moves, borrower)
+
+class WedgeCapture(QObject):
+    """Filtre clavier de l'application : une douchette USB « tape » le code en quelques ms puis Entrée.
+
+    Actif seulement sur la page Scan, pour les widgets de la fenêtre `parent` (pas les dialogues ni les popups),
+    sauf ceux de `passthrough` (champs de saisie de la page). Chaque touche est retenue au plus MAX_GAP : une rafale
+    terminée par Entrée est un scan, sinon les touches retenues sont rejouées vers leur widget (saisie normale,
+    à peine retardée). Les raccourcis et touches avec Ctrl / Alt ne sont jamais retenus."""
+    scanned = pyqtSignal(str)
+    MAX_GAP = 0.05  # s entre deux caractères au-delà duquel la saisie n'est plus une rafale de douchette
+
+    def __init__(self, parent=None):
+        super().__init__(parent); self.active = False; self.held = []; self.last = 0.0; self.passthrough = set(); self.replaying = False
+        self.timer = QTimer(self); self.timer.setSingleShot(True); self.timer.setInterval(round(self.MAX_GAP * 1000))
+        self.timer.timeout.connect(self.replay)
+
+    def eventFilter(self, obj, event):
+        if (not self.active or self.replaying or event.type() != QEvent.Type.KeyPress or obj in self.passthrough
+                or not isinstance(obj, QWidget) or obj.window() is not self.parent()): return False
+        now = time.perf_counter(); burst = self.held and now - self.last <= self.MAX_GAP
+        if event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter) and burst and len(self.held) >= 3:
+            text = "".join(e.text() for _, e in self.held); self.held = []; self.timer.stop()
+            self.scanned.emit(text); return True
+        if not burst: self.replay()
+        if (event.modifiers() & ~Qt.KeyboardModifier.ShiftModifier) or not event.text().isprintable() or not event.text():
+            self.replay(); return False
+        # Copie : l'événement d'origine est détruit après sa livraison
+        self.held.append((obj, QKeyEvent(event.type(), event.key(), event.modifiers(), event.text())))
+        self.last = now; self.timer.start(); return True
+
+    def replay(self):
+        """Livre les touches retenues à leur widget, dans l'ordre (saisie humaine, pas une rafale)."""
+        held, self.held = self.held, []; self.timer.stop(); self.replaying = True
+        try:
+            for obj, event in held: QApplication.sendEvent(obj, event)
+        finally: self.replaying = False
+
+class CameraWorker(QThread):
+    """Lecture et décodage de la webcam dans un thread ; un même QR n'est signalé qu'une fois par `cooldown` s."""
+    scanned = pyqtSignal(str)
+    frame = pyqtSignal(QImage)
+    failed = pyqtSignal(str)
+
+    def __init__(self, device=0, cooldown=1.5, parent=None):
+        super().__init__(parent); self.device, self.cooldown = device, cooldown; self.running = False
+
+    def run(self):
+        try: import cv2
+        except ImportError: self.failed.emit("OpenCV (cv2) n'est pas installé"); return
+        cap = cv2.VideoCapture(self.device)
+        if not cap.isOpened(): self.failed.emit("Caméra introuvable"); return
+        self.running = True; seen = {}; k = 0
+        try:
+            while self.running:
+                ok, img = cap.read()
+                if not ok: self.failed.emit("Flux caméra interrompu"); break
+                now = time.monotonic()
+                for text in decode_frame(img):
+                    if now - seen.get(text, -self.cooldown) >= self.cooldown: seen[text] = now; self.scanned.emit(text)
+                k += 1
+                if k % 3 == 0:  # aperçu à ~10 i/s, en basse résolution
+                    rgb = cv2.cvtColor(cv2.resize(img, (320, 240)), cv2.COLOR_BGR2RGB)
+                    self.frame.emit(QImage(rgb.data, 320, 240, 3 * 320, QImage.Format.Format_RGB888).copy())
+        finally:
+            cap.release()
+
+    def stop(self):
+        self.running = False; self.wait()
@@ -0,0 +1,180 @@
+"""Mode serveur (optionnel) : une base partagée par plusieurs postes de sortie, servie en HTTP + JSON.
+
+Les postes gardent un cache local (station.py) et ne redemandent jamais les tables complètes :
+ils reçoivent les deltas (lignes `equipement`, réparations et kits modifiés) depuis leur dernier numéro
+de séquence, par attente longue sur /changes. Toutes les écritures passent par ce serveur, par lots.
+
+    GET  /snapshot                      tables complètes + (epoch, seq) de départ
+    GET  /changes?since=N&wait=S        deltas après N ; attend jusqu'à S s s'il n'y a rien de neuf
+    POST /moves   {"moves": [[id, "out"|"in"], ...], "borrower": ...}
+    POST /kits    {"checkout" | "return": [ids de kits], "borrower": ...}
+    POST /repairs {"start": id, "description", "cout", "prestataire", "date"} ou {"finish": id}
+
+Usage : python server.py [--db database/inventaire.db] [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import datetime
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import kits
+import scanner
+from database import Database
+
+SYNC_COLUMNS = ["id", "nom", "marque", "modele", "sn", "quantite", "is_lot", "parent_id", "statut", "date_sortie", "categorie", "prix", "emplacement"]
+REPAIR_COLUMNS = ["id", "id_equipement", "date_reparation", "description", "cout", "prestataire"]
+
+
+class InventoryService:
+    """État partagé du serveur : une connexion d'écriture (sous verrou), quelques connexions de lecture,
+    et le journal des changements en mémoire [(seq, table, id)] que les postes consomment."""
+    LOG_SIZE = 200_000
+
+    def __init__(self, db_path, readers=4):
+        self.db = Database(db_path); self.write_lock = threading.Lock()
+        self.readers = queue.Queue()
+        for _ in range(readers): self.readers.put(self.db.connect())
+        # Un redémarrage du serveur change l'epoch : les postes repartent d'un instantané complet
+        self.epoch = int(time.time() * 1000); self.seq = 0; self.log = deque(maxlen=self.LOG_SIZE)
+        self.changed = threading.Condition()
+
+    @contextmanager
+    def read(self):
+        conn = self.readers.get()
+        try: yield conn
+        finally: self.readers.put(conn)
+
+    def publish(self, changes):
+        """Ajoute au journal [(table, id)] et réveille les postes en attente sur /changes."""
+        with self.changed:
+            for table, i in changes:
+                self.seq += 1; self.log.append((self.seq, table, i))
+            self.changed.notify_all()
+
+    # --- Lectures
+    def snapshot(self):
+        with self.changed: epoch, seq = self.epoch, self.seq
+        with self.read() as conn:
+            return {"epoch": epoch, "seq": seq,
+                    "equipement": conn.execute(f"SELECT {', '.join(SYNC_COLUMNS)} FROM equipement ORDER BY id").fetchall(),
+                    "reparations": conn.execute(f"SELECT {', '.join(REPAIR_COLUMNS)} FROM reparations").fetchall(),
+                    "kits": self.kit_rows(conn)}
+
+    def kit_rows(self, conn, ids=None):
+        """[(id, nom, [[id_equipement, quantite]], [ids emportés])] pour les kits donnés (tous si ids=None)."""
+        cond = "" if ids is None else "WHERE k.id IN (SELECT value FROM json_each(?))"
+        rows = conn.execute(f'''
+            SELECT k.id, k.nom_kit, (SELECT json_group_array(json_array(id_equipement, quantite)) FROM kit_items WHERE id_kit = k.id),
+                   (SELECT json_group_array(id_equipement) FROM kit_checkouts WHERE id_kit = k.id) FROM kits k {cond}
+        ''', () if ids is None else (json.dumps(ids),)).fetchall()
+        return [(i, nom, json.loads(items), json.loads(out)) for i, nom, items, out in rows]
+
+    def changes(self, epoch, since, wait=0.0):
+        """Deltas après `since`, ou {"reset": True} si le poste doit repartir d'un instantané."""
+        deadline = time.monotonic() + min(wait, 60)
+        with self.changed:
+            while self.seq <= since and epoch == self.epoch and (left := deadline - time.monotonic()) > 0: self.changed.wait(left)
+            if epoch != self.epoch or since > self.seq or (self.log and self.log[0][0] > since + 1):
+                return {"reset": True}
+            seq = self.seq; touched = {}
+            # Le journal est trié par seq : parcours depuis la fin jusqu'à `since`
+            for s, table, i in reversed(self.log):
+                if s <= since: break
+                touched.setdefault(table, set()).add(i)
+        delta = {"epoch": self.epoch, "seq": seq, "equipement": [], "deleted": [], "reparations": {}, "kits": [], "deleted_kits": []}
+        with self.read() as conn:
+            ids = sorted(touched.get("equipement", ()))
+            if ids:
+                delta["equipement"] = conn.execute(f"SELECT {', '.join(SYNC_COLUMNS)} FROM equipement WHERE id IN (SELECT value FROM json_each(?))",
+                                                   (json.dumps(ids),)).fetchall()
+                delta["deleted"] = sorted(set(ids) - {r[0] for r in delta["equipement"]})
+            for i in sorted(touched.get("reparations", ())):
+                delta["reparations"][i] = conn.execute(f"SELECT {', '.join(REPAIR_COLUMNS)} FROM reparations WHERE id_equipement=?", (i,)).fetchall()
+            ids = sorted(touched.get("kits", ()))
+            if ids:
+                delta["kits"] = self.kit_rows(conn, ids); delta["deleted_kits"] = sorted(set(ids) - {k[0] for k in delta["kits"]})
+        return delta
+
+    # --- Écritures (une transaction par lot, un seul écrivain)
+    def moves(self, moves, borrower=None):
+        with self.write_lock: touched = scanner.apply_moves(self.db.conn, [(int(i), d) for i, d in moves if d in ("out", "in")], borrower)
+        self.publish(("equipement", i) for i in touched); return {"touched": touched}
+
+    def kit_moves(self, kit_ids, back=False, borrower=None):
+        kit_ids = [int(k) for k in kit_ids]
+        with self.write_lock:
+            if back: touched, conflicts = kits.return_kits(self.db.conn, kit_ids), []
+            else: touched, conflicts = kits.checkout_kits(self.db.conn, kit_ids, borrower)
+        if not conflicts: self.publish([("equipement", i) for i in touched] + [("kits", k) for k in kit_ids])
+        return {"touched": touched, "conflicts": conflicts}
+
+    def repair(self, item_id, finish=False, description="", cout=0, prestataire="", date=None):
+        with self.write_lock:
+            conn = self.db.conn
+            if finish: conn.execute("UPDATE equipement SET statut='En stock' WHERE id=?", (item_id,))
+            else:
+                conn.execute("INSERT INTO reparations (id_equipement, date_reparation, description, cout, prestataire) VALUES (?,?,?,?,?)",
+                             (item_id, date or datetime.date.today().strftime("%Y-%m-%d"), description, cout, prestataire))
+                conn.execute("UPDATE equipement SET statut='En Maintenance' WHERE id=?", (item_id,))
+            conn.commit()
+        self.publish([("equipement", item_id), ("reparations", item_id)]); return {"touched": [item_id]}
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None  # InventoryService, fixé par serve()
+    protocol_version = "HTTP/1.1"  # connexions persistantes : un poste ne rouvre pas une connexion TCP par requête
+
+    def reply(self, code, body):
+        data = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        self.send_response(code); self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(data)))
+        self.end_headers(); self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path); q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/snapshot": self.reply(200, self.service.snapshot())
+            elif url.path == "/changes":
+                self.reply(200, self.service.changes(int(q.get("epoch", 0)), int(q.get("since", 0)), float(q.get("wait", 0))))
+            else: self.reply(404, {"error": "route inconnue"})
+        except (ValueError, KeyError) as e: self.reply(400, {"error": str(e)})
+        except sqlite3.Error as e: self.reply(500, {"error": str(e)})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            borrower = body.get("borrower")
+            if self.path == "/moves": self.reply(200, self.service.moves(body["moves"], borrower))
+            elif self.path == "/kits":
+                back = "return" in body; self.reply(200, self.service.kit_moves(body["return" if back else "checkout"], back, borrower))
+            elif self.path == "/repairs":
+                if "finish" in body: self.reply(200, self.service.repair(int(body["finish"]), finish=True))
+                else: self.reply(200, self.service.repair(int(body["start"]), description=body.get("description", ""),
+                                                          cout=body.get("cout", 0), prestataire=body.get("prestataire", ""), date=body.get("date")))
+            else: self.reply(404, {"error": "route inconnue"})
+        except (ValueError, KeyError, TypeError) as e: self.reply(400, {"error": str(e)})
+        except sqlite3.Error as e: self.reply(500, {"error": str(e)})
+
+    def log_message(self, fmt, *args): pass
+
+
+def serve(db_path, host="127.0.0.1", port=8765):
+    """Crée le serveur (sans le démarrer) ; `serve_forever()` pour le lancer."""
+    handler = type("BoundHandler", (Handler,), {"service": InventoryService(db_path)})
+    server = ThreadingHTTPServer((host, port), handler); server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serveur d'inventaire partagé ProStock")
+    ap.add_argument("--db", default="database/inventaire.db"); ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765); args = ap.parse_args()
+    srv = serve(args.db, args.host, args.port); print(f"ProStock : serveur sur http://{args.host}:{srv.server_address[1]} ({args.db})")
+    try: srv.serve_forever()
+    except KeyboardInterrupt: pass
@@ -0,0 +1,133 @@
+"""Poste client du mode serveur (server.py) : cache local, deltas et écritures par lots.
+
+Le cache est une base ProStock ordinaire (même schéma, index FTS et agrégats compris) : l'interface
+et les recherches la lisent sans réseau. Elle n'est modifiée que par les deltas du serveur ;
+les écritures du poste (scans, kits, réparations) partent au serveur et reviennent par /changes.
+"""
+import http.client
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from database import Database
+from server import SYNC_COLUMNS, REPAIR_COLUMNS
+
+UPSERT = (f"INSERT INTO equipement ({', '.join(SYNC_COLUMNS)}) VALUES ({', '.join('?' * len(SYNC_COLUMNS))}) "
+          f"ON CONFLICT (id) DO UPDATE SET {', '.join(f'{c}=excluded.{c}' for c in SYNC_COLUMNS[1:])}")
+TABLES = ("equipement", "reparations", "kits", "kit_items", "kit_checkouts")  # tables tenues à jour par le serveur
+NETWORK_ERRORS = (OSError, http.client.HTTPException, RuntimeError)  # serveur injoignable ou requête refusée
+CONNECT_TIMEOUT = 3  # s pour ouvrir la connexion : un serveur éteint est signalé tout de suite
+TIMEOUT = 15  # s d'attente d'une réponse (l'attente longue sur /changes ajoute sa durée)
+
+
+class Station:
+    def __init__(self, url, cache_path):
+        u = urlparse(url); self.host, self.port = u.hostname, u.port or 80
+        self.cache = Database(cache_path); self.epoch = self.seq = 0
+        # Connexion d'écriture propre à la synchronisation : celle du cache (self.cache.conn) reste au thread de l'interface
+        self.sync_conn = self.cache.connect()
+        self.pending = {}; self.lock = threading.Lock(); self.cache_lock = threading.Lock(); self.local = threading.local()
+
+    def request(self, method, path, body=None, timeout=TIMEOUT):
+        """Requête JSON sur une connexion HTTP persistante propre au thread appelant ; `timeout` borne l'attente
+        de la réponse, l'ouverture de la connexion est bornée à part (CONNECT_TIMEOUT)."""
+        conn = getattr(self.local, "http", None)
+        if conn is None: conn = self.local.http = http.client.HTTPConnection(self.host, self.port, timeout=CONNECT_TIMEOUT)
+        try:
+            if conn.sock is None: conn.connect()
+            conn.sock.settimeout(timeout)
+            data = json.dumps(body).encode("utf-8") if body is not None else None
+            conn.request(method, path, data, {"Content-Type": "application/json"} if data else {})
+            resp = conn.getresponse(); res = json.loads(resp.read())
+        except (http.client.HTTPException, OSError):
+            conn.close(); self.local.http = None; raise
+        if resp.status != 200: raise RuntimeError(f"serveur ({resp.status}) : {res.get('error')}")
+        return res
+
+    # --- Lecture : instantané puis deltas
+    def sync(self, wait=0.0):
+        """Met le cache à jour ; renvoie les ids d'`equipement` modifiés (None après un instantané complet)."""
+        if not self.epoch: self.load_snapshot(); return None
+        delta = self.request("GET", f"/changes?epoch={self.epoch}&since={self.seq}&wait={wait}", timeout=TIMEOUT + wait)
+        if delta.get("reset"): self.load_snapshot(); return None
+        try: self.apply(delta)
+        except sqlite3.IntegrityError:  # S/N échangés entre deux lignes : on repart d'un instantané
+            self.load_snapshot(); return None
+        return {r[0] for r in delta["equipement"]} | set(delta["deleted"]) | {int(i) for i in delta["reparations"]}
+
+    def load_snapshot(self):
+        snap = self.request("GET", "/snapshot", timeout=TIMEOUT * 4); conn = self.sync_conn
+        with self.cache_lock:
+            conn.execute("BEGIN")
+            try:
+                for table in TABLES: conn.execute(f"DELETE FROM {table}")
+                conn.executemany(UPSERT, snap["equipement"])
+                conn.executemany(f"INSERT INTO reparations ({', '.join(REPAIR_COLUMNS)}) VALUES ({', '.join('?' * len(REPAIR_COLUMNS))})", snap["reparations"])
+                self.write_kits(conn, snap["kits"]); conn.commit()
+            except sqlite3.Error:
+                conn.rollback(); raise
+        self.epoch, self.seq = snap["epoch"], snap["seq"]
+
+    def apply(self, delta):
+        conn = self.sync_conn
+        with self.cache_lock:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("DELETE FROM equipement WHERE id=?", [(i,) for i in delta["deleted"]])
+                conn.executemany(UPSERT, delta["equipement"])
+                for i, rows in delta["reparations"].items():
+                    conn.execute("DELETE FROM reparations WHERE id_equipement=?", (int(i),))
+                    conn.executemany(f"INSERT INTO reparations ({', '.join(REPAIR_COLUMNS)}) VALUES ({', '.join('?' * len(REPAIR_COLUMNS))})", rows)
+                gone = [(k,) for k in delta["deleted_kits"]] + [(k[0],) for k in delta["kits"]]
+                for table, col in (("kits", "id"), ("kit_items", "id_kit"), ("kit_checkouts", "id_kit")):
+                    conn.executemany(f"DELETE FROM {table} WHERE {col}=?", gone)
+                self.write_kits(conn, delta["kits"]); conn.commit()
+            except sqlite3.Error:
+                conn.rollback(); raise
+        self.seq = delta["seq"]
+
+    @staticmethod
+    def write_kits(conn, kit_rows):
+        conn.executemany("INSERT INTO kits (id, nom_kit) VALUES (?, ?)", [(k, nom) for k, nom, _, _ in kit_rows])
+        conn.executemany("INSERT INTO kit_items (id_kit, id_equipement, quantite) VALUES (?, ?, ?)",
+                         [(k, i, q) for k, _, items, _ in kit_rows for i, q in items])
+        conn.executemany("INSERT INTO kit_checkouts (id_kit, id_equipement) VALUES (?, ?)", [(k, i) for k, _, _, out in kit_rows for i in out])
+
+    def run(self, stop, on_change=None, wait=25.0):
+        """Boucle de synchronisation (à lancer dans un thread) jusqu'à `stop.set()` ; `on_change(ids)` après chaque delta."""
+        while not stop.is_set():
+            try: ids = self.sync(wait)
+            except NETWORK_ERRORS: time.sleep(1); continue
+            if on_change and ids != set(): on_change(ids)
+
+    # --- Écritures, envoyées par lots
+    def move(self, item_id, direction):
+        with self.lock: self.pending[item_id] = direction
+
+    def flush(self, borrower=None):
+        """Envoie les mouvements en file en une requête (une transaction côté serveur) ; renvoie les ids touchés.
+        En cas d'échec, ils restent en file pour le lot suivant (sauf ceux remplacés entre-temps)."""
+        with self.lock: moves, self.pending = list(self.pending.items()), {}
+        if not moves: return []
+        try: return self.request("POST", "/moves", {"moves": moves, "borrower": borrower})["touched"]
+        except NETWORK_ERRORS:
+            with self.lock: self.pending = {**dict(moves), **self.pending}
+            raise
+
+    def checkout_kits(self, kit_ids, borrower=None):
+        res = self.request("POST", "/kits", {"checkout": list(kit_ids), "borrower": borrower}); return res["touched"], res["conflicts"]
+
+    def return_kits(self, kit_ids):
+        return self.request("POST", "/kits", {"return": list(kit_ids)})["touched"]
+
+    def start_repair(self, item_id, description="", cout=0, prestataire="", date=None):
+        return self.request("POST", "/repairs", {"start": item_id, "description": description, "cout": cout, "prestataire": prestataire,
+                                                 "date": date})["touched"]
+
+    def finish_repair(self, item_id):
+        return self.request("POST", "/repairs", {"finish": item_id})["touched"]
+
+    def close(self):
+        self.sync_conn.close(); self.cache.close()
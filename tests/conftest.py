@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Modules de l'application à la racine du dépôt (pas de paquet installé)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "database" / "inventaire.db")); yield db; db.close()
+
+
+def add(db, nom, sn, quantite=1, is_lot=0, statut="En stock"):
+    """Insère une ligne d'`equipement` ; renvoie son id."""
+    cur = db.conn.execute("INSERT INTO equipement (nom, sn, quantite, is_lot, statut, categorie, prix) VALUES (?,?,?,?,?,'Son',10)",
+                          (nom, sn, quantite, is_lot, statut))
+    db.conn.commit(); return cur.lastrowid
+
+
+def encours(conn):
+    return {i: q for i, q in conn.execute("SELECT id_equipement, quantite FROM encours")}
@@ -0,0 +1,24 @@
+"""Reprise des anciens fichiers (data/qrcodes, data/factures) dans le magasin d'assets."""
+import assets
+from conftest import add
+
+
+def test_import_legacy_qr_and_keep_user_files(db, tmp_path):
+    qr_dir, inv_dir = tmp_path / "data" / "qrcodes", tmp_path / "data" / "factures"; qr_dir.mkdir(parents=True); inv_dir.mkdir()
+    micro, cam = add(db, "Micro", "SON-1"), add(db, "Caméra", "VID-1")
+    for i in (micro, cam, 99): (qr_dir / f"QR_{i}.png").write_bytes(b"png %d" % i)  # 99 : objet supprimé
+    user_file = tmp_path / "Documents" / "facture.pdf"; user_file.parent.mkdir(); user_file.write_bytes(b"%PDF facture")
+    old_file = inv_dir / "ancienne.pdf"; old_file.write_bytes(b"%PDF ancienne")
+    db.conn.execute("UPDATE equipement SET qr_path='asset:deja', facture_path=? WHERE id=?", (str(user_file), cam))
+    db.conn.execute("UPDATE equipement SET facture_path=? WHERE id=?", (str(old_file), micro)); db.conn.commit()
+
+    store_path = str(tmp_path / "data" / "assets.db")
+    n = assets.import_files(db.path, store_path, dirs=(str(qr_dir), str(inv_dir)))
+    assert n == 3
+    rows = dict((i, (q, f)) for i, q, f in db.conn.execute("SELECT id, qr_path, facture_path FROM equipement"))
+    assert all(assets.key_of(v) for v in (*rows[micro], rows[cam][1])) and rows[cam][0] == "asset:deja"
+    store = assets.AssetStore(store_path)
+    try: assert store.get(rows[micro][0])[1] == b"png %d" % micro
+    finally: store.close()
+    # Dossiers de l'ancienne version vidés ; le fichier choisi ailleurs par l'utilisateur reste
+    assert list(qr_dir.iterdir()) == [] and not old_file.exists() and user_file.exists()
@@ -0,0 +1,70 @@
+"""Sortie / retour de kits ensemblistes : parties de lots, conflits (rien n'est écrit), journal."""
+import kits
+from conftest import add, encours
+
+
+def make_kit(db, nom, items):
+    """Kit des [(id, quantité ou None = l'objet / le lot entier)] ; renvoie son id."""
+    k = db.conn.execute("INSERT INTO kits (nom_kit) VALUES (?)", (nom,)).lastrowid
+    db.conn.executemany("INSERT INTO kit_items (id_kit, id_equipement, quantite) VALUES (?,?,?)", [(k, i, q) for i, q in items])
+    db.conn.commit(); return k
+
+
+def state(db):
+    return db.conn.execute("SELECT id, quantite, statut, parent_id FROM equipement ORDER BY id").fetchall()
+
+
+def test_round_trip_with_lot_parts(db):
+    lot, micro, cam = add(db, "Câble XLR", "LOT-A", 10, 1), add(db, "Micro", "SON-1"), add(db, "Caméra", "VID-1")
+    k1, k2 = make_kit(db, "Concert", [(lot, 3), (micro, None)]), make_kit(db, "Tournage", [(lot, 5), (cam, None)])
+    touched, conflicts = kits.checkout_kits(db.conn, [k1, k2], "Paul")
+    assert conflicts == [] and {lot, micro, cam} <= set(touched)
+    parts = db.conn.execute("SELECT id, quantite FROM equipement WHERE parent_id=? AND statut='Sorti' ORDER BY quantite", (lot,)).fetchall()
+    assert [q for _, q in parts] == [3, 5] and db.item_state(lot)[1:3] == ("En stock", 2)
+    assert {i for (i,) in db.conn.execute("SELECT id_equipement FROM kit_checkouts WHERE id_kit=?", (k1,))} == {micro, parts[0][0]}
+    assert encours(db.conn) == {lot: 8, micro: 1, cam: 1}
+    assert {k for (k,) in db.conn.execute("SELECT id_kit FROM mouvements WHERE sens='out'")} == {k1, k2}
+
+    kits.return_kits(db.conn, [k1])
+    assert db.item_state(lot)[2] == 5 and db.item_state(parts[0][0]) is None and db.item_state(micro)[1] == "En stock"
+    assert encours(db.conn) == {lot: 5, cam: 1}
+    kits.return_kits(db.conn, [k2])
+    assert state(db) == [(lot, 10, "En stock", None), (micro, 1, "En stock", None), (cam, 1, "En stock", None)]
+    assert encours(db.conn) == {} and db.conn.execute("SELECT COUNT(*) FROM kit_checkouts").fetchone()[0] == 0
+
+
+def test_whole_lot_moves_without_split(db):
+    lot = add(db, "Pied", "LOT-P", 4, 1)
+    k = make_kit(db, "Plateau", [(lot, None)])
+    assert kits.checkout_kits(db.conn, [k])[1] == []
+    assert state(db) == [(lot, 4, "Sorti", None)] and encours(db.conn) == {lot: 4}
+    kits.return_kits(db.conn, [k])
+    assert state(db) == [(lot, 4, "En stock", None)] and encours(db.conn) == {}
+
+
+def test_conflicts_write_nothing(db):
+    lot, micro = add(db, "Câble XLR", "LOT-A", 10, 1), add(db, "Micro", "SON-1", statut="En Maintenance")
+    k1, k2, k3 = make_kit(db, "A", [(lot, 6)]), make_kit(db, "B", [(lot, 5)]), make_kit(db, "C", [(micro, None)])
+    before = state(db)
+    touched, conflicts = kits.checkout_kits(db.conn, [k1, k2, k3])
+    assert touched == [] and len(conflicts) == 2
+    assert any("demandé par 2 kits" in c for c in conflicts) and any("en maintenance" in c for c in conflicts)
+    assert state(db) == before and db.conn.execute("SELECT COUNT(*) FROM mouvements").fetchone()[0] == 0
+    assert db.conn.execute("SELECT COUNT(*) FROM kit_checkouts").fetchone()[0] == 0
+
+
+def test_kit_already_out(db):
+    micro = add(db, "Micro", "SON-1")
+    k = make_kit(db, "Concert", [(micro, None)])
+    kits.checkout_kits(db.conn, [k])
+    touched, conflicts = kits.checkout_kits(db.conn, [k])
+    assert touched == [] and any("déjà sorti" in c for c in conflicts) and encours(db.conn) == {micro: 1}
+
+
+def test_return_skips_lines_moved_since(db):
+    micro, cam = add(db, "Micro", "SON-1"), add(db, "Caméra", "VID-1")
+    k = make_kit(db, "Concert", [(micro, None), (cam, None)])
+    kits.checkout_kits(db.conn, [k])
+    db.conn.execute("UPDATE equipement SET statut='En Maintenance' WHERE id=?", (cam,)); db.conn.commit()
+    kits.return_kits(db.conn, [k])
+    assert db.item_state(micro)[1] == "En stock" and db.item_state(cam)[1] == "En Maintenance"
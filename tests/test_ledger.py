@@ -0,0 +1,68 @@
+"""Journal des mouvements : `encours` et les agrégats suivent sorties, retours, suppressions et modifications."""
+import pytest
+
+import ledger
+from conftest import add, encours
+from main import LogicManager
+
+
+def out_part(db, lot, qty):
+    """Sortie de `qty` unités d'un lot (ligne fille) ; renvoie l'id de la ligne fille."""
+    return LogicManager.move_item(db, lot, db.item_state(lot), qty)[-1]
+
+
+def test_lot_part_round_trip(db):
+    lot = add(db, "Câble XLR", "LOT-A", quantite=10, is_lot=1)
+    part = out_part(db, lot, 4)
+    assert encours(db.conn) == {lot: 4}
+    assert [r[0] for r in ledger.on_loan(db.conn)] == [part]
+    LogicManager.move_item(db, part, db.item_state(part))
+    assert encours(db.conn) == {}
+    assert db.item_state(lot)[2] == 10 and db.item_state(part) is None
+    assert [(s, q) for _, s, q, _, _ in ledger.history(db.conn, lot)] == [("in", 4), ("out", 4)]
+    assert db.conn.execute("SELECT SUM(sorties), SUM(unites_sorties) FROM utilisation_jour WHERE id_equipement=?", (lot,)).fetchone() == (1, 4)
+
+
+def test_delete_out_item_closes_ledger(db):
+    micro = add(db, "Micro", "SON-1")
+    LogicManager.move_item(db, micro, db.item_state(micro), borrower="Paul")
+    assert encours(db.conn) == {micro: 1}
+    LogicManager.delete_item(db, micro)
+    assert encours(db.conn) == {} and ledger.on_loan(db.conn) == []
+    assert ledger.history(db.conn, micro)[0][1:3] == ("in", 1)
+
+
+def test_delete_out_lot_part_keeps_other_parts(db):
+    lot = add(db, "Câble XLR", "LOT-A", quantite=10, is_lot=1)
+    a, b = out_part(db, lot, 3), out_part(db, lot, 2)
+    assert encours(db.conn) == {lot: 5}
+    LogicManager.delete_item(db, a)
+    assert encours(db.conn) == {lot: 2}
+    LogicManager.move_item(db, b, db.item_state(b))
+    assert encours(db.conn) == {}
+
+
+def test_delete_item_in_stock_records_nothing(db):
+    micro = add(db, "Micro", "SON-1")
+    LogicManager.delete_item(db, micro)
+    assert db.conn.execute("SELECT COUNT(*) FROM mouvements").fetchone()[0] == 0 and encours(db.conn) == {}
+
+
+def test_edit_out_item_keeps_quantity(db):
+    lot = add(db, "Câble XLR", "LOT-A", quantite=10, is_lot=1)
+    part = out_part(db, lot, 4)
+    with pytest.raises(ValueError):
+        LogicManager.update_item(db, part, "Câble XLR", "", db.conn.execute("SELECT sn FROM equipement WHERE id=?", (part,)).fetchone()[0],
+                                 10, 6, "Son", 1)
+    assert db.item_state(part)[2] == 4 and encours(db.conn) == {lot: 4}
+    # Les autres champs restent modifiables ; le retour rentre les unités réellement sorties
+    LogicManager.update_item(db, part, "Câble XLR 3 m", "", "LOT-B", 10, 4, "Son", 1)
+    LogicManager.move_item(db, part, db.item_state(part))
+    assert encours(db.conn) == {} and db.item_state(lot)[2] == 10
+
+
+def test_edit_quantity_in_stock(db):
+    lot = add(db, "Câble XLR", "LOT-A", quantite=10, is_lot=1)
+    LogicManager.update_item(db, lot, "Câble XLR", "", "LOT-A", 10, 12, "Son", 1)
+    out_part(db, lot, 12 - 2)
+    assert encours(db.conn) == {lot: 10}
@@ -0,0 +1,88 @@
+"""Migration d'une base du schéma d'origine (user_version 0) jusqu'à la dernière étape, reprises comprises."""
+import datetime
+import sqlite3
+
+import kits
+import ledger
+from database import Database
+
+# Schéma d'origine (database.py) et colonnes ajoutées ensuite par l'ancien update_db_schema de main.py
+BASELINE = """
+CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, nom TEXT NOT NULL UNIQUE);
+CREATE TABLE equipement (id INTEGER PRIMARY KEY AUTOINCREMENT, nom TEXT NOT NULL, marque TEXT, modele TEXT, sn TEXT UNIQUE,
+    prix_achat REAL, date_achat TEXT, id_categorie INTEGER, emplacement TEXT, statut TEXT DEFAULT 'En stock',
+    facture_path TEXT, qr_path TEXT, FOREIGN KEY (id_categorie) REFERENCES categories (id));
+CREATE TABLE reparations (id INTEGER PRIMARY KEY AUTOINCREMENT, id_equipement INTEGER, date_reparation TEXT, description TEXT,
+    cout REAL, prestataire TEXT, FOREIGN KEY (id_equipement) REFERENCES equipement (id));
+CREATE TABLE kits (id INTEGER PRIMARY KEY AUTOINCREMENT, nom_kit TEXT NOT NULL UNIQUE);
+CREATE TABLE kit_items (id_kit INTEGER, id_equipement INTEGER, PRIMARY KEY (id_kit, id_equipement),
+    FOREIGN KEY (id_kit) REFERENCES kits (id), FOREIGN KEY (id_equipement) REFERENCES equipement (id));
+ALTER TABLE equipement ADD COLUMN quantite INTEGER DEFAULT 1;
+ALTER TABLE equipement ADD COLUMN is_lot INTEGER DEFAULT 0;
+ALTER TABLE equipement ADD COLUMN parent_id INTEGER DEFAULT NULL;
+ALTER TABLE equipement ADD COLUMN date_sortie TEXT;
+ALTER TABLE equipement ADD COLUMN categorie TEXT;
+ALTER TABLE equipement ADD COLUMN prix REAL DEFAULT 0;
+"""
+
+
+def baseline(path):
+    """Base de l'ancienne version : un objet sorti à la main, un lot, un kit sorti par l'ancien toggle_kit
+    (tous ses objets 'Sorti', sans kit_checkouts), un kit en stock et un objet en réparation."""
+    path.parent.mkdir(parents=True, exist_ok=True); conn = sqlite3.connect(path); conn.executescript(BASELINE)
+    conn.executemany("INSERT INTO equipement (id, nom, marque, sn, statut, date_sortie, categorie, prix, quantite, is_lot) VALUES (?,?,?,?,?,?,?,?,?,?)", [
+        (1, "Micro SM58", "Shure", "SON-1", "Sorti", "05/03 14:30", "Son", 100, 1, 0),
+        (2, "Câble XLR", "Neutrik", "LOT-1", "En stock", None, "Son", 5, 20, 1),
+        (3, "Caméra FX3", "Sony", "VID-1", "Sorti", "06/03 09:00", "Vidéo", 4000, 1, 0),
+        (4, "Pied caméra", "Manfrotto", "VID-2", "Sorti", "06/03 09:00", "Vidéo", 200, 1, 0),
+        (5, "Projecteur", "Aputure", "LUM-1", "En Maintenance", None, "Lumière", 800, 1, 0)])
+    conn.executemany("INSERT INTO kits (id, nom_kit) VALUES (?,?)", [(1, "Tournage"), (2, "Plateau")])
+    conn.executemany("INSERT INTO kit_items (id_kit, id_equipement) VALUES (?,?)", [(1, 3), (1, 4), (2, 2), (2, 5)])
+    conn.execute("INSERT INTO reparations (id_equipement, date_reparation, description, cout, prestataire) VALUES (5, '2024-01-02', 'Lampe', 50, 'SAV')")
+    conn.commit(); conn.close()
+
+
+def test_baseline_migrates_to_latest(tmp_path):
+    path = tmp_path / "database" / "inventaire.db"; baseline(path)
+    db = Database(str(path))
+    try:
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(Database.MIGRATIONS) == 9
+        assert [r[0] for r in db.page(0, Database.fts_query("sony fx3"))] == [3]
+        stats = {(c, s): (nb, u) for c, s, nb, u, _ in db.conn.execute("SELECT * FROM stats_equipement WHERE nb > 0")}
+        assert stats[("Son", "En stock")] == (1, 20) and stats[("Vidéo", "Sorti")] == (2, 2)
+        # Reprise du journal : une sortie par ligne sortie, datée par date_sortie (année en cours)
+        year = datetime.date.today().year
+        assert db.conn.execute("SELECT id_ligne, horodatage FROM mouvements ORDER BY id_ligne").fetchall() == [
+            (1, f"{year}-03-05T14:30:00"), (3, f"{year}-03-06T09:00:00"), (4, f"{year}-03-06T09:00:00")]
+        assert dict(db.conn.execute("SELECT id_equipement, quantite FROM encours")) == {1: 1, 3: 1, 4: 1}
+        # Kit sorti par l'ancien toggle_kit : repris dans kit_checkouts, il s'affiche sorti et peut rentrer
+        assert sorted(db.conn.execute("SELECT id_kit, id_equipement FROM kit_checkouts")) == [(1, 3), (1, 4)]
+        assert {k: st for k, _, _, st in db.kit_rows()} == {1: "Sorti", 2: "En stock"}
+        kits.return_kits(db.conn, [1])
+        assert db.item_state(3)[1] == db.item_state(4)[1] == "En stock"
+        assert dict(db.conn.execute("SELECT id_equipement, quantite FROM encours")) == {1: 1}
+        assert [r[0] for r in ledger.on_loan(db.conn)] == [1]
+    finally: db.close()
+
+
+def test_migration_is_applied_once(tmp_path):
+    path = tmp_path / "database" / "inventaire.db"; baseline(path)
+    Database(str(path)).close(); db = Database(str(path))
+    try:
+        assert db.conn.execute("SELECT COUNT(*) FROM mouvements").fetchone()[0] == 3
+        assert db.conn.execute("SELECT COUNT(*) FROM kit_checkouts").fetchone()[0] == 2
+    finally: db.close()
+
+
+def test_backfill_skips_partly_returned_kits(tmp_path):
+    # Kit dont un objet a été rentré à la main : il n'est pas considéré comme sorti
+    path = tmp_path / "database" / "inventaire.db"; baseline(path)
+    conn = sqlite3.connect(path); conn.execute("UPDATE equipement SET statut='En stock', date_sortie=NULL WHERE id=4"); conn.commit(); conn.close()
+    db = Database(str(path))
+    try: assert db.conn.execute("SELECT COUNT(*) FROM kit_checkouts").fetchone()[0] == 0
+    finally: db.close()
+
+
+def test_new_database(db):
+    assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(Database.MIGRATIONS)
+    assert db.dashboard_stats() is not None